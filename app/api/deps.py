@@ -1,4 +1,19 @@
 # app/api/deps.py
+from typing import Optional, Tuple
+from fastapi import Header, HTTPException, Query
+from app.services.series_codec import negotiate_encoding, negotiate_format
+
 async def api_key_auth():
     # sem verificação; não bloqueia nada
     return
+
+async def temperature_format(
+    format: Optional[str] = Query(None, description="records (padrão) | columnar"),
+    encoding: Optional[str] = Query(None, description="colunar: json | f32 | f16"),
+    accept: Optional[str] = Header(None),
+) -> Tuple[str, str]:
+    """(formato, encoding) da resposta: query param > header Accept > records/json."""
+    try:
+        return negotiate_format(format, accept), negotiate_encoding(encoding, accept)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
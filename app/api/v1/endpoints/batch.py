@@ -0,0 +1,33 @@
+# app/api/v1/endpoints/batch.py
+from typing import Tuple
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from app.api.deps import api_key_auth, temperature_format
+from app.core.config import settings
+from app.schemas.batch import BatchRequest
+from app.services.batch import NDJSON_MEDIA_TYPE, iter_batch
+
+router = APIRouter()
+
+
+@router.post("/batch/process-images", response_class=StreamingResponse)
+async def process_images_batch(
+    req: BatchRequest,
+    fmt: Tuple[str, str] = Depends(temperature_format),
+    _=Depends(api_key_auth),
+):
+    """
+    Backfill: processa vários Date/Side (lista ou janela) numa chamada.
+    Resposta NDJSON: uma linha por item, na ordem em que terminam
+    (`index` aponta o item), e uma linha final com `"done": true`.
+    """
+    try:
+        items = req.expand(settings.BATCH_MAX_ITEMS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not items:
+        raise HTTPException(status_code=400, detail="Lote vazio.")
+    return StreamingResponse(
+        iter_batch(items, fmt=fmt[0], encoding=fmt[1], include_results=req.include_results),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
@@ -1,7 +1,20 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services.executor import executor_stats
+from app.services.jobs import job_manager
+from app.services.result_cache import result_cache_stats
+from app.services.result_store import result_store_stats
+from app.services.warmup import is_ready, warmup_state
 
 router = APIRouter()
 
 @router.get("/health", tags=["health"])
 async def health():
-    return {"status": "ok"}
+    return {"status": "ok", "executor": executor_stats(), "result_cache": result_cache_stats(),
+            "result_store": result_store_stats(), "jobs": job_manager.stats()}
+
+@router.get("/health/ready", tags=["health"])
+async def ready():
+    # readiness: 503 até o warm-up dos modelos terminar com sucesso
+    body = warmup_state()
+    return JSONResponse(body, status_code=200 if is_ready() else 503)
@@ -1,22 +1,35 @@
 # app/api/v1/endpoints/ingest.py
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Tuple, Union
+from fastapi import APIRouter, Depends, HTTPException, Response
 from starlette import status
-from app.api.deps import api_key_auth
+from app.api.deps import api_key_auth, temperature_format
 from app.core.config import settings
-from app.schemas.pipeline import InboundRequest, MixedResponse
+from app.core.metrics import PIPELINE_RUNS
+from app.core.timing import StageTimer
+from app.schemas.pipeline import InboundRequest, MixedResponse, ColumnarResponse
 from app.services.ingest_service import process_inbound_mixed
 import logging, traceback
 
 router = APIRouter()
 
 
-@router.post("/process-images", response_model=MixedResponse, status_code=status.HTTP_200_OK)
-async def process_images_mixed(req: InboundRequest, _=Depends(api_key_auth)):
+@router.post("/process-images", response_model=Union[MixedResponse, ColumnarResponse], status_code=status.HTTP_200_OK)
+async def process_images_mixed(
+    req: InboundRequest,
+    fmt: Tuple[str, str] = Depends(temperature_format),
+    _=Depends(api_key_auth),
+):
+    timer = StageTimer()
     try:
-        payload, _processed = await process_inbound_mixed(req)
-        return payload
+        body, _processed = await process_inbound_mixed(req, fmt=fmt[0], encoding=fmt[1], timer=timer)
+        # corpo já serializado (json_codec): o response_model fica só na documentação
+        response = Response(content=body, media_type="application/json")
+        if settings.SERVER_TIMING_HEADER:
+            response.headers["Server-Timing"] = timer.server_timing()
+        PIPELINE_RUNS.labels("sync", "ok").inc()
+        return response
     except Exception as e:
+        PIPELINE_RUNS.labels("sync", "error").inc()
         logging.exception("Erro no processamento (mixed)")
         if settings.DEBUG:
             raise HTTPException(status_code=500, detail=f"{e.__class__.__name__}: {e}\n{traceback.format_exc()}")
@@ -0,0 +1,46 @@
+# app/api/v1/endpoints/jobs.py
+from typing import Tuple, Union
+from fastapi import APIRouter, Depends, HTTPException, Response
+from starlette import status
+from app.api.deps import api_key_auth, temperature_format
+from app.schemas.job import JobState, JobStatus
+from app.schemas.pipeline import InboundRequest, MixedResponse, ColumnarResponse
+from app.services.jobs import Job, JobQueueFull, job_manager
+
+router = APIRouter()
+
+
+def _get_job(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job_not_found")
+    return job
+
+
+@router.post("/jobs/process-images", response_model=JobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def submit_process_images(
+    req: InboundRequest,
+    fmt: Tuple[str, str] = Depends(temperature_format),
+    _=Depends(api_key_auth),
+):
+    """Enfileira o processamento e devolve o job_id imediatamente."""
+    try:
+        job = job_manager.submit(req, fmt=fmt[0], encoding=fmt[1])
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return job.to_status()
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def job_status(job_id: str, _=Depends(api_key_auth)):
+    return _get_job(job_id).to_status()
+
+
+@router.get("/jobs/{job_id}/result", response_model=Union[MixedResponse, ColumnarResponse])
+async def job_result(job_id: str, _=Depends(api_key_auth)):
+    job = _get_job(job_id)
+    if job.status == JobState.FAILED:
+        raise HTTPException(status_code=500, detail=job.error or "job_failed")
+    if job.status != JobState.DONE or job.result is None:
+        raise HTTPException(status_code=409, detail=f"job_{job.status.value}")
+    return Response(content=job.result.body, media_type="application/json")
@@ -0,0 +1,43 @@
+# app/api/v1/endpoints/metrics.py
+from typing import Iterator
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.core.metrics import REGISTRY, Sample, metrics_enabled
+from app.services.executor import executor_stats
+from app.services.jobs import job_manager
+from app.services.result_cache import result_cache_stats
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _snapshot() -> Iterator[Sample]:
+    """Estado dos pools, do cache e da fila de jobs, lido na hora do scrape."""
+    for pool, st in executor_stats().items():
+        lb = {"pool": pool}
+        yield "executor_in_flight", "gauge", "Tarefas executando no pool.", lb, st["in_flight"]
+        yield "executor_waiting", "gauge", "Tarefas esperando vaga no pool.", lb, st["waiting"]
+        yield "executor_max_depth", "gauge", "Maior fila (esperando + executando) observada.", lb, st["max_depth"]
+        yield "executor_completed_total", "counter", "Tarefas concluídas.", lb, st["completed"]
+        yield "executor_failed_total", "counter", "Tarefas que levantaram exceção.", lb, st["failed"]
+
+    cache = result_cache_stats()
+    if cache is not None:
+        yield "result_cache_entries", "gauge", "Entradas em memória.", {}, cache["entries"]
+        yield "result_cache_bytes", "gauge", "Bytes em memória.", {}, cache["bytes"]
+        yield "result_cache_evictions_total", "counter", "Entradas removidas por limite de bytes.", {}, cache["evictions"]
+        yield "result_cache_disk_hits_total", "counter", "Hits servidos pelo disco.", {}, cache["disk_hits"]
+
+    jobs = job_manager.stats()
+    yield "jobs_queued", "gauge", "Jobs aguardando worker.", {}, jobs["queued"]
+    yield "jobs_sink_deliveries", "gauge", "Entregas ao sink em andamento.", {}, jobs["sink_deliveries"]
+    for state, n in jobs["jobs"].items():
+        yield "jobs_retained", "gauge", "Jobs consultáveis por estado.", {"state": state}, n
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    if not metrics_enabled():
+        raise HTTPException(status_code=404, detail="metrics_disabled")
+    return PlainTextResponse(REGISTRY.render(_snapshot()), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,62 @@
+# app/api/v1/endpoints/results.py
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import AwareDatetime
+from app.api.deps import api_key_auth
+from app.schemas.pipeline import AggregatedPayload, InboundRequest
+from app.services.executor import run_cpu
+from app.services.ingest_service import replay_to_sink
+from app.services.json_codec import dumps, finite_values
+from app.services.result_store import ResultStore, StoredRow, get_result_store
+
+router = APIRouter()
+
+
+def _store() -> ResultStore:
+    store = get_result_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail="result_store_disabled")
+    return store
+
+
+def _payload_bytes(date: datetime, side: str, rows: List[StoredRow]) -> bytes:
+    # mesmo JSON de AggregatedPayload, sem validar vetores de milhares de floats
+    images = []
+    for r in rows:
+        temps = [] if r.temperatures is None else finite_values(r.temperatures).tolist()
+        images.append({
+            "Side": r.Side, "Port": r.Port, "Section": r.Section, "IsThermal": r.IsThermal, "Name": r.Name,
+            "temperatures": temps, "length": len(temps), "valves": r.valves or [],
+        })
+    return dumps({"Side": side, "Date": date.isoformat(), "Images": images})
+
+
+@router.get("/results", response_model=AggregatedPayload)
+async def get_results(
+    Date: AwareDatetime = Query(..., description="UTC ISO8601 (o mesmo do /process-images)"),
+    Side: str = Query(..., pattern="^(LEFT|RIGHT)$"),
+    Port: Optional[int] = Query(None),
+    Section: Optional[int] = Query(None),
+    _=Depends(api_key_auth),
+):
+    """Resultado já calculado de um Date/Side, sem buscar nem recalcular."""
+    store = _store()
+    rows = await run_cpu(store.load, Date, Side, Port, Section)
+    if rows is None:
+        raise HTTPException(status_code=404, detail="result_not_found")
+    body = await run_cpu(_payload_bytes, Date, Side, rows)
+    return Response(content=body, media_type="application/json")
+
+
+@router.post("/results/replay")
+async def replay_results(req: InboundRequest, _=Depends(api_key_auth)):
+    """Reenvia ao sink as temperaturas guardadas de um Date/Side."""
+    store = _store()
+    rows = await run_cpu(store.load, req.Date, req.Side)
+    if rows is None:
+        raise HTTPException(status_code=404, detail="result_not_found")
+    summary = await replay_to_sink(rows)
+    if summary["failed_batches"]:
+        raise HTTPException(status_code=502, detail=summary)
+    return summary
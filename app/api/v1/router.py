@@ -1,6 +1,10 @@
 from fastapi import APIRouter
-from .endpoints import health, ingest
+from .endpoints import batch, health, ingest, jobs, metrics, results
 
 router = APIRouter()
 router.include_router(health.router)  # GET /api/v1/health
+router.include_router(metrics.router)  # GET /api/v1/metrics
 router.include_router(ingest.router, tags=["ingest"])
+router.include_router(jobs.router, tags=["jobs"])
+router.include_router(batch.router, tags=["batch"])
+router.include_router(results.router, tags=["results"])
@@ -14,20 +14,45 @@ class Settings(BaseSettings):
     API_KEY: str = "123"
 
     EXTERNAL_SOURCE_URL: str = "http://localhost:9000/source"   # GET
+    SOURCE_FETCH_MODE: str = "full"             # "full" | "stream" (parse incremental) | "paged" | "ports"
+    SOURCE_STREAM_CHUNK_BYTES: int = 256 * 1024
+    SOURCE_PAGE_SIZE: int = 8                   # paged: imagens por GET (Offset/Limit + X-Total-Count)
+    SOURCE_PORTS: List[int] = []                # ports: um GET filtrado por porta (Port=)
+    SOURCE_MAX_CONCURRENCY: int = 4             # paged/ports: GETs simultâneos (páginas adiantadas)
 
     SINK_BASE_URL: str = "http://localhost:9000/"               # <--- BASE
     SINK_POST_THERMAL_PATH: str = "rest/postthermaldata/v1/Data"  # <--- SERVIÇO
+    SINK_POST_THERMAL_SERIES_PATH: str = "rest/postthermaldata/v1/Series"  # formato colunar
+    SINK_TEMPERATURE_FORMAT: str = "records"    # "records" | "columnar"
+    SINK_TEMPERATURE_ENCODING: str = "json"     # colunar: "json" | "f32" | "f16"
 
     TEMP_AGGREGATION: str = "mean"
 
     MAX_TEMPERATURE_VECTOR_LEN: int = 15000
+    TEMPERATURE_REDUCTION: str = "stride"  # "stride" | "area" | "minmax" | "quantile" (app/services/reduction.py)
+    REDUCTION_TARGET_LEN: int = 1024     # valores por imagem nas reduções area/minmax/quantile
     SINK_BATCH_SIZE: int = 26
+    SINK_MAX_BATCH_BYTES: int = 0        # limite de bytes por POST (0 = só por quantidade)
+    SINK_MAX_IN_FLIGHT: int = 4          # POSTs simultâneos ao sink
+    SINK_STREAMING: bool = True          # envia ao sink imagem a imagem, durante o cálculo
+    SINK_QUEUE_MAX_BATCHES: int = 64     # lotes aguardando envio (backpressure)
+    SINK_RETRIES: int = 3                # novas tentativas em 5xx/timeout
+    SINK_RETRY_BACKOFF_S: float = 0.5
+    SINK_RETRY_BACKOFF_MAX_S: float = 8.0
+    SINK_TIMEOUT_S: float = 120.0
+    SOURCE_TIMEOUT_S: float = 30.0
+
+    HTTP_MAX_CONNECTIONS: int = 20       # pool do cliente HTTP compartilhado
+    HTTP_MAX_KEEPALIVE: int = 10
 
 
     SIDE_MAP: Dict[str, str] = {"LEFT": "LEFT", "RIGHT": "RIGHT"}
     DEFAULT_EQUIPMENT: str = "Forno"
     SINK_TEMPERATURE_FIELD_NAME: str = "Temperature"
 
+    TEMPERATURE_MODE: str = "full"       # "full" (imagem inteira) | "roi" (só a ROI detectada)
+    ROI_FALLBACK_CENTER: bool = True     # modo roi: sem detecção usa a ROI central
+
     ROI_CLASS_NAME: str = "extraction_roi"
     INFER_SIZE_W: int = 224
     INFER_SIZE_H: int = 224
@@ -37,11 +62,62 @@ class Settings(BaseSettings):
 
     PROCESS_NON_THERMAL: bool = False
 
+    # ---- decode das imagens ----
+    THERMAL_DECODE_REDUCE: int = 1       # 1 | 2 | 4 | 8 (IMREAD_REDUCED_*; muda o vetor de saída)
+    THERMAL_DECODE_LUMA: bool = False    # cinza direto do JPEG (Y); difere ~0-18 níveis onde a cor satura
+    VALVE_DECODE_REDUCE: int = 1         # idem para as imagens do modelo de ângulo
+
+    # ---- execução CPU-bound fora do event loop ----
+    CPU_POOL_WORKERS: int = 4            # threads p/ decode, cv2, numpy
+    INFER_POOL_MODE: str = "thread"      # "thread" | "process"
+    INFER_POOL_WORKERS: int = 1          # threads/processos de inferência YOLO
+    EXECUTOR_MAX_PENDING: int = 32       # tarefas submetidas por pool antes de esperar
+    VALVE_BATCH_SIZE: int = 16           # imagens por chamada ao modelo de ângulo
+
+    # ---- servidor de inferência dedicado (python -m app.services.inference_server) ----
+    INFER_SERVER_ENABLED: bool = False   # True: workers HTTP não carregam modelos, usam o servidor
+    INFER_SERVER_ADDRESS: str = "127.0.0.1:8765"  # "host:porta" ou "unix:/caminho/socket"
+    INFER_SERVER_AUTHKEY: str = "troque-esta-chave"
+    INFER_SERVER_MAX_BATCH: int = 16     # frames por chamada ao modelo (de várias requisições)
+    INFER_SERVER_BATCH_WAIT_MS: float = 5.0  # espera por mais frames antes de rodar o lote
+    INFER_SERVER_TIMEOUT_S: float = 60.0
+    INFER_SERVER_CONNECT_TIMEOUT_S: float = 120.0  # startup: espera o servidor aquecer
+
+    # ---- modo assíncrono (jobs) ----
+    JOB_WORKERS: int = 2                 # jobs processados em paralelo
+    JOB_QUEUE_MAX: int = 100             # jobs aguardando; acima disso POST -> 503
+    JOB_RESULT_TTL_S: float = 3600.0     # quanto tempo um job terminado fica consultável
+    JOB_MAX_RETAINED: int = 1000
+    JOB_SINK_RETRIES: int = 5            # novas tentativas dos lotes que falharam
+    JOB_SINK_RETRY_BACKOFF_S: float = 5.0
+
+    # ---- lote (/batch/process-images) ----
+    BATCH_MAX_ITEMS: int = 2000          # pares Date/Side por chamada
+    BATCH_CONCURRENCY: int = 4           # pipelines simultâneos do lote
+    BATCH_INFER_WAIT_MS: float = 10.0    # espera para juntar válvulas de itens diferentes
+
+    # ---- cache de resultados por hash do base64 ----
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    RESULT_CACHE_TTL_S: float = 3600.0
+    RESULT_CACHE_DIR: str = ""           # vazio = só memória
+    RESULT_CACHE_DISK_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+
+    # ---- resultados persistidos por Date/Side (consulta e reenvio ao sink) ----
+    RESULT_STORE_ENABLED: bool = False
+    RESULT_STORE_DIR: str = "results"
+    RESULT_STORE_FORMAT: str = "auto"    # "auto" | "parquet" (polars) | "npy" (mmap)
+
     ROI_MODEL_PATH: str = str(ASSETS_DIR / "vivix_model.pt")
     ANGLE_MODEL_PATH: str = str(ASSETS_DIR / "angle_model.pt")
 
+    PRELOAD_MODELS: bool = True          # carrega + inferência dummy no startup
+    WARMUP_BLOCKING: bool = False        # True: só abre a porta depois do warm-up
+
     RETURN_OVERLAY_BASE64: bool = True
     DEBUG: bool = True
+    SERVER_TIMING_HEADER: bool = False   # tempo por estágio no header Server-Timing (benchmarks)
+    METRICS_ENABLED: bool = True         # /api/v1/metrics; False = instrumentação vira no-op
 
     CORS_ALLOW_ORIGINS: List[str] = ["http://localhost:8080"]
     CORS_ALLOW_CREDENTIALS: bool = True
@@ -0,0 +1,219 @@
+# app/core/metrics.py
+"""
+Métricas em memória no formato texto do Prometheus (sem dependência extra).
+
+Counter e Histogram com labels; `render()` gera o corpo de /api/v1/metrics.
+Com METRICS_ENABLED=False, inc()/observe() retornam na primeira linha
+(só um teste de flag), então a instrumentação pode ficar no caminho quente.
+"""
+from __future__ import annotations
+import math
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+_enabled = bool(settings.METRICS_ENABLED)
+
+# segundos: de 1 ms (cache, LUT) a 2 min (sink lento)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 120.0)
+
+
+def metrics_enabled() -> bool:
+    return _enabled
+
+
+def set_metrics_enabled(enabled: bool) -> None:
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        if not _enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # último = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        if not _enabled:
+            return
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()  # aparece com 0 antes do primeiro uso
+        REGISTRY.register(self)
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: Any) -> Any:
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name}: esperava labels {self.labelnames}, recebeu {key}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _child_samples(self, key: Tuple[str, ...], child: Any) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            lines.extend(self._child_samples(key, child))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _child_samples(self, key: Tuple[str, ...], child: _CounterChild) -> List[str]:
+        return [f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(child.value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _child_samples(self, key: Tuple[str, ...], child: _HistogramChild) -> List[str]:
+        with child._lock:
+            counts, total, count = list(child.counts), child.sum, child.count
+        out, acc = [], 0
+        for le, c in zip(self.buckets + (math.inf,), counts):
+            acc += c
+            labels = _fmt_labels(self.labelnames, key, f'le="{_fmt_value(le)}"')
+            out.append(f"{self.name}_bucket{labels} {acc}")
+        base = _fmt_labels(self.labelnames, key)
+        out.append(f"{self.name}_sum{base} {_fmt_value(total)}")
+        out.append(f"{self.name}_count{base} {count}")
+        return out
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica duplicada: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def render(self, extra: Iterable["Sample"] = ()) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        lines.extend(render_samples(extra))
+        return "\n".join(lines) + "\n"
+
+
+# (nome, tipo, ajuda, labels, valor): valores lidos na hora do scrape
+# (estatísticas de pools, cache, jobs), sem instrumentar esses módulos
+Sample = Tuple[str, str, str, Dict[str, str], Optional[float]]
+
+
+def render_samples(samples: Iterable[Sample]) -> List[str]:
+    # o formato exige as amostras de uma métrica juntas, sob um único HELP/TYPE
+    families: Dict[str, List[str]] = {}
+    for name, kind, doc, labels, value in samples:
+        if value is None:
+            continue
+        family = families.get(name)
+        if family is None:
+            family = families[name] = [f"# HELP {name} {doc}", f"# TYPE {name} {kind}"]
+        family.append(f"{name}{_fmt_labels(list(labels), [str(v) for v in labels.values()])} {_fmt_value(float(value))}")
+    return [line for family in families.values() for line in family]
+
+
+REGISTRY = Registry()
+
+# ---- métricas do pipeline ----
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds",
+    "Duração de cada estágio (fetch, cache, decode, temperature, build, valves, sink).",
+    ("stage",),
+)
+PIPELINE_RUNS = Counter("pipeline_runs_total", "Execuções do pipeline por modo e resultado.", ("mode", "outcome"))
+IMAGES = Counter("pipeline_images_total", "Imagens por tipo e resultado.", ("kind", "outcome"))
+RECORDS = Counter("pipeline_records_total", "Registros emitidos na resposta.", ("kind",))
+CACHE_LOOKUPS = Counter("result_cache_lookups_total", "Consultas ao cache de resultados.", ("kind", "result"))
+
+# ---- sink ----
+SINK_BATCHES = Counter("sink_batches_total", "Lotes enviados ao sink por status HTTP ('error' = sem resposta).", ("status",))
+SINK_BYTES = Counter("sink_bytes_total", "Bytes de payload enviados ao sink (inclui reenvios).")
+SINK_RETRIES = Counter("sink_retries_total", "Novas tentativas de POST ao sink.")
+SINK_BATCH_SECONDS = Histogram("sink_batch_seconds", "Duração de um POST de lote ao sink.")
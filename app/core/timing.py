@@ -0,0 +1,78 @@
+# app/core/timing.py
+"""
+Tempo por estágio de uma requisição (fetch, decode, temperature, ...).
+
+O pipeline acumula a duração de cada estágio num StageTimer; o endpoint
+pode devolver o resumo no header Server-Timing (SERVER_TIMING_HEADER),
+que é o que o benchmarks/bench_pipeline.py lê. Cada medição também vai
+para o histograma pipeline_stage_seconds (app/core/metrics.py).
+"""
+from __future__ import annotations
+import time
+from contextlib import contextmanager
+from typing import AsyncIterable, AsyncIterator, Dict, Iterator, Optional, TypeVar
+
+from app.core.metrics import STAGE_SECONDS
+
+T = TypeVar("T")
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.totals: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+
+    def stage(self, name: str):
+        return stage(self, name)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """`fetch;dur=12.3, decode;dur=4.5, ..., total;dur=30.1` (ms)."""
+        parts = [f"{k};dur={v * 1e3:.1f}" for k, v in self.totals.items()]
+        parts.append(f"total;dur={self.elapsed() * 1e3:.1f}")
+        return ", ".join(parts)
+
+
+@contextmanager
+def stage(timer: Optional[StageTimer], name: str) -> Iterator[None]:
+    """Mede o bloco: soma em `timer` (se houver) e observa no histograma."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        if timer is not None:
+            timer.add(name, dt)
+        STAGE_SECONDS.labels(name).observe(dt)
+
+
+async def timed_aiter(it: AsyncIterable[T], timer: Optional[StageTimer], name: str) -> AsyncIterator[T]:
+    """
+    Itera `it` somando em `name` o tempo gasto esperando cada item; o
+    histograma recebe uma observação só, com o total da iteração.
+    """
+    ait = it.__aiter__()
+    waited = 0.0
+    try:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = await ait.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                dt = time.perf_counter() - t0
+                waited += dt
+                if timer is not None:
+                    timer.add(name, dt)
+            yield item
+    finally:
+        STAGE_SECONDS.labels(name).observe(waited)
+        aclose = getattr(ait, "aclose", None)
+        if aclose is not None:
+            await aclose()
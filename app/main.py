@@ -1,12 +1,41 @@
 # app/main.py
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.core.logging import setup_logging
 from app.api.router import router as api_router
+from app.services.executor import shutdown_executors
+from app.services.external_client import close_http_client
+from app.services.inference_client import close_inference_client
+from app.services.jobs import job_manager
+from app.services.warmup import mark_ready_without_warmup, warmup_models
 
 setup_logging()
-app = FastAPI(title=settings.APP_NAME)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # warm-up em segundo plano: /health responde já, /health/ready só quando aquecer
+    warm_task = None
+    if settings.PRELOAD_MODELS:
+        warm_task = asyncio.create_task(warmup_models())
+        if settings.WARMUP_BLOCKING:
+            await warm_task
+    else:
+        mark_ready_without_warmup()
+    await job_manager.start()
+    yield
+    await job_manager.stop()
+    if warm_task is not None and not warm_task.done():
+        warm_task.cancel()
+    await close_http_client()
+    close_inference_client()
+    shutdown_executors()
+
+
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,43 @@
+from datetime import timedelta
+from typing import List, Optional
+from pydantic import AwareDatetime, BaseModel, Field, model_validator
+
+from app.schemas.pipeline import InboundRequest
+
+class BatchRequest(BaseModel):
+    """
+    Vários Date/Side numa chamada: lista explícita em `requests` ou janela
+    [start, end] de `step_s` em `step_s` segundos para cada lado em `sides`.
+    """
+    requests: Optional[List[InboundRequest]] = None
+    start: Optional[AwareDatetime] = None
+    end: Optional[AwareDatetime] = None
+    step_s: Optional[int] = Field(None, gt=0, description="Intervalo entre coletas (janela)")
+    sides: List[str] = Field(default_factory=lambda: ["LEFT", "RIGHT"])
+    include_results: bool = Field(False, description="Inclui o resultado de cada item no NDJSON")
+
+    @model_validator(mode="after")
+    def _check_mode(self) -> "BatchRequest":
+        window = (self.start, self.end, self.step_s)
+        if self.requests is None and None in window:
+            raise ValueError("Informe `requests` ou `start`, `end` e `step_s`.")
+        if self.requests is not None and any(v is not None for v in window):
+            raise ValueError("Use `requests` ou a janela (`start`/`end`/`step_s`), não os dois.")
+        if self.start is not None and self.end is not None and self.end < self.start:
+            raise ValueError("`end` antes de `start`.")
+        return self
+
+    def expand(self, limit: int) -> List[InboundRequest]:
+        """Itens na ordem (data, lado); ValueError acima de `limit`."""
+        if self.requests is not None:
+            items = list(self.requests)
+        else:
+            items, ts, step = [], self.start, timedelta(seconds=self.step_s)
+            while ts <= self.end:
+                items.extend(InboundRequest(Date=ts, Side=side) for side in self.sides)
+                if len(items) > limit:
+                    break
+                ts += step
+        if len(items) > limit:
+            raise ValueError(f"Lote com mais de {limit} itens (BATCH_MAX_ITEMS).")
+        return items
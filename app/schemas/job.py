@@ -0,0 +1,32 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+from pydantic import BaseModel, Field
+
+class JobState(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+class SinkState(str, Enum):
+    PENDING = "pending"
+    DELIVERING = "delivering"
+    DELIVERED = "delivered"
+    FAILED = "failed"
+    SKIPPED = "skipped"   # nada para enviar
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: JobState
+    Date: datetime
+    Side: str
+    format: str = "records"
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    processed: Optional[int] = Field(None, description="Imagens térmicas processadas")
+    error: Optional[str] = None
+    sink_status: SinkState = SinkState.PENDING
+    sink_attempts: int = 0
+    sink_error: Optional[str] = None
@@ -15,9 +15,11 @@ class SourceImage(BaseModel):
     Base64String: str
     Name: str
 
-class SourceCollection(BaseModel):
+class SourceCollectionHeader(BaseModel):
     Side: str
     Date: AwareDatetime
+
+class SourceCollection(SourceCollectionHeader):
     Images: List[SourceImage]
 
 class StoredImage(BaseModel):
@@ -28,6 +30,7 @@ class StoredImage(BaseModel):
     Name: str
     temperatures: List[float] = Field(default_factory=list)
     length: int = 0
+    valves: List[Optional[float]] = Field(default_factory=list)  # imagens de válvula
 
 class AggregatedPayload(BaseModel):
     Side: str
@@ -53,3 +56,18 @@ class ValveRecord(BaseModel):
 class MixedResponse(BaseModel):
     temperatures: List[TemperatureRecord]
     valves: List[ValveRecord]
+
+# ---- formato colunar: um registro por imagem ----
+class TemperatureSeries(BaseModel):
+    Timestamp: str
+    Side: str
+    Port: int
+    Section: int
+    Count: int
+    Encoding: str = Field("json", pattern="^(json|f32|f16)$")
+    Temperatures: Optional[List[float]] = None   # Encoding="json"
+    Data: Optional[str] = None                   # base64 little-endian (f32/f16)
+
+class ColumnarResponse(BaseModel):
+    temperatures: List[TemperatureSeries]
+    valves: List[ValveRecord]
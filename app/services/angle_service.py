@@ -2,16 +2,11 @@ from typing import Dict, Any, List, Tuple, Optional
 import math
 import numpy as np
 import cv2
-from ultralytics import YOLO
 from app.core.config import settings
+from app.services.model_registry import get_model, model_lease
 
-_angle_model: Optional[YOLO] = None
-
-def _get_angle_model() -> YOLO:
-    global _angle_model
-    if _angle_model is None:
-        _angle_model = YOLO(settings.ANGLE_MODEL_PATH)
-    return _angle_model
+def _get_angle_model():
+    return get_model(settings.ANGLE_MODEL_PATH)
 
 def _rgb_to_bgr(img_rgb: np.ndarray) -> np.ndarray:
     return cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR)
@@ -34,46 +29,139 @@ def _percent_from_angle(angle_deg: float) -> float:
     if pct > 100: pct = 100.0
     return float(pct)
 
+# ==== pós-processamento vetorizado ====
+# Mesmo resultado do laço original (ângulo cabeça->cauda dos keypoints 0 e 1,
+# 100*cos^2, top 3 por confiança desc, empates na ordem das detecções),
+# calculado de uma vez para todas as detecções de um ou vários resultados.
+TOP_VALVES = 3
+
+def _to_numpy(x: Any) -> np.ndarray:
+    if hasattr(x, "cpu"):
+        x = x.cpu().numpy()
+    return np.asarray(x)
+
+def _head_tail_delta(r0) -> Optional[np.ndarray]:
+    """(N, 2) float64 com cauda - cabeça por detecção, ou None sem keypoints utilizáveis."""
+    if r0 is None or r0.keypoints is None:
+        return None
+    data = _to_numpy(r0.keypoints.data)
+    if data.ndim == 2:
+        # uma linha achatada por instância: (x0, y0, x1, y1, ...)
+        if data.shape[1] % 2 != 0:
+            return None
+        data = data.reshape(data.shape[0], -1, 2)
+    if data.ndim != 3 or data.shape[1] < 2 or data.shape[2] < 2:
+        return None
+    # subtração no dtype do modelo, como float(tail - head) no laço antigo
+    return (data[:, 1, :2] - data[:, 0, :2]).astype(np.float64)
+
+def _confidences(r0, n: int) -> np.ndarray:
+    conf = np.ones(n, dtype=np.float64)
+    if getattr(r0, "boxes", None) is not None and r0.boxes.conf is not None:
+        c = _to_numpy(r0.boxes.conf).astype(np.float64).ravel()
+        m = min(n, c.size)
+        conf[:m] = c[:m]
+    return conf
+
+def _percent_from_delta(delta: np.ndarray) -> np.ndarray:
+    ang = np.abs(np.degrees(np.arctan2(delta[:, 1], delta[:, 0])))
+    return np.clip(100.0 * np.cos(np.radians(ang)) ** 2, 0.0, 100.0)
+
+def _top_k_desc(conf: np.ndarray, k: int) -> np.ndarray:
+    """Índices dos k maiores, desc, empates pela posição (sort estável)."""
+    n = conf.size
+    if n > k:
+        # argpartition acha o k-ésimo maior em O(n); ficam só os candidatos
+        # >= ele (inclui empates) para a ordenação estável
+        kth = conf[np.argpartition(conf, n - k)[n - k]]
+        cand = np.flatnonzero(conf >= kth)
+    else:
+        cand = np.arange(n)
+    order = np.argsort(-conf[cand], kind="stable")
+    return cand[order[:k]]
+
+def _valves_from_result(r0) -> List[float]:
+    delta = _head_tail_delta(r0)
+    if delta is None or not len(delta):
+        return []
+    pct = _percent_from_delta(delta)
+    return pct[_top_k_desc(_confidences(r0, len(delta)), TOP_VALVES)].tolist()
+
+def valves_from_results(results: List[Any]) -> List[List[float]]:
+    """
+    _valves_from_result para um lote de resultados: ângulos e percentuais de
+    todas as detecções num passe só e top 3 por imagem via lexsort.
+    """
+    deltas, confs, segs = [], [], []
+    for i, r0 in enumerate(results):
+        d = _head_tail_delta(r0)
+        if d is None or not len(d):
+            continue
+        deltas.append(d)
+        confs.append(_confidences(r0, len(d)))
+        segs.append(np.full(len(d), i, dtype=np.intp))
+    out: List[List[float]] = [[] for _ in results]
+    if not deltas:
+        return out
+
+    pct = _percent_from_delta(np.concatenate(deltas))
+    conf = np.concatenate(confs)
+    seg = np.concatenate(segs)
+    # imagem asc, confiança desc, posição asc (= sort estável por imagem)
+    order = np.lexsort((np.arange(seg.size), -conf, seg))
+    seg_sorted = seg[order]
+    starts = np.flatnonzero(np.r_[True, seg_sorted[1:] != seg_sorted[:-1]])
+    rank = np.arange(seg_sorted.size) - np.repeat(starts, np.diff(np.r_[starts, seg_sorted.size]))
+    keep = order[rank < TOP_VALVES]
+    for i, v in zip(seg[keep].tolist(), pct[keep].tolist()):
+        out[i].append(v)
+    return out
+
 def valves_from_image_rgb(img_rgb: np.ndarray) -> List[float]:
     """
     Retorna até 3 valores de válvula (0..100). Ordena por confiança desc.
     Se houver <3 detecções, completa com None.
     """
-    model = _get_angle_model()
-    img_bgr = _rgb_to_bgr(img_rgb)
-    res = model(img_bgr)
-    if not res or res[0].keypoints is None:
+    return valves_from_image_bgr(_rgb_to_bgr(img_rgb))
+
+def valves_from_image_bgr(img_bgr: np.ndarray) -> List[float]:
+    """Igual a valves_from_image_rgb, para imagens já decodificadas em BGR."""
+    with model_lease(settings.ANGLE_MODEL_PATH) as model:
+        res = model(img_bgr)
+    if not res:
         return []
+    return _valves_from_result(res[0])
 
-    r0 = res[0]
-    kpts = r0.keypoints
-    conf = None
-    if hasattr(r0, "boxes") and r0.boxes is not None and r0.boxes.conf is not None:
-        conf = r0.boxes.conf.detach().cpu().numpy()
-    data = kpts.data
-    if hasattr(data, "cpu"):
-        data = data.cpu().numpy()
-    data = np.asarray(data)
-
-    vals: List[Tuple[float, float]] = [] 
-    for i, inst in enumerate(data):
-        pts = inst
-        if pts.ndim == 1:
-            if pts.size % 2 != 0:
-                continue
-            pts = pts.reshape(-1, 2)
-        if pts.shape[0] < 2 or pts.shape[1] < 2:
-            continue
-        head = pts[0][:2]
-        tail = pts[1][:2]
-        ang = _angle_deg_from_points(head, tail)
-        pct = _percent_from_angle(ang)
-        c = float(conf[i]) if conf is not None and i < len(conf) else 1.0
-        vals.append((c, pct))
-
-    if not vals:
+def valves_from_images_rgb(imgs_rgb: List[np.ndarray], batch_size: Optional[int] = None) -> List[List[float]]:
+    """
+    Versão em lote de valves_from_image_rgb: uma chamada ao modelo por lote
+    de até `batch_size` imagens (padrão settings.VALVE_BATCH_SIZE).
+    """
+    return valves_from_images_bgr([_rgb_to_bgr(im) for im in imgs_rgb], batch_size)
+
+def valves_from_images_bgr(imgs_bgr: List[np.ndarray], batch_size: Optional[int] = None) -> List[List[float]]:
+    """
+    Lote de imagens já em BGR. Os lotes só juntam imagens do mesmo shape:
+    com shapes mistos o ultralytics troca o letterbox retangular por padding
+    fixo e o resultado deixaria de ser idêntico ao caminho unitário.
+    Retorna na mesma ordem da entrada.
+    """
+    if not imgs_bgr:
         return []
+    bs = max(1, int(batch_size or settings.VALVE_BATCH_SIZE))
+
+    groups: Dict[Tuple[int, ...], List[int]] = {}
+    for idx, im in enumerate(imgs_bgr):
+        groups.setdefault(tuple(im.shape), []).append(idx)
 
-    vals.sort(key=lambda x: x[0], reverse=True)
-    out = [v for _, v in vals[:3]]
+    out: List[List[float]] = [[] for _ in imgs_bgr]
+    for idxs in groups.values():
+        for i in range(0, len(idxs), bs):
+            chunk = idxs[i:i+bs]
+            frames = [imgs_bgr[k] for k in chunk]
+            with model_lease(settings.ANGLE_MODEL_PATH) as model:
+                res = list(model(frames) or [])
+            vals = valves_from_results(res[:len(chunk)])
+            for j, k in enumerate(chunk):
+                out[k] = vals[j] if j < len(vals) else []
     return out
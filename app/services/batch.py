@@ -0,0 +1,124 @@
+# app/services/batch.py
+"""
+Endpoint de lote (backfill): muitos Date/Side numa chamada.
+
+Os itens são distribuídos entre BATCH_CONCURRENCY workers no event loop;
+todos compartilham os pools de CPU/inferência, um MicroBatcher de válvulas
+(inferência em lote entre itens diferentes) e um único SinkStream (mesma
+fila, lotes e conexões do sink). A resposta é NDJSON, uma linha por item
+na ordem em que terminam, e uma linha final de resumo.
+"""
+from __future__ import annotations
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import PIPELINE_RUNS
+from app.schemas.pipeline import InboundRequest
+from app.services.angle_service import valves_from_images_bgr
+from app.services.external_client import SinkStream
+from app.services.ingest_service import PipelineResult, run_pipeline, sink_url
+from app.services.json_codec import dumps
+from app.services.microbatch import MicroBatcher
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+_Done = Tuple[int, InboundRequest, Optional[PipelineResult], Optional[BaseException], float]
+
+
+def _line(obj: Dict[str, Any], result: Optional[bytes] = None) -> bytes:
+    head = dumps(obj)
+    if result is None:
+        return head + b"\n"
+    # o corpo já vem serializado do pipeline: entra sem decodificar
+    return head[:-1] + b',"result":' + result + b"}\n"
+
+
+def _item_line(done: _Done, include_results: bool) -> bytes:
+    idx, req, result, err, elapsed = done
+    obj: Dict[str, Any] = {
+        "index": idx,
+        "Date": req.Date.isoformat(),
+        "Side": req.Side,
+        "status": "ok" if err is None else "failed",
+        "elapsed_s": round(elapsed, 3),
+    }
+    if err is not None:
+        obj["error"] = f"{err.__class__.__name__}: {err}"
+        return _line(obj)
+    obj["processed"] = result.processed
+    return _line(obj, result.body if include_results else None)
+
+
+async def iter_batch(
+    items: List[InboundRequest],
+    fmt: str = "records",
+    encoding: str = "json",
+    include_results: bool = False,
+) -> AsyncIterator[bytes]:
+    """Processa `items` e gera as linhas NDJSON (itens conforme terminam + resumo)."""
+    t0 = time.perf_counter()
+    stream = SinkStream(sink_url(), fail_fast=False)
+    valve_batcher = None
+    if not settings.INFER_SERVER_ENABLED:
+        # com o servidor de inferência os lotes entre requisições já são montados lá
+        valve_batcher = MicroBatcher(valves_from_images_bgr, settings.VALVE_BATCH_SIZE, settings.BATCH_INFER_WAIT_MS)
+
+    todo: asyncio.Queue = asyncio.Queue()
+    for pair in enumerate(items):
+        todo.put_nowait(pair)
+    n_workers = max(1, min(settings.BATCH_CONCURRENCY, len(items)))
+    # limitada: sem consumidor (cliente lento), os workers esperam
+    done: asyncio.Queue = asyncio.Queue(maxsize=n_workers)
+
+    async def worker() -> None:
+        while True:
+            try:
+                idx, req = todo.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                result = await run_pipeline(req, fmt, encoding, sink=stream, valve_batcher=valve_batcher)
+            except Exception as e:
+                print(f"[BATCH] FAIL item {idx} {req.Date.isoformat()} {req.Side}: {e}")
+                PIPELINE_RUNS.labels("batch", "error").inc()
+                await done.put((idx, req, None, e, time.perf_counter() - started))
+                continue
+            PIPELINE_RUNS.labels("batch", "ok").inc()
+            if not include_results:
+                result.body = b""
+            await done.put((idx, req, result, None, time.perf_counter() - started))
+
+    workers = [asyncio.create_task(worker(), name=f"batch-worker-{i}") for i in range(n_workers)]
+    ok = failed = processed = 0
+    try:
+        for _ in range(len(items)):
+            item = await done.get()
+            if item[3] is None:
+                ok += 1
+                processed += item[2].processed
+            else:
+                failed += 1
+            yield _item_line(item, include_results)
+        await asyncio.gather(*workers)
+        await stream.close()
+        summary = {
+            "done": True,
+            "total": len(items),
+            "ok": ok,
+            "failed": failed,
+            "processed": processed,
+            "sink": stream.stats(),
+            "elapsed_s": round(time.perf_counter() - t0, 3),
+        }
+        if valve_batcher is not None:
+            summary["valve_batches"] = {"calls": valve_batcher.calls, "inferences": valve_batcher.batches}
+        yield _line(summary)
+    finally:
+        # cliente desconectou ou erro: nada fica rodando em segundo plano
+        for t in workers:
+            t.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await stream.abort()
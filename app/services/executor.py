@@ -0,0 +1,131 @@
+# app/services/executor.py
+"""
+Estágio de execução limitado para a parte CPU-bound do pipeline.
+
+- "cpu":   pool de threads para decode base64/cv2/numpy (liberam o GIL)
+- "infer": pool dedicado para inferência YOLO; threads por padrão ou
+           processos (INFER_POOL_MODE="process"), cada um com seu modelo
+
+Cada estágio limita quantas tarefas podem estar submetidas ao mesmo tempo
+(EXECUTOR_MAX_PENDING). Quem passar do limite espera no event loop, sem
+bloqueá-lo, então /health e outras chamadas continuam sendo atendidas.
+"""
+from __future__ import annotations
+import asyncio
+import multiprocessing as mp
+import threading
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class _Stage:
+    def __init__(self, name: str, factory: Callable[[], Executor], max_pending: int):
+        self.name = name
+        self._factory = factory
+        self._max_pending = max(1, int(max_pending))
+        self._pool: Optional[Executor] = None
+        self._pool_lock = threading.Lock()
+        # semáforo por event loop (TestClient/uvicorn podem usar loops distintos)
+        self._sems: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self.waiting = 0
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_depth = 0
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = self._factory()
+        return self._pool
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        sem = self._sems.get(loop)
+        if sem is None:
+            sem = asyncio.Semaphore(self._max_pending)
+            self._sems[loop] = sem
+        return sem
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        sem = self._semaphore()
+        self.waiting += 1
+        self.max_depth = max(self.max_depth, self.waiting + self.in_flight)
+        try:
+            await sem.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self.submitted += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), partial(fn, *args, **kwargs))
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            sem.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "depth": self.waiting + self.in_flight,
+            "max_depth": self.max_depth,
+            "max_pending": self._max_pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "started": self._pool is not None,
+        }
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _make_cpu_pool() -> Executor:
+    return ThreadPoolExecutor(max_workers=max(1, settings.CPU_POOL_WORKERS), thread_name_prefix="cpu")
+
+
+def _make_infer_pool() -> Executor:
+    workers = max(1, settings.INFER_POOL_WORKERS)
+    if settings.INFER_POOL_MODE.lower() == "process":
+        # spawn: fork depois do torch inicializado não é seguro
+        return ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="infer")
+
+
+_cpu = _Stage("cpu", _make_cpu_pool, settings.EXECUTOR_MAX_PENDING)
+_infer = _Stage("infer", _make_infer_pool, settings.EXECUTOR_MAX_PENDING)
+
+
+async def run_cpu(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Executa decode/numpy/cv2 fora do event loop."""
+    return await _cpu.run(fn, *args, **kwargs)
+
+
+async def run_infer(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Executa inferência no pool dedicado (thread ou processo)."""
+    return await _infer.run(fn, *args, **kwargs)
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    return {"cpu": _cpu.stats(), "infer": _infer.stats()}
+
+
+def shutdown_executors() -> None:
+    _cpu.shutdown()
+    _infer.shutdown()
@@ -1,42 +1,403 @@
+import asyncio
+import random
+from collections import deque
+import time
 import httpx
-import json
 from urllib.parse import urljoin
 from pydantic import TypeAdapter
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Iterable, Iterator, Optional, Tuple
 from app.core.config import settings
-from app.schemas.pipeline import InboundRequest, SourceCollection
+from app.core.metrics import SINK_BATCH_SECONDS, SINK_BATCHES, SINK_BYTES, SINK_RETRIES
+from app.schemas.pipeline import InboundRequest, SourceCollection, SourceCollectionHeader, SourceImage
+from app.services.executor import run_cpu
+from app.services.json_codec import encode_records
+from app.services.source_stream import SourceStreamParser
+
+# ==== cliente HTTP compartilhado (keep-alive) ====
+_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Cliente com pool de conexões reaproveitado entre requisições.
+    Criado sob demanda; o lifespan da app fecha no shutdown.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+        )
+        _client = httpx.AsyncClient(timeout=settings.SINK_TIMEOUT_S, limits=limits, http2=False)
+    return _client
+
+async def close_http_client() -> None:
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.aclose()
+
+
+def _source_params(req: InboundRequest) -> Dict[str, str]:
+    return {"Date": req.Date.isoformat(), "Side": req.Side}
+
+_COLLECTIONS = TypeAdapter(List[SourceCollection])
+
+async def _get_source(req: InboundRequest, extra: Optional[Dict[str, str]] = None) -> httpx.Response:
+    client = get_http_client()
+    params = {**_source_params(req), **(extra or {})}
+    r = await client.get(settings.EXTERNAL_SOURCE_URL, params=params, timeout=settings.SOURCE_TIMEOUT_S)
+    r.raise_for_status()
+    return r
+
+def _parse_collections(data: Any) -> List[SourceCollection]:
+    if isinstance(data, dict):
+        # fonte (e mock) pode devolver uma única coleção em vez de lista
+        data = [data]
+    return _COLLECTIONS.validate_python(data)
 
 async def fetch_from_source(req: InboundRequest) -> List[SourceCollection]:
-    params = {"Date": req.Date.isoformat(), "Side": req.Side}
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.get(settings.EXTERNAL_SOURCE_URL, params=params)
+    r = await _get_source(req)
+    return _parse_collections(r.json())
+
+async def stream_from_source(req: InboundRequest) -> AsyncIterator[Tuple[SourceCollectionHeader, SourceImage]]:
+    """
+    Lê a resposta da fonte em pedaços e entrega uma imagem por vez, assim
+    que ela chega completa; o pico de memória fica perto de uma imagem.
+    """
+    client = get_http_client()
+    parser = SourceStreamParser()
+    async with client.stream(
+        "GET", settings.EXTERNAL_SOURCE_URL,
+        params=_source_params(req), timeout=settings.SOURCE_TIMEOUT_S,
+    ) as r:
         r.raise_for_status()
-        data = r.json()
-        ta = TypeAdapter(List[SourceCollection])
-        return ta.validate_python(data)
+        async for chunk in r.aiter_bytes(settings.SOURCE_STREAM_CHUNK_BYTES):
+            for item in parser.feed(chunk):
+                yield item
+    for item in parser.close():
+        yield item
+
+# ==== busca dividida: páginas (Offset/Limit) ou uma consulta por porta ====
+async def fetch_source_page(req: InboundRequest, extra: Dict[str, str]) -> Tuple[List[SourceCollection], Optional[int]]:
+    """Uma página da fonte e o total anunciado em X-Total-Count (None se a fonte não paginar)."""
+    r = await _get_source(req, extra)
+    total = r.headers.get("X-Total-Count")
+    return _parse_collections(r.json()), int(total) if total else None
+
+async def _iter_pages(
+    req: InboundRequest,
+    pages: Iterable[Dict[str, str]],
+    first: Optional[List[SourceCollection]] = None,
+) -> AsyncIterator[List[SourceCollection]]:
+    """
+    Busca as páginas em paralelo (até SOURCE_MAX_CONCURRENCY adiantadas no
+    cliente compartilhado) e entrega na ordem: o processamento começa na
+    primeira enquanto as seguintes ainda baixam, e a memória fica limitada
+    à janela de páginas. `first` (já baixada) sai antes das demais.
+    """
+    window = max(1, settings.SOURCE_MAX_CONCURRENCY)
+    todo = iter(pages)
+    inflight: deque = deque()
 
+    def _start_next() -> None:
+        extra = next(todo, None)
+        if extra is not None:
+            inflight.append(asyncio.create_task(fetch_source_page(req, extra)))
 
-def build_sink_url() -> str:
+    try:
+        for _ in range(window):
+            _start_next()
+        if first is not None:
+            yield first
+        while inflight:
+            cols, _total = await inflight.popleft()
+            _start_next()
+            yield cols
+    finally:
+        for t in inflight:
+            t.cancel()
+        await asyncio.gather(*inflight, return_exceptions=True)
+
+async def iter_source_pages(req: InboundRequest) -> AsyncIterator[List[SourceCollection]]:
+    """Coleções da fonte por partes, conforme SOURCE_FETCH_MODE ("paged" | "ports")."""
+    if settings.SOURCE_FETCH_MODE.lower() == "ports":
+        async for cols in _iter_pages(req, ({"Port": str(p)} for p in settings.SOURCE_PORTS)):
+            yield cols
+        return
+    size = max(1, settings.SOURCE_PAGE_SIZE)
+    first, total = await fetch_source_page(req, {"Offset": "0", "Limit": str(size)})
+    # sem X-Total-Count a fonte não pagina: a primeira resposta já é tudo
+    rest = ({"Offset": str(off), "Limit": str(size)} for off in range(size, total or 0, size))
+    async for cols in _iter_pages(req, rest, first):
+        yield cols
+
+async def iter_source_images(req: InboundRequest) -> AsyncIterator[Tuple[SourceCollectionHeader, SourceImage]]:
+    """Imagens da fonte conforme SOURCE_FETCH_MODE ("full" | "stream" | "paged" | "ports")."""
+    mode = settings.SOURCE_FETCH_MODE.lower()
+    if mode == "stream":
+        async for item in stream_from_source(req):
+            yield item
+        return
+    if mode in ("paged", "ports"):
+        async for cols in iter_source_pages(req):
+            for col in cols:
+                for im in col.Images:
+                    yield col, im
+        return
+    for col in await fetch_from_source(req):
+        for im in col.Images:
+            yield col, im
+
+
+def build_sink_url(path: Optional[str] = None) -> str:
     base = settings.SINK_BASE_URL
     if not base.endswith("/"):
         base += "/"
-    return urljoin(base, settings.SINK_POST_THERMAL_PATH)
-
-async def post_to_sink_records(records: List[Dict[str, Any]]) -> None:
-    url = build_sink_url()
-    batch_size = getattr(settings, "SINK_BATCH_SIZE", 1)  # 1 = um item por POST
-    async with httpx.AsyncClient(timeout=120, http2=False, headers={"Connection": "close"}) as client:
-        for i in range(0, len(records), batch_size):
-            batch = records[i:i+batch_size]
-            # Pré-serializa JSON de forma estrita (sem NaN/Inf) e compacta
-            try:
-                payload = json.dumps(batch, ensure_ascii=False, separators=(",", ":"), allow_nan=False)
-            except ValueError as ve:
-                # Se houver NaN/Inf, loga e segue pro próximo item
-                print(f"[SINK] JSON serialize error (NaN/Inf?): {ve}")
-                continue
-
-            print(f"[SINK] POST {url} items={len(batch)} (i={i}) bytes={len(payload)}")
-            resp = await client.post(url, content=payload, headers={"Content-Type": "application/json"})
+    return urljoin(base, path or settings.SINK_POST_THERMAL_PATH)
+
+# ==== serialização e lotes do sink ====
+def encode_sink_records(records: Iterable[Dict[str, Any]]) -> List[bytes]:
+    """
+    Pré-serializa cada registro em JSON estrito (sem NaN/Inf) e compacto
+    (json_codec, o mesmo da resposta). Registros inválidos são logados e
+    descartados.
+    """
+    return encode_records(records)
+
+def iter_sink_batches(
+    items: List[bytes],
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> Iterator[Tuple[int, bytes]]:
+    """
+    Agrupa registros já serializados em arrays JSON limitados por quantidade
+    (SINK_BATCH_SIZE) e/ou por bytes (SINK_MAX_BATCH_BYTES; 0 = sem limite).
+    Um registro maior que max_bytes vai sozinho no seu lote.
+    Gera (n_itens, payload).
+    """
+    batcher = SinkBatcher(max_items, max_bytes)
+    yield from batcher.add(items)
+    yield from batcher.flush()
+
+class SinkBatcher:
+    """
+    Versão incremental de iter_sink_batches: recebe os registros aos poucos
+    (p.ex. imagem a imagem) e devolve só os lotes que já fecharam; o resto
+    fica aguardando o próximo add() ou o flush(). Os lotes saem iguais aos
+    de uma chamada única com todos os registros.
+    """
+
+    def __init__(self, max_items: Optional[int] = None, max_bytes: Optional[int] = None) -> None:
+        self.max_items = settings.SINK_BATCH_SIZE if max_items is None else max_items
+        self.max_bytes = settings.SINK_MAX_BATCH_BYTES if max_bytes is None else max_bytes
+        self._batch: List[bytes] = []
+        self._size = 2  # "[" + "]"
+
+    def add(self, items: Iterable[bytes]) -> List[Tuple[int, bytes]]:
+        out: List[Tuple[int, bytes]] = []
+        for frag in items:
+            extra = len(frag) + (1 if self._batch else 0)
+            full = (
+                (self.max_items and len(self._batch) >= self.max_items)
+                or (self.max_bytes and self._size + extra > self.max_bytes)
+            )
+            if self._batch and full:
+                out.append(self._take())
+                extra = len(frag)
+            self._batch.append(frag)
+            self._size += extra
+        return out
+
+    def flush(self) -> List[Tuple[int, bytes]]:
+        return [self._take()] if self._batch else []
+
+    def _take(self) -> Tuple[int, bytes]:
+        batch, self._batch, self._size = self._batch, [], 2
+        return len(batch), b"[" + b",".join(batch) + b"]"
+
+# ==== POST com retry e concorrência limitada ====
+_RETRYABLE_EXC = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+def _backoff_s(attempt: int) -> float:
+    base = settings.SINK_RETRY_BACKOFF_S * (2 ** (attempt - 1))
+    return min(base, settings.SINK_RETRY_BACKOFF_MAX_S) * (0.5 + random.random() / 2)
+
+async def _post_batch(client: httpx.AsyncClient, url: str, idx: int, n: int, payload: bytes) -> None:
+    attempts = max(1, settings.SINK_RETRIES + 1)
+    for attempt in range(1, attempts + 1):
+        if attempt > 1:
+            SINK_RETRIES.inc()
+        SINK_BYTES.inc(len(payload))
+        t0 = time.perf_counter()
+        try:
+            print(f"[SINK] POST {url} items={n} (batch={idx}) bytes={len(payload)}")
+            resp = await client.post(
+                url, content=payload,
+                headers={"Content-Type": "application/json"},
+                timeout=settings.SINK_TIMEOUT_S,
+            )
+        except _RETRYABLE_EXC as e:
+            SINK_BATCH_SECONDS.observe(time.perf_counter() - t0)
+            SINK_BATCHES.labels("error").inc()
+            if attempt >= attempts:
+                raise
+            print(f"[SINK] retry {attempt}/{attempts - 1} batch={idx}: {e.__class__.__name__}")
+        else:
+            SINK_BATCH_SECONDS.observe(time.perf_counter() - t0)
+            SINK_BATCHES.labels(resp.status_code).inc()
             print(f"[SINK] status={resp.status_code} body={resp.text[:200]}")
-            resp.raise_for_status()
+            if resp.status_code < 500 or attempt >= attempts:
+                resp.raise_for_status()
+                return
+            print(f"[SINK] retry {attempt}/{attempts - 1} batch={idx}: status={resp.status_code}")
+        await asyncio.sleep(_backoff_s(attempt))
+
+async def post_sink_batches(
+    batches: Iterable[Tuple[int, bytes]],
+    url: Optional[str] = None,
+    *,
+    fail_fast: bool = True,
+) -> List[Tuple[int, bytes]]:
+    """
+    Envia os lotes com até SINK_MAX_IN_FLIGHT POSTs simultâneos no cliente
+    compartilhado.
+
+    fail_fast=True: na primeira falha definitiva cancela os pendentes e
+    propaga o erro. fail_fast=False: tenta todos e devolve os lotes que
+    falharam (para reenvio sem duplicar os que já foram aceitos).
+    """
+    url = url or build_sink_url()
+    client = get_http_client()
+    sem = asyncio.Semaphore(max(1, settings.SINK_MAX_IN_FLIGHT))
+
+    async def _one(idx: int, n: int, payload: bytes) -> None:
+        async with sem:
+            await _post_batch(client, url, idx, n, payload)
+
+    items = list(batches)
+    tasks = [asyncio.create_task(_one(i, n, p)) for i, (n, p) in enumerate(items)]
+    if not tasks:
+        return []
+    if not fail_fast:
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        failed = [item for item, res in zip(items, results) if isinstance(res, BaseException)]
+        for res in results:
+            if isinstance(res, asyncio.CancelledError):
+                raise res
+        return failed
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    for t in pending:
+        t.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    for t in tasks:
+        if t.done() and not t.cancelled() and t.exception() is not None:
+            raise t.exception()
+    return []
+
+class SinkStream:
+    """
+    Envio incremental ao sink durante o cálculo.
+
+    O pipeline entrega os registros de cada imagem assim que ficam prontos
+    (put_records); os lotes fechados vão para uma fila limitada
+    (SINK_QUEUE_MAX_BATCHES) que SINK_MAX_IN_FLIGHT tarefas esvaziam em
+    paralelo. Com o sink lento a fila enche e put_records() espera
+    (backpressure): a memória fica limitada ao tamanho da fila.
+
+    fail_fast=True: a primeira falha definitiva é propagada no próximo
+    put_records()/close() e os lotes seguintes são descartados.
+    fail_fast=False: envia tudo e close() devolve os lotes que falharam.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        *,
+        fail_fast: bool = True,
+        max_queue: Optional[int] = None,
+        senders: Optional[int] = None,
+    ) -> None:
+        self.url = url or build_sink_url()
+        self.fail_fast = fail_fast
+        self.senders = max(1, senders or settings.SINK_MAX_IN_FLIGHT)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_queue or settings.SINK_QUEUE_MAX_BATCHES))
+        self._batcher = SinkBatcher()
+        self._tasks: List[asyncio.Task] = []
+        self.batches = 0  # lotes enfileirados
+        self._failed: List[Tuple[int, int, bytes]] = []
+        self.error: Optional[BaseException] = None
+        self.sent = 0  # registros aceitos pelo sink
+
+    async def put_records(self, records: List[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        # serializar milhares de registros por imagem não cabe no event loop
+        frags = await run_cpu(encode_sink_records, records)
+        await self.put(frags)
+
+    async def put(self, frags: Iterable[bytes]) -> None:
+        self._check()
+        for n, payload in self._batcher.add(frags):
+            await self._enqueue(n, payload)
+
+    async def close(self) -> List[Tuple[int, bytes]]:
+        """Envia o que sobrou, espera a fila esvaziar e devolve os lotes que falharam."""
+        for n, payload in self._batcher.flush():
+            await self._enqueue(n, payload)
+        for _ in self._tasks:
+            await self._queue.put(None)
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+        self._tasks = []
+        self._check()
+        return [(n, payload) for _, n, payload in sorted(self._failed, key=lambda f: f[0])]
+
+    async def abort(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "sent": self.sent,
+            "failed": len(self._failed),
+        }
+
+    def _check(self) -> None:
+        if self.fail_fast and self.error is not None:
+            raise self.error
+
+    async def _enqueue(self, n: int, payload: bytes) -> None:
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._sender(), name=f"sink-sender-{i}")
+                for i in range(self.senders)
+            ]
+        idx, self.batches = self.batches, self.batches + 1
+        await self._queue.put((idx, n, payload))
+        self._check()
+
+    async def _sender(self) -> None:
+        client = get_http_client()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            idx, n, payload = item
+            if self.fail_fast and self.error is not None:
+                continue  # descarta: a requisição já vai falhar
+            try:
+                await _post_batch(client, self.url, idx, n, payload)
+                self.sent += n
+            except Exception as e:
+                if self.fail_fast:
+                    self.error = self.error or e
+                else:
+                    self._failed.append((idx, n, payload))
+
+async def post_to_sink_records(records: List[Dict[str, Any]], url: Optional[str] = None) -> None:
+    await post_sink_batches(iter_sink_batches(encode_sink_records(records)), url=url)
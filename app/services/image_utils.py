@@ -1,17 +1,65 @@
 # app/services/image_utils.py
-import base64, re, cv2, numpy as np
+import base64, binascii, cv2, numpy as np
 
-_DATA_URL_RE = re.compile(r'^data:.*;base64,', re.IGNORECASE)
+# Decodificação direta no espaço de cor que o consumidor usa:
+#   "bgr"  -> YOLO (ultralytics espera BGR como o cv2)
+#   "gray" -> temperatura; mesmos valores de RGB->GRAY do caminho antigo
+#   "rgb"  -> compatibilidade (base64_to_rgb_ndarray)
+# luma=True em "gray" usa IMREAD_GRAYSCALE (canal Y do JPEG, sem montar a
+# imagem colorida); mais rápido, mas difere de BGR->GRAY onde a cor satura.
+_REDUCED_COLOR = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                  4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+_REDUCED_GRAY = {1: cv2.IMREAD_GRAYSCALE, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+                 4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+DECODE_MODES = ("rgb", "bgr", "gray")
 
-def base64_to_rgb_ndarray(b64: str) -> np.ndarray:
-    # remove prefixo data URL se houver
-    raw = _DATA_URL_RE.sub('', b64.strip())
-    buf = base64.b64decode(raw)
+_DATA_URL_MARK = ";base64,"
+
+
+def _base64_payload(b64: str) -> str:
+    # remove prefixo data URL se houver (fatia, sem regex na string inteira)
+    s = b64.strip()
+    if s[:5].lower() == "data:":
+        i = s.find(_DATA_URL_MARK, 0, 512)
+        if i >= 0:
+            return s[i + len(_DATA_URL_MARK):]
+    return s
+
+
+def decode_base64_image(b64: str, mode: str = "rgb", reduce: int = 1, luma: bool = False) -> np.ndarray:
+    """
+    Base64 (com ou sem prefixo data URL) -> ndarray uint8 em `mode`.
+    reduce = 2/4/8 decodifica já reduzido (IMREAD_REDUCED_*; em JPEG o
+    libjpeg pula o IDCT completo, bem mais barato que decodificar e redimensionar).
+    """
+    if mode not in DECODE_MODES:
+        raise ValueError(f"mode inválido: {mode!r} (use {', '.join(DECODE_MODES)})")
+    reduce = int(reduce or 1)
+    if reduce not in _REDUCED_COLOR:
+        raise ValueError(f"reduce inválido: {reduce} (use 1, 2, 4 ou 8)")
+
+    # a2b_base64 lê o str ASCII direto (b64decode faria mais uma cópia em bytes)
+    try:
+        buf = binascii.a2b_base64(_base64_payload(b64))
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Base64 inválido: {e}") from e
     arr = np.frombuffer(buf, dtype=np.uint8)
-    img_bgr = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-    if img_bgr is None:
+
+    flag = _REDUCED_GRAY[reduce] if mode == "gray" and luma else _REDUCED_COLOR[reduce]
+    img = cv2.imdecode(arr, flag)
+    if img is None:
         raise ValueError("Falha ao decodificar base64 para imagem.")
-    return cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+    if img.ndim == 2:
+        return img if mode == "gray" else cv2.cvtColor(img, cv2.COLOR_GRAY2BGR if mode == "bgr" else cv2.COLOR_GRAY2RGB)
+    if mode == "gray":
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if mode == "rgb":
+        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=img)
+    return img
+
+
+def base64_to_rgb_ndarray(b64: str) -> np.ndarray:
+    return decode_base64_image(b64, "rgb")
 
 
 def bgr_to_base64_png(img_bgr: np.ndarray) -> str:
@@ -19,5 +67,3 @@ def bgr_to_base64_png(img_bgr: np.ndarray) -> str:
     if not ok:
         raise ValueError("Falha ao codificar PNG.")
     return "data:image/png;base64," + base64.b64encode(buf.tobytes()).decode("utf-8")
-
-
@@ -0,0 +1,210 @@
+# app/services/inference_client.py
+"""
+Cliente do servidor de inferência (app/services/inference_server.py).
+
+Com INFER_SERVER_ENABLED=True os workers HTTP não carregam modelos: cada
+frame decodificado é copiado para um bloco `multiprocessing.shared_memory`
+e só o nome do bloco, shape e dtype vão pelo socket. O servidor responde
+com o resultado já pós-processado (valores de válvula, bbox da ROI), e o
+cliente libera o bloco ao receber a resposta.
+
+Uma conexão por processo, com uma thread leitora que resolve os Futures
+por id; várias requisições ficam em voo ao mesmo tempo, o que permite ao
+servidor montar lotes com frames de requisições diferentes.
+"""
+from __future__ import annotations
+import asyncio
+import itertools
+import logging
+import os
+import threading
+from concurrent.futures import Future, InvalidStateError
+from multiprocessing.connection import Client, Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.executor import run_cpu
+
+log = logging.getLogger(__name__)
+
+Address = Union[str, Tuple[str, int]]
+
+TASK_PING = "ping"
+TASK_VALVES = "valves"
+TASK_ROI = "roi"
+
+
+class RemoteInferenceError(RuntimeError):
+    """Erro levantado no servidor ao processar a requisição."""
+
+
+def parse_address(addr: str) -> Address:
+    """'host:porta' -> (host, porta); 'unix:/caminho', '/caminho' ou pipe do Windows -> str."""
+    if addr.startswith("unix:"):
+        return addr[len("unix:"):]
+    if addr.startswith("\\\\") or "/" in addr:
+        return addr
+    host, _, port = addr.rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+
+def server_authkey() -> bytes:
+    return settings.INFER_SERVER_AUTHKEY.encode("utf-8")
+
+
+def _release(shm: Optional[SharedMemory]) -> None:
+    if shm is None:
+        return
+    try:
+        shm.close()
+        shm.unlink()
+    except (FileNotFoundError, OSError):
+        pass
+
+
+class InferenceClient:
+    def __init__(self, address: Address, authkey: bytes) -> None:
+        self.address = address
+        self.authkey = authkey
+        self._conn: Optional[Connection] = None
+        self._lock = threading.Lock()  # conexão, envio e _pending
+        self._pending: Dict[int, Tuple[Future, Optional[SharedMemory]]] = {}
+        self._ids = itertools.count(1)
+
+    def _connect(self) -> Connection:
+        if self._conn is None:
+            conn = Client(self.address, authkey=self.authkey)
+            self._conn = conn
+            threading.Thread(
+                target=self._read_loop, args=(conn,), name="infer-client-reader", daemon=True,
+            ).start()
+        return self._conn
+
+    def submit(self, task: str, frame: Optional[np.ndarray] = None, **params: Any) -> Future:
+        """Envia a requisição e devolve um Future com o resultado (não bloqueia na resposta)."""
+        fut: Future = Future()
+        shm: Optional[SharedMemory] = None
+        meta = None
+        if frame is not None:
+            frame = np.ascontiguousarray(frame)
+            shm = SharedMemory(create=True, size=max(1, frame.nbytes))
+            view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=shm.buf)
+            view[...] = frame
+            del view  # sem referências ao buffer, o bloco pode ser fechado depois
+            meta = (shm.name, frame.shape, frame.dtype.str)
+
+        req_id = next(self._ids)
+        with self._lock:
+            try:
+                conn = self._connect()
+                self._pending[req_id] = (fut, shm)
+                conn.send((task, req_id, os.getpid(), meta, params))
+            except (OSError, EOFError) as e:
+                self._pending.pop(req_id, None)
+                self._drop_locked()
+                _release(shm)
+                raise ConnectionError(f"Servidor de inferência indisponível em {self.address}: {e}") from e
+        return fut
+
+    def _drop_locked(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _read_loop(self, conn: Connection) -> None:
+        while True:
+            try:
+                status, req_id, value = conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                entry = self._pending.pop(req_id, None)
+            if entry is None:
+                continue
+            fut, shm = entry
+            _release(shm)
+            try:
+                if status == "ok":
+                    fut.set_result(value)
+                else:
+                    fut.set_exception(RemoteInferenceError(value))
+            except InvalidStateError:
+                pass  # cancelado (timeout do lado async)
+
+        with self._lock:
+            if self._conn is conn:
+                self._conn = None
+            pending, self._pending = self._pending, {}
+        for fut, shm in pending.values():
+            _release(shm)
+            try:
+                fut.set_exception(ConnectionError("Servidor de inferência desconectou."))
+            except InvalidStateError:
+                pass
+
+    def close(self) -> None:
+        with self._lock:
+            self._drop_locked()
+
+
+_client: Optional[InferenceClient] = None
+_client_lock = threading.Lock()
+
+
+def get_inference_client() -> InferenceClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = InferenceClient(parse_address(settings.INFER_SERVER_ADDRESS), server_authkey())
+    return _client
+
+
+def close_inference_client() -> None:
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
+
+
+# ==== fachada async usada pelo pipeline ====
+async def remote_call(task: str, frame: Optional[np.ndarray] = None, **params: Any) -> Any:
+    client = get_inference_client()
+    # a cópia para a memória compartilhada (MBs) roda no pool de CPU
+    fut = await run_cpu(client.submit, task, frame, **params)
+    return await asyncio.wait_for(asyncio.wrap_future(fut), settings.INFER_SERVER_TIMEOUT_S)
+
+
+async def ping() -> Dict[str, Any]:
+    return await remote_call(TASK_PING)
+
+
+async def remote_valves(imgs_bgr: List[np.ndarray]) -> List[Union[List[float], BaseException]]:
+    """Um envio por frame; o servidor junta em lotes. Falhas voltam como exceção na posição."""
+    return list(await asyncio.gather(
+        *(remote_call(TASK_VALVES, im) for im in imgs_bgr), return_exceptions=True,
+    ))
+
+
+async def remote_roi_bbox(
+    img_bgr: np.ndarray,
+    *,
+    model_path: str,
+    class_name: str,
+    infer_size: Tuple[int, int],
+    use_default_if_none: bool,
+) -> Tuple[Tuple[int, int, int, int], bool]:
+    """Mesmo contrato de temperature.resolve_roi_bbox(..., bgr=True)."""
+    bbox, fallback = await remote_call(
+        TASK_ROI, img_bgr,
+        model_path=model_path, class_name=class_name,
+        infer_size=tuple(infer_size), use_default_if_none=use_default_if_none,
+    )
+    return tuple(bbox), fallback
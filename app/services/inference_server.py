@@ -0,0 +1,280 @@
+# app/services/inference_server.py
+"""
+Servidor de inferência: um processo dono dos modelos YOLO, compartilhado
+por todos os workers HTTP (uvicorn --workers N). A memória dos modelos e
+do torch fica constante ao aumentar os workers, e frames de requisições
+diferentes entram no mesmo lote.
+
+Uso:
+    python -m app.services.inference_server [--address 127.0.0.1:8765]
+
+e nos workers da API: INFER_SERVER_ENABLED=true (mesmos
+INFER_SERVER_ADDRESS / INFER_SERVER_AUTHKEY).
+
+Protocolo (multiprocessing.connection, autenticado por authkey):
+  pedido   (task, req_id, pid, (shm_name, shape, dtype) | None, params)
+  resposta ("ok" | "error", req_id, valor)
+O frame fica num bloco de memória compartilhada criado pelo cliente; aqui
+ele é só mapeado (sem cópia nem pickle) e fechado depois da inferência.
+
+Tarefas: "valves" (valores de válvula, como valves_from_image_bgr),
+"roi" (bbox + fallback, como resolve_roi_bbox) e "ping".
+"""
+from __future__ import annotations
+import argparse
+import logging
+import os
+import queue
+import threading
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Client, Connection, Listener
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.services.angle_service import valves_from_image_bgr, valves_from_images_bgr
+from app.services.inference_client import (
+    TASK_PING, TASK_ROI, TASK_VALVES, Address, parse_address, server_authkey,
+)
+from app.services.model_registry import loaded_models, warmup
+from app.services.temperature import detect_roi_bboxes, roi_bbox_or_fallback
+from app.services.warmup import configured_models
+
+log = logging.getLogger(__name__)
+
+
+class _Peer:
+    """Conexão de um worker HTTP; respostas saem de várias threads."""
+
+    def __init__(self, conn: Connection) -> None:
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def reply(self, req_id: int, status: str, value: Any) -> None:
+        with self.lock:
+            try:
+                self.conn.send((status, req_id, value))
+            except (OSError, EOFError):
+                pass  # cliente saiu; o bloco dele some com ele
+
+
+class _Item:
+    __slots__ = ("peer", "req_id", "shm", "frame", "params")
+
+    def __init__(self, peer: _Peer, req_id: int, shm: SharedMemory, frame: np.ndarray, params: Dict[str, Any]) -> None:
+        self.peer = peer
+        self.req_id = req_id
+        self.shm = shm
+        self.frame = frame
+        self.params = params
+
+    def release(self) -> None:
+        self.frame = None
+        try:
+            self.shm.close()
+        except BufferError:
+            log.warning("Frame %s ainda referenciado; bloco fica aberto", self.req_id)
+
+
+def _attach(meta: Any, client_pid: int) -> tuple[SharedMemory, np.ndarray]:
+    name, shape, dtype = meta
+    shm = SharedMemory(name=name)
+    if client_pid != os.getpid():
+        # o dono do bloco é o cliente (ele faz unlink); sem isso o
+        # resource_tracker daqui apagaria o bloco ao encerrar este processo
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm, np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+class InferenceServer:
+    def __init__(
+        self,
+        address: Address,
+        authkey: bytes,
+        max_batch: Optional[int] = None,
+        batch_wait_ms: Optional[float] = None,
+    ) -> None:
+        self.address = address
+        self.authkey = authkey
+        self.max_batch = max(1, int(max_batch or settings.INFER_SERVER_MAX_BATCH))
+        wait_ms = settings.INFER_SERVER_BATCH_WAIT_MS if batch_wait_ms is None else batch_wait_ms
+        self.batch_wait_s = max(0.0, float(wait_ms)) / 1e3
+        self._queues: Dict[str, "queue.Queue[Optional[_Item]]"] = {TASK_VALVES: queue.Queue(), TASK_ROI: queue.Queue()}
+        self._listener: Optional[Listener] = None
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self.batches = 0
+        self.frames = 0
+
+    # ---- ciclo de vida ----
+    def serve_forever(self) -> None:
+        for task in self._queues:
+            threading.Thread(target=self._batch_loop, args=(task,), name=f"infer-batch-{task}", daemon=True).start()
+        with Listener(self.address, authkey=self.authkey) as listener:
+            self._listener = listener
+            self.address = listener.address
+            self._ready.set()
+            while not self._stop.is_set():
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    if self._stop.is_set():
+                        break
+                    log.warning("Conexão recusada: %s", e)  # p.ex. authkey errada
+                    continue
+                threading.Thread(target=self._serve_conn, args=(conn,), name="infer-conn", daemon=True).start()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def close(self) -> None:
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        for q in self._queues.values():
+            q.put(None)
+        if self._listener is not None and self._ready.is_set():
+            # close() não interrompe um accept() bloqueado em outra thread
+            try:
+                Client(self.address, authkey=self.authkey).close()
+            except Exception:
+                pass
+            self._listener.close()
+
+    # ---- conexões ----
+    def _serve_conn(self, conn: Connection) -> None:
+        peer = _Peer(conn)
+        with conn:
+            while not self._stop.is_set():
+                try:
+                    task, req_id, client_pid, meta, params = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if task == TASK_PING:
+                    peer.reply(req_id, "ok", self.info())
+                    continue
+                q = self._queues.get(task)
+                if q is None or meta is None:
+                    peer.reply(req_id, "error", f"Tarefa inválida: {task!r}")
+                    continue
+                try:
+                    shm, frame = _attach(meta, client_pid)
+                except (OSError, ValueError, TypeError) as e:
+                    peer.reply(req_id, "error", f"Falha ao mapear frame: {e}")
+                    continue
+                q.put(_Item(peer, req_id, shm, frame, params or {}))
+
+    def info(self) -> Dict[str, Any]:
+        return {"pid": os.getpid(), "models": loaded_models(), "batches": self.batches, "frames": self.frames}
+
+    # ---- lotes ----
+    def _next_batch(self, q: "queue.Queue[Optional[_Item]]") -> Optional[List[_Item]]:
+        first = q.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.batch_wait_s
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = q.get_nowait() if remaining <= 0 else q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                q.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _batch_loop(self, task: str) -> None:
+        q = self._queues[task]
+        run = self._run_valves if task == TASK_VALVES else self._run_roi
+        while True:
+            batch = self._next_batch(q)
+            if batch is None:
+                return
+            self.batches += 1
+            self.frames += len(batch)
+            try:
+                results = run(batch)
+            except Exception as e:
+                log.exception("Falha no lote %s (n=%d)", task, len(batch))
+                results = [e] * len(batch)
+            for item, res in zip(batch, results):
+                item.release()
+                if isinstance(res, BaseException):
+                    item.peer.reply(item.req_id, "error", f"{res.__class__.__name__}: {res}")
+                else:
+                    item.peer.reply(item.req_id, "ok", res)
+
+    def _run_valves(self, batch: List[_Item]) -> List[Any]:
+        try:
+            return valves_from_images_bgr([it.frame for it in batch], batch_size=self.max_batch)
+        except Exception as e:
+            log.warning("Lote de válvulas falhou (n=%d), refazendo um a um: %s", len(batch), e)
+        out: List[Any] = []
+        for it in batch:
+            try:
+                out.append(valves_from_image_bgr(it.frame))
+            except Exception as e:
+                out.append(e)
+        return out
+
+    def _run_roi(self, batch: List[_Item]) -> List[Any]:
+        # um lote por combinação de parâmetros (na prática, todos iguais)
+        groups: Dict[tuple, List[int]] = {}
+        for i, it in enumerate(batch):
+            p = it.params
+            key = (p.get("model_path"), p.get("class_name"), tuple(p.get("infer_size") or ()))
+            groups.setdefault(key, []).append(i)
+
+        out: List[Any] = [None] * len(batch)
+        for (model_path, class_name, infer_size), idxs in groups.items():
+            kwargs: Dict[str, Any] = {"model_path": model_path, "bgr": True}
+            if class_name:
+                kwargs["class_name"] = class_name
+            if infer_size:
+                kwargs["infer_size"] = infer_size
+            bboxes = detect_roi_bboxes([batch[i].frame for i in idxs], **kwargs)
+            for i, bbox in zip(idxs, bboxes):
+                it = batch[i]
+                try:
+                    out[i] = roi_bbox_or_fallback(
+                        bbox, it.frame.shape[:2], it.params.get("use_default_if_none", True),
+                    )
+                except ValueError as e:
+                    out[i] = e
+        return out
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Servidor de inferência compartilhado pelos workers da API.")
+    ap.add_argument("--address", default=settings.INFER_SERVER_ADDRESS)
+    ap.add_argument("--no-warmup", action="store_true")
+    args = ap.parse_args(argv)
+    setup_logging()
+
+    if not args.no_warmup:
+        size = (settings.INFER_SIZE_W, settings.INFER_SIZE_H)
+        for name, path in configured_models().items():
+            t0 = time.perf_counter()
+            warmup(path, size)
+            log.info("Modelo %s pronto em %.2fs (%s)", name, time.perf_counter() - t0, path)
+
+    server = InferenceServer(parse_address(args.address), server_authkey())
+    log.info("Servidor de inferência em %s (lote até %d, espera %.1f ms)",
+             args.address, server.max_batch, server.batch_wait_s * 1e3)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
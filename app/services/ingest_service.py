@@ -1,15 +1,23 @@
 # app/services/ingest_service.py
-from typing import Tuple, List, Dict, Any
+from dataclasses import dataclass, field
+from typing import Tuple, List, Dict, Any, Optional
 from datetime import timezone
 from app.core.config import settings
-from app.schemas.pipeline import (
-    InboundRequest, SourceCollection,
-    TemperatureRecord, ValveRecord, MixedResponse
-)
-from app.services.external_client import fetch_from_source, post_to_sink_records
-from app.services.image_utils import base64_to_rgb_ndarray
-from app.services.temperature import to_temperature_vector
-from app.services.angle_service import valves_from_image_rgb
+from app.core.metrics import CACHE_LOOKUPS, IMAGES, RECORDS
+from app.core.timing import StageTimer, stage, timed_aiter
+from app.schemas.pipeline import InboundRequest
+from app.services.external_client import SinkStream, build_sink_url, iter_sink_batches, iter_source_images, post_sink_batches
+from app.services.executor import run_cpu, run_infer
+from app.services.inference_client import remote_roi_bbox, remote_valves
+from app.services.image_utils import decode_base64_image
+from app.services.temperature import resolve_roi_bbox, to_temperature_array
+from app.services.angle_service import valves_from_image_bgr, valves_from_images_bgr
+from app.services.microbatch import MicroBatcher
+from app.services.json_codec import dumps, encode_records, finite_values, response_body, temperature_record_fragments
+from app.services.series_codec import FORMAT_COLUMNAR, build_series, check_encoding
+from app.services.reduction import check_strategy
+from app.services.result_cache import KIND_TEMP, KIND_VALVE, get_result_cache
+from app.services.result_store import StoredRow, get_result_store
 
 def _iso_z(dt):
     # garante UTC e sufixo 'Z'
@@ -24,77 +32,344 @@ def _normalize_side(side: str) -> str:
     mapped = settings.SIDE_MAP.get(side.upper())
     return mapped if mapped else side
 
-async def process_inbound_mixed(
+def _roi_mode() -> bool:
+    return settings.TEMPERATURE_MODE.lower() == "roi"
+
+def _decode_image(b64: str, thermal: bool) -> Any:
+    """
+    Decodifica já no formato do consumidor: cinza para a temperatura no modo
+    "full", BGR para o YOLO (válvulas e detecção de ROI).
+    """
+    if not thermal:
+        return decode_base64_image(b64, "bgr", settings.VALVE_DECODE_REDUCE)
+    if _roi_mode():
+        return decode_base64_image(b64, "bgr", settings.THERMAL_DECODE_REDUCE)
+    return decode_base64_image(b64, "gray", settings.THERMAL_DECODE_REDUCE, luma=settings.THERMAL_DECODE_LUMA)
+
+async def _infer_valves(
+    imgs_bgr: List[Any], names: List[str], batcher: Optional[MicroBatcher] = None,
+) -> List[Optional[List[float]]]:
+    """
+    Inferência de válvulas em lote; se o lote falhar, refaz imagem a imagem
+    para que uma imagem ruim não zere as demais. Falha de uma imagem -> None.
+    Com `batcher`, o lote pode ser juntado ao de outros pipelines concorrentes.
+    """
+    if not imgs_bgr:
+        return []
+    if settings.INFER_SERVER_ENABLED:
+        out = []
+        for name, res in zip(names, await remote_valves(imgs_bgr)):
+            if isinstance(res, BaseException):
+                print(f"[PIPE] FAIL valve {name}: {res}")
+                res = None
+            out.append(res)
+        return out
+    try:
+        if batcher is not None:
+            return await batcher(imgs_bgr)
+        return await run_infer(valves_from_images_bgr, imgs_bgr)
+    except Exception as e:
+        print(f"[PIPE] FAIL valve batch n={len(imgs_bgr)}: {e}")
+
+    out: List[List[float]] = []
+    for img_bgr, name in zip(imgs_bgr, names):
+        try:
+            out.append(await run_infer(valves_from_image_bgr, img_bgr))
+        except Exception as e:
+            print(f"[PIPE] FAIL valve {name}: {e}")
+            out.append(None)
+    return out
+
+async def _temperatures_for_image(img: Any) -> Any:
+    """
+    Vetor float32 da imagem térmica conforme TEMPERATURE_MODE:
+    "full" usa a imagem inteira (já em cinza); "roi" detecta a ROI na imagem
+    BGR (pool de inferência) e converte só ela (pool de CPU).
+    """
+    bbox = None
+    if _roi_mode() and settings.INFER_SERVER_ENABLED:
+        bbox, _fallback = await remote_roi_bbox(
+            img,
+            model_path=settings.ROI_MODEL_PATH,
+            class_name=settings.ROI_CLASS_NAME,
+            infer_size=(settings.INFER_SIZE_W, settings.INFER_SIZE_H),
+            use_default_if_none=settings.ROI_FALLBACK_CENTER,
+        )
+    elif _roi_mode():
+        bbox, _fallback = await run_infer(
+            resolve_roi_bbox,
+            img,
+            model_path=settings.ROI_MODEL_PATH,
+            class_name=settings.ROI_CLASS_NAME,
+            infer_size=(settings.INFER_SIZE_W, settings.INFER_SIZE_H),
+            use_default_if_none=settings.ROI_FALLBACK_CENTER,
+            bgr=True,
+        )
+    return await run_cpu(
+        to_temperature_array,
+        img,
+        settings.TEMP_MIN_DEFAULT,
+        settings.TEMP_MAX_DEFAULT,
+        settings.MAX_TEMPERATURE_VECTOR_LEN,
+        bbox=bbox,
+        bgr=True,
+        reduction=settings.TEMPERATURE_REDUCTION,
+        target_len=settings.REDUCTION_TARGET_LEN,
+    )
+
+async def _cache_lookup(cache, b64: str, kind: str) -> Tuple[Any, Any]:
+    if cache is None:
+        return None, None
+    try:
+        key, value = await run_cpu(cache.lookup, b64, kind)
+    except Exception as e:
+        print(f"[CACHE] FAIL lookup: {e}")
+        return None, None
+    CACHE_LOOKUPS.labels(kind, "miss" if value is None else "hit").inc()
+    return key, value
+
+async def _cache_put(cache, key: Any, value: Any) -> None:
+    if cache is None or key is None:
+        return
+    if cache.disk_dir is None:
+        cache.put(key, value)
+    else:
+        await run_cpu(cache.put, key, value)
+
+def _sink_columnar() -> bool:
+    return settings.SINK_TEMPERATURE_FORMAT.lower() == FORMAT_COLUMNAR
+
+def sink_url() -> str:
+    """URL de temperatura do sink conforme SINK_TEMPERATURE_FORMAT."""
+    path = settings.SINK_POST_THERMAL_SERIES_PATH if _sink_columnar() else settings.SINK_POST_THERMAL_PATH
+    return build_sink_url(path)
+
+def _encode_thermal(
+    ts: str, side: str, port: int, section: int, temps: Any,
+    columnar: bool, encoding: str, sink_columnar: bool, sink_encoding: str,
+) -> Tuple[bytes, int, List[bytes]]:
+    """
+    Serializa a imagem uma vez: (pedaço da resposta, nº de registros,
+    fragmentos do sink). Com "records" nos dois lados os fragmentos da
+    resposta e do sink são os mesmos objetos.
+    """
+    temps = finite_values(temps)
+    records = None
+    if columnar:
+        chunk = dumps(build_series(ts, side, port, section, temps, encoding).model_dump())
+        n = 1
+    else:
+        records = temperature_record_fragments(ts, side, port, section, temps)
+        chunk, n = b",".join(records), len(records)
+    sink_frags = _sink_fragments(ts, side, port, section, temps, sink_columnar, sink_encoding, records)
+    return chunk, n, sink_frags
+
+def _sink_fragments(
+    ts: str, side: str, port: int, section: int, temps: Any,
+    sink_columnar: bool, sink_encoding: str, records: Optional[List[bytes]] = None,
+) -> List[bytes]:
+    if sink_columnar:
+        series = build_series(ts, side, port, section, temps, sink_encoding)
+        return [dumps(series.model_dump(exclude_none=True))]
+    return records if records is not None else temperature_record_fragments(ts, side, port, section, temps)
+
+@dataclass
+class PipelineResult:
+    body: bytes  # JSON de MixedResponse/ColumnarResponse, já serializado
+    processed: int
+    sink_url: str
+    sink_fragments: List[bytes] = field(default_factory=list)
+
+async def run_pipeline(
     req: InboundRequest,
-) -> Tuple[MixedResponse, int]:
-    collections: List[SourceCollection] = await fetch_from_source(req)
+    fmt: str = "records",
+    encoding: str = "json",
+    timer: Optional[StageTimer] = None,
+    sink: Optional[SinkStream] = None,
+    valve_batcher: Optional[MicroBatcher] = None,
+) -> PipelineResult:
+    """
+    Busca, decodifica e calcula tudo.
+    Com `sink`, os registros de cada imagem vão para o SinkStream assim que
+    ficam prontos (o envio corre em paralelo); sem ele, ficam acumulados em
+    PipelineResult.sink_fragments para deliver_to_sink().
+    A resposta sai pronta em PipelineResult.body (json_codec), sem montar
+    modelos pydantic por valor; os registros do sink são os mesmos bytes.
+    fmt="records": um TemperatureRecord por valor (padrão, compatível).
+    fmt="columnar": um TemperatureSeries por imagem, vetor empacotado em `encoding`.
+    O formato enviado ao sink é independente (SINK_TEMPERATURE_FORMAT).
+    `timer` recebe o tempo de cada estágio (fetch, cache, decode, temperature,
+    build, valves, sink); as mesmas medições vão para /api/v1/metrics.
+    """
+    columnar = fmt == FORMAT_COLUMNAR
+    encoding = check_encoding(encoding)
+    sink_columnar = _sink_columnar()
+    sink_encoding = check_encoding(settings.SINK_TEMPERATURE_ENCODING)
+    check_strategy(settings.TEMPERATURE_REDUCTION)
 
-    flat_temps: List[TemperatureRecord] = []
-    flat_valves: List[ValveRecord] = []
-    sink_records: List[Dict[str, Any]] = []
+    temp_chunks: List[bytes] = []
+    sink_fragments: List[bytes] = []
     processed_total = 0
 
-    for col in collections:
-        ts = _iso_z(col.Date)
-        for im in col.Images:
+    # imagens de válvula são coletadas e inferidas em lote no final;
+    # valve_meta guarda (ts, side, port, section, nome, chave do cache, valores do cache)
+    valve_imgs: List[Any] = []
+    valve_meta: List[Tuple[str, str, int, int, str, Any, Any]] = []
+    cache = get_result_cache()
+    store = get_result_store()
+    store_rows: List[StoredRow] = []
+
+    header = None
+    ts = ""
+    async for col, im in timed_aiter(iter_source_images(req), timer, "fetch"):
+        if col is not header:
+            header, ts = col, _iso_z(col.Date)
+
+        thermal = _should_process(im.IsThermal)
+        with stage(timer, "cache"):
+            key, cached = await _cache_lookup(cache, im.Base64String, KIND_TEMP if thermal else KIND_VALVE)
+
+        img = None
+        if cached is None:
             try:
-                img_rgb = base64_to_rgb_ndarray(im.Base64String)
+                with stage(timer, "decode"):
+                    img = await run_cpu(_decode_image, im.Base64String, thermal)
             except Exception as e:
                 print(f"[PIPE] FAIL decode {im.Name}: {e}")
+                IMAGES.labels("thermal" if thermal else "valve", "failed").inc()
                 continue
 
-            side = _normalize_side(im.Side)
-            port = int(im.Port)
-            section = im.Section
+        side = _normalize_side(im.Side)
+        port = int(im.Port)
+        section = im.Section
 
-            if _should_process(im.IsThermal):
+        if thermal:
+            temps = cached
+            if temps is None:
                 try:
-                    temps = to_temperature_vector(
-                        img_rgb,
-                        settings.TEMP_MIN_DEFAULT,
-                        settings.TEMP_MAX_DEFAULT,
-                        settings.MAX_TEMPERATURE_VECTOR_LEN,
-                    )
+                    with stage(timer, "temperature"):
+                        temps = await _temperatures_for_image(img)
+                    with stage(timer, "cache"):
+                        await _cache_put(cache, key, temps)
                 except Exception as e:
                     print(f"[PIPE] FAIL temp {im.Name}: {e}")
-                    temps = []
-
-                if temps:
-                    for t in temps:
-                        rec = TemperatureRecord(
-                            Timestamp=ts,
-                            Side=side,
-                            Port=port,
-                            Section=section,
-                            Temperature=float(t),
-                        )
-                        flat_temps.append(rec)
-                        sink_records.append(rec.model_dump())
-                    processed_total += 1
+                    temps = None
+
+            if temps is not None and temps.size:
+                with stage(timer, "build"):
+                    chunk, n_records, image_sink = await run_cpu(
+                        _encode_thermal, ts, side, port, section, temps,
+                        columnar, encoding, sink_columnar, sink_encoding,
+                    )
+                temp_chunks.append(chunk)
+                processed_total += 1
+                if store is not None:
+                    store_rows.append(StoredRow(ts, side, port, section, True, im.Name, temperatures=temps))
+                if sink is None:
+                    sink_fragments.extend(image_sink)
                 else:
-                    print(f"[PIPE] SKIP temp {im.Name}: empty temps")
+                    # espera aqui se a fila do sink estiver cheia (backpressure)
+                    with stage(timer, "sink"):
+                        await sink.put(image_sink)
+                IMAGES.labels("thermal", "ok" if cached is None else "cached").inc()
+                RECORDS.labels("series" if columnar else "temperature").inc(n_records)
             else:
-                try:
-                    vals = valves_from_image_rgb(img_rgb) 
-                except Exception as e:
-                    print(f"[PIPE] FAIL valve {im.Name}: {e}")
-                    vals = []
-
-                v1 = float(vals[0]) if len(vals) > 0 else None
-                v2 = float(vals[1]) if len(vals) > 1 else None
-                v3 = float(vals[2]) if len(vals) > 2 else None
-
-                flat_valves.append(
-                    ValveRecord(
-                        Timestamp=ts,
-                        Side=side,
-                        Port=port,
-                        Section=section,
-                        Valve_1=v1, Valve_2=v2, Valve_3=v3,
-                    )
-                )
+                print(f"[PIPE] SKIP temp {im.Name}: empty temps")
+                IMAGES.labels("thermal", "failed").inc()
+        else:
+            if cached is None:
+                valve_imgs.append(img)
+            valve_meta.append((ts, side, port, section, im.Name, key, cached))
+
+    pending = [m for m in valve_meta if m[6] is None]
+    with stage(timer, "valves"):
+        inferred = await _infer_valves(valve_imgs, [m[4] for m in pending], valve_batcher)
+    valve_imgs.clear()
+    with stage(timer, "cache"):
+        for m, vals in zip(pending, inferred):
+            if vals is not None:
+                await _cache_put(cache, m[5], vals)
+    inferred_iter = iter(inferred)
+    valve_vals = [m[6] if m[6] is not None else (next(inferred_iter) or []) for m in valve_meta]
+
+    for vals in inferred:
+        IMAGES.labels("valve", "failed" if vals is None else "ok").inc()
+    IMAGES.labels("valve", "cached").inc(len(valve_meta) - len(pending))
+    RECORDS.labels("valve").inc(len(valve_meta))
 
-    if sink_records:
-        await post_to_sink_records(sink_records)
+    valve_records = []
+    for (ts, side, port, section, name, *_), vals in zip(valve_meta, valve_vals):
+        v1 = float(vals[0]) if len(vals) > 0 else None
+        v2 = float(vals[1]) if len(vals) > 1 else None
+        v3 = float(vals[2]) if len(vals) > 2 else None
+        # mesmos campos e ordem de ValveRecord
+        valve_records.append({
+            "Timestamp": ts, "Side": side, "Port": port, "Section": section,
+            "Valve_1": v1, "Valve_2": v2, "Valve_3": v3,
+        })
+        if store is not None:
+            store_rows.append(StoredRow(ts, side, port, section, False, name, valves=[v1, v2, v3]))
+
+    with stage(timer, "build"):
+        body = response_body(temp_chunks, encode_records(valve_records))
+    if store is not None and store_rows:
+        try:
+            with stage(timer, "store"):
+                await run_cpu(store.save, req.Date, req.Side, store_rows)
+        except Exception as e:
+            print(f"[STORE] FAIL save {req.Side} {req.Date.isoformat()}: {e}")
+    return PipelineResult(body, processed_total, sink.url if sink is not None else sink_url(), sink_fragments)
+
+def _replay_fragments(rows: List[StoredRow]) -> List[bytes]:
+    sink_columnar = _sink_columnar()
+    sink_encoding = check_encoding(settings.SINK_TEMPERATURE_ENCODING)
+    frags: List[bytes] = []
+    for r in rows:
+        if r.IsThermal and r.temperatures is not None and r.temperatures.size:
+            temps = finite_values(r.temperatures)
+            frags.extend(_sink_fragments(r.Timestamp, r.Side, r.Port, r.Section, temps, sink_columnar, sink_encoding))
+    return frags
+
+async def replay_to_sink(rows: List[StoredRow]) -> Dict[str, int]:
+    """
+    Reenvia ao sink as temperaturas de um resultado guardado (result_store),
+    no formato de sink atual, sem buscar nem recalcular nada.
+    """
+    frags = await run_cpu(_replay_fragments, rows)
+    failed = await post_sink_batches(iter_sink_batches(frags), url=sink_url(), fail_fast=False)
+    return {
+        "images": sum(1 for r in rows if r.IsThermal),
+        "records": len(frags),
+        "failed_batches": len(failed),
+    }
+
+async def deliver_to_sink(result: PipelineResult, timer: Optional[StageTimer] = None) -> None:
+    if result.sink_fragments:
+        with stage(timer, "sink"):
+            await post_sink_batches(iter_sink_batches(result.sink_fragments), url=result.sink_url)
+
+async def process_inbound_mixed(
+    req: InboundRequest,
+    fmt: str = "records",
+    encoding: str = "json",
+    timer: Optional[StageTimer] = None,
+) -> Tuple[bytes, int]:
+    """
+    Pipeline completo e síncrono: calcula, envia ao sink e devolve o corpo
+    JSON da resposta já serializado.
+    Com SINK_STREAMING o envio acontece durante o cálculo; falha do sink
+    interrompe o pipeline.
+    """
+    if not settings.SINK_STREAMING:
+        result = await run_pipeline(req, fmt, encoding, timer)
+        await deliver_to_sink(result, timer)
+        return result.body, result.processed
 
-    return MixedResponse(temperatures=flat_temps, valves=flat_valves), processed_total
\ No newline at end of file
+    stream = SinkStream(sink_url())
+    try:
+        result = await run_pipeline(req, fmt, encoding, timer, sink=stream)
+        with stage(timer, "sink"):
+            await stream.close()
+    finally:
+        await stream.abort()
+    return result.body, result.processed
\ No newline at end of file
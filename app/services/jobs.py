@@ -0,0 +1,215 @@
+# app/services/jobs.py
+"""
+Modo assíncrono do /process-images.
+
+POST devolve um job_id na hora; o trabalho entra numa fila limitada
+(JOB_QUEUE_MAX) consumida por JOB_WORKERS workers no event loop da app.
+O cálculo (run_pipeline) e a entrega ao sink são separados: o resultado
+fica disponível assim que é calculado, e o envio ao sink segue em segundo
+plano com novas tentativas só para os lotes que falharam, sem falhar o job.
+Com SINK_STREAMING o primeiro envio já acontece durante o cálculo.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.metrics import PIPELINE_RUNS
+from app.schemas.job import JobState, JobStatus, SinkState
+from app.schemas.pipeline import InboundRequest
+from app.services.external_client import SinkStream, iter_sink_batches, post_sink_batches
+from app.services.ingest_service import PipelineResult, run_pipeline, sink_url
+
+log = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, req: InboundRequest, fmt: str, encoding: str) -> None:
+        self.id = uuid.uuid4().hex
+        self.req = req
+        self.fmt = fmt
+        self.encoding = encoding
+        self.status = JobState.QUEUED
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.result: Optional[PipelineResult] = None
+        self.error: Optional[str] = None
+        self.sink_status = SinkState.PENDING
+        self.sink_attempts = 0
+        self.sink_error: Optional[str] = None
+
+    def to_status(self) -> JobStatus:
+        return JobStatus(
+            job_id=self.id,
+            status=self.status,
+            Date=self.req.Date,
+            Side=self.req.Side,
+            format=self.fmt,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            processed=self.result.processed if self.result else None,
+            error=self.error,
+            sink_status=self.sink_status,
+            sink_attempts=self.sink_attempts,
+            sink_error=self.sink_error,
+        )
+
+
+class JobManager:
+    def __init__(self) -> None:
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._sink_tasks: Set[asyncio.Task] = set()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    # ---- ciclo de vida (lifespan) ----
+    async def start(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=max(1, settings.JOB_QUEUE_MAX))
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"job-worker-{i}")
+            for i in range(max(1, settings.JOB_WORKERS))
+        ]
+
+    async def stop(self) -> None:
+        tasks = self._workers + list(self._sink_tasks)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._sink_tasks.clear()
+        self._queue = None
+
+    # ---- API ----
+    def submit(self, req: InboundRequest, fmt: str = "records", encoding: str = "json") -> Job:
+        if self._queue is None:
+            raise RuntimeError("JobManager não iniciado (lifespan da app).")
+        self._prune()
+        job = Job(req, fmt, encoding)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Fila de jobs cheia ({self._queue.maxsize}).")
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status.value] = counts.get(job.status.value, 0) + 1
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "workers": len(self._workers),
+            "sink_deliveries": len(self._sink_tasks),
+            "jobs": counts,
+        }
+
+    # ---- internos ----
+    async def _worker(self, idx: int) -> None:
+        assert self._queue is not None
+        while True:
+            job: Job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = JobState.RUNNING
+        job.started_at = datetime.now(timezone.utc)
+        stream: Optional[SinkStream] = None
+        if settings.SINK_STREAMING:
+            stream = SinkStream(sink_url(), fail_fast=False)
+            job.sink_status = SinkState.DELIVERING
+        try:
+            job.result = await run_pipeline(job.req, job.fmt, job.encoding, sink=stream)
+        except asyncio.CancelledError:
+            if stream is not None:
+                await stream.abort()
+            raise
+        except Exception as e:
+            if stream is not None:
+                await stream.abort()
+            log.exception("Job %s falhou", job.id)
+            PIPELINE_RUNS.labels("job", "error").inc()
+            job.status = JobState.FAILED
+            job.error = f"{e.__class__.__name__}: {e}"
+            job.sink_status = SinkState.SKIPPED
+            job.finished_at = datetime.now(timezone.utc)
+            return
+        PIPELINE_RUNS.labels("job", "ok").inc()
+        job.status = JobState.DONE
+        job.finished_at = datetime.now(timezone.utc)
+
+        if stream is None and not job.result.sink_fragments:
+            job.sink_status = SinkState.SKIPPED
+            return
+        task = asyncio.create_task(self._deliver(job, stream), name=f"job-sink-{job.id}")
+        self._sink_tasks.add(task)
+        task.add_done_callback(self._sink_tasks.discard)
+
+    async def _deliver(self, job: Job, stream: Optional[SinkStream] = None) -> None:
+        result = job.result
+        assert result is not None
+        pending: List[Tuple[int, bytes]] = []
+        if stream is None:
+            pending = list(iter_sink_batches(result.sink_fragments))
+            # os lotes já têm os bytes; a resposta do job continua com o body
+            result.sink_fragments = []
+        job.sink_status = SinkState.DELIVERING
+        attempts = max(1, settings.JOB_SINK_RETRIES + 1)
+        for attempt in range(1, attempts + 1):
+            job.sink_attempts = attempt
+            try:
+                if stream is not None:
+                    # 1ª tentativa: o envio feito durante o cálculo
+                    pending = await stream.close()
+                    if not stream.batches:
+                        job.sink_status = SinkState.SKIPPED
+                        return
+                    stream = None
+                else:
+                    pending = await post_sink_batches(pending, url=result.sink_url, fail_fast=False)
+                err = None if not pending else f"{len(pending)} lote(s) falharam"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                err = f"{e.__class__.__name__}: {e}"
+            if not pending:
+                job.sink_status = SinkState.DELIVERED
+                job.sink_error = None
+                return
+            job.sink_error = err
+            print(f"[JOB] sink {job.id} tentativa {attempt}/{attempts}: {err}")
+            if attempt < attempts:
+                await asyncio.sleep(settings.JOB_SINK_RETRY_BACKOFF_S * attempt)
+        job.sink_status = SinkState.FAILED
+
+    def _prune(self) -> None:
+        now = datetime.now(timezone.utc)
+        finished = (JobState.DONE, JobState.FAILED)
+        for job_id in list(self._jobs):
+            job = self._jobs[job_id]
+            if job.status not in finished or job.sink_status == SinkState.DELIVERING:
+                continue
+            too_many = len(self._jobs) > settings.JOB_MAX_RETAINED
+            expired = job.finished_at and (now - job.finished_at).total_seconds() > settings.JOB_RESULT_TTL_S
+            if too_many or expired:
+                del self._jobs[job_id]
+
+
+job_manager = JobManager()
@@ -0,0 +1,92 @@
+# app/services/json_codec.py
+"""
+Serialização JSON única para a resposta do /process-images e para o sink.
+
+Registros de temperatura saem de um molde por imagem (prefixo fixo com
+Timestamp/Side/Port/Section + repr do float), sem criar um modelo pydantic
+nem um dict por valor; o mesmo fragmento vai para o corpo da resposta e
+para os lotes do sink. Os demais objetos (válvulas, séries) usam orjson se
+estiver instalado, senão o json da stdlib.
+
+Estrito nos dois caminhos: NaN/Inf nunca viram JSON (ValueError em dumps;
+os valores de temperatura não finitos são descartados antes).
+"""
+from __future__ import annotations
+import json
+import math
+from typing import Any, Iterable, List
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # opcional
+    orjson = None
+
+
+def _check_finite(obj: Any) -> None:
+    # orjson grava NaN/Inf como null; aqui vira erro, como allow_nan=False
+    if isinstance(obj, float):
+        if not math.isfinite(obj):
+            raise ValueError(f"Out of range float values are not JSON compliant: {obj!r}")
+    elif isinstance(obj, dict):
+        for v in obj.values():
+            _check_finite(v)
+    elif isinstance(obj, (list, tuple)):
+        for v in obj:
+            _check_finite(v)
+
+
+def dumps(obj: Any) -> bytes:
+    """JSON compacto e estrito (sem NaN/Inf), em UTF-8."""
+    if orjson is not None:
+        _check_finite(obj)
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+def encode_records(records: Iterable[Any]) -> List[bytes]:
+    """Um fragmento por registro; registros inválidos são logados e descartados."""
+    out: List[bytes] = []
+    for rec in records:
+        try:
+            out.append(dumps(rec))
+        except (TypeError, ValueError) as ve:
+            print(f"[JSON] serialize error (NaN/Inf?): {ve}")
+    return out
+
+
+def finite_values(temps: np.ndarray) -> np.ndarray:
+    """Remove NaN/Inf do vetor (com log); sem cópia quando já é todo finito."""
+    mask = np.isfinite(temps)
+    if mask.all():
+        return temps
+    print(f"[JSON] drop {int(temps.size - mask.sum())} non-finite temperature(s)")
+    return temps[mask]
+
+
+def temperature_record_fragments(
+    ts: str, side: str, port: int, section: int, temps: np.ndarray,
+) -> List[bytes]:
+    """
+    Um TemperatureRecord serializado por valor, com o mesmo texto que
+    json.dumps daria ao dict equivalente. `temps` precisa ser finito.
+    """
+    head = dumps({"Timestamp": ts, "Side": side, "Port": port, "Section": section})
+    prefix = head[:-1].decode("utf-8") + ',"Temperature":'
+    return [f"{prefix}{t!r}}}".encode("utf-8") for t in temps.tolist()]
+
+
+def json_array(fragments: Iterable[bytes]) -> bytes:
+    return b"[" + b",".join(fragments) + b"]"
+
+
+def response_body(temperature_chunks: Iterable[bytes], valve_fragments: Iterable[bytes]) -> bytes:
+    """
+    Corpo de MixedResponse/ColumnarResponse a partir de pedaços já
+    serializados; cada item de `temperature_chunks` pode conter vários
+    registros separados por vírgula (um pedaço por imagem).
+    """
+    temps = b",".join(c for c in temperature_chunks if c)
+    return b'{"temperatures":[' + temps + b'],"valves":' + json_array(valve_fragments) + b"}"
+
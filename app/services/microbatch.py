@@ -0,0 +1,69 @@
+# app/services/microbatch.py
+"""
+Micro-lotes de inferência entre requisições concorrentes.
+
+Cada pipeline infere as suas imagens de válvula num lote só; com vários
+pipelines rodando ao mesmo tempo (endpoint de lote), as chamadas que chegam
+dentro de `wait_ms` são juntadas numa inferência única, até `max_batch`
+frames, e cada chamador recebe a sua fatia do resultado, na ordem.
+"""
+from __future__ import annotations
+import asyncio
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+from app.services.executor import run_infer
+
+
+class MicroBatcher:
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_batch: int, wait_ms: float) -> None:
+        self.fn = fn
+        self.max_batch = max(1, int(max_batch))
+        self.wait_s = max(0.0, float(wait_ms)) / 1e3
+        self._pending: List[Tuple[List[Any], asyncio.Future]] = []
+        self._count = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.calls = 0    # chamadas recebidas
+        self.batches = 0  # inferências feitas
+
+    async def __call__(self, items: List[Any]) -> List[Any]:
+        if not items:
+            return []
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((items, fut))
+        self._count += len(items)
+        self.calls += 1
+        if self._count >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.wait_s, self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._count = self._pending, [], 0
+        if not pending:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending: List[Tuple[List[Any], asyncio.Future]]) -> None:
+        frames = [x for items, _ in pending for x in items]
+        self.batches += 1
+        try:
+            out = await run_infer(self.fn, frames)
+        except Exception as e:
+            # cada chamador decide o fallback (p.ex. refazer imagem a imagem)
+            for _, fut in pending:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        pos = 0
+        for items, fut in pending:
+            if not fut.done():
+                fut.set_result(out[pos:pos + len(items)])
+            pos += len(items)
@@ -0,0 +1,87 @@
+# app/services/model_registry.py
+"""
+Registro único dos modelos YOLO do processo (ROI, ângulo, ...).
+
+- carregamento preguiçoso, protegido por lock: chamadas concorrentes ao
+  mesmo caminho carregam os pesos uma vez só
+- `model_lease(path)`: acesso exclusivo ao modelo durante a inferência
+  (o objeto YOLO do ultralytics não é thread-safe)
+- `warmup(path)`: carrega e roda uma inferência dummy
+
+ultralytics (e com ele torch/torchvision/matplotlib) só é importado em
+`_load`, na primeira inferência; importar app.main não paga esse custo.
+Os demais módulos devem pegar modelos daqui e nunca importar ultralytics
+no topo (tests/test_import_time.py garante).
+"""
+from __future__ import annotations
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from ultralytics import YOLO
+
+
+class _Entry:
+    __slots__ = ("model", "load_lock", "use_lock")
+
+    def __init__(self) -> None:
+        self.model: Optional["YOLO"] = None
+        self.load_lock = threading.Lock()
+        self.use_lock = threading.Lock()
+
+
+_entries: Dict[str, _Entry] = {}
+_registry_lock = threading.Lock()
+
+
+def _key(model_path: str) -> str:
+    return str(Path(model_path))
+
+
+def _entry(model_path: str) -> _Entry:
+    key = _key(model_path)
+    with _registry_lock:
+        e = _entries.get(key)
+        if e is None:
+            e = _entries[key] = _Entry()
+        return e
+
+
+def _load(model_path: str) -> "YOLO":
+    from ultralytics import YOLO
+    return YOLO(model_path)
+
+
+def get_model(model_path: str) -> "YOLO":
+    """Modelo carregado (uma vez por processo) para `model_path`."""
+    e = _entry(model_path)
+    if e.model is None:
+        with e.load_lock:
+            if e.model is None:
+                e.model = _load(_key(model_path))
+    return e.model
+
+
+@contextmanager
+def model_lease(model_path: str) -> Iterator["YOLO"]:
+    """Uso exclusivo do modelo enquanto o bloco `with` roda a inferência."""
+    e = _entry(model_path)
+    model = get_model(model_path)
+    with e.use_lock:
+        yield model
+
+
+def warmup(model_path: str, size: Tuple[int, int]) -> None:
+    """Carrega o modelo e roda uma inferência em imagem preta `size` = (w, h)."""
+    w, h = int(size[0]), int(size[1])
+    with model_lease(model_path) as model:
+        model(np.zeros((h, w, 3), dtype=np.uint8), verbose=False)
+
+
+def loaded_models() -> Dict[str, bool]:
+    with _registry_lock:
+        return {k: e.model is not None for k, e in _entries.items()}
@@ -0,0 +1,99 @@
+# app/services/reduction.py
+"""
+Redução do vetor de temperaturas de uma imagem (TEMPERATURE_REDUCTION).
+
+  "stride"   -> ravel()[::stride] até MAX_TEMPERATURE_VECTOR_LEN (padrão,
+                compatível; pode perder pontos quentes e amostra por linha)
+  "area"     -> média por bloco (cv2.resize INTER_AREA) numa grade com o
+                aspecto da região; erro ≤ amplitude dentro de cada bloco
+  "minmax"   -> grade de blocos, [min, max] de cada um (ordem de linha);
+                o mínimo e o máximo globais saem exatos
+  "quantile" -> quantis em probabilidades uniformes de 0 a 1 (inverted_cdf):
+                o primeiro é o mínimo e o último o máximo, exatos
+
+As estratégias novas devolvem até `target_len` valores (REDUCTION_TARGET_LEN).
+A região chega como cinza uint8 + LUT (caminho normal, ver temperature.py) ou
+já em float; com LUT o trabalho é feito nos níveis de cinza e só o
+resultado passa pela LUT (a LUT é linear e crescente no nível).
+"""
+from __future__ import annotations
+import math
+
+import cv2
+import numpy as np
+
+STRATEGIES = ("stride", "area", "minmax", "quantile")
+
+
+def check_strategy(strategy: str) -> str:
+    s = (strategy or "stride").lower()
+    if s not in STRATEGIES:
+        raise ValueError(f"Redução inválida: {strategy!r} (use {', '.join(STRATEGIES)})")
+    return s
+
+
+def grid_shape(h: int, w: int, budget: int) -> tuple[int, int]:
+    """(linhas, colunas) com linhas*colunas ≤ budget e aspecto próximo de h x w."""
+    budget = max(1, int(budget))
+    gh = max(1, min(h, int(round(math.sqrt(budget * h / float(w))))))
+    gw = max(1, min(w, budget // gh))
+    gh = max(1, min(h, budget // gw))
+    return gh, gw
+
+
+def _levels_to_temps(values: np.ndarray, lut: np.ndarray | None) -> np.ndarray:
+    if lut is None:
+        return np.ascontiguousarray(values, dtype=np.float32).reshape(-1)
+    if values.dtype == np.uint8:
+        return lut.take(values.reshape(-1))
+    # médias de nível (não inteiras): interpolação linear na LUT
+    return np.interp(values.reshape(-1), np.arange(256), lut).astype(np.float32)
+
+
+def reduce_area(region: np.ndarray, lut: np.ndarray | None, target_len: int) -> np.ndarray:
+    h, w = region.shape[:2]
+    gh, gw = grid_shape(h, w, target_len)
+    if (gh, gw) == (h, w):
+        return _levels_to_temps(region, lut)
+    pooled = cv2.resize(region.astype(np.float32), (gw, gh), interpolation=cv2.INTER_AREA)
+    return _levels_to_temps(pooled, lut)
+
+
+def reduce_minmax(region: np.ndarray, lut: np.ndarray | None, target_len: int) -> np.ndarray:
+    h, w = region.shape[:2]
+    gh, gw = grid_shape(h, w, max(1, target_len // 2))
+    th, tw = -(-h // gh), -(-w // gw)
+    gh, gw = -(-h // th), -(-w // tw)
+    # borda replicada: não altera o min/max dos blocos da borda
+    padded = np.pad(region, ((0, gh * th - h), (0, gw * tw - w)), mode="edge")
+    tiles = padded.reshape(gh, th, gw, tw)
+    out = np.empty((gh, gw, 2), dtype=region.dtype)
+    out[..., 0] = tiles.min(axis=(1, 3))
+    out[..., 1] = tiles.max(axis=(1, 3))
+    return _levels_to_temps(out, lut)
+
+
+def _quantile_probs(n: int) -> np.ndarray:
+    return np.linspace(0.0, 1.0, max(2, int(n)))
+
+
+def reduce_quantile(region: np.ndarray, lut: np.ndarray | None, target_len: int) -> np.ndarray:
+    probs = _quantile_probs(target_len)
+    if lut is None or region.dtype != np.uint8:
+        q = np.quantile(region, probs, method="inverted_cdf")
+        return _levels_to_temps(q, lut)
+    # uint8: histograma de 256 níveis em vez de ordenar os pixels
+    cdf = np.cumsum(np.bincount(region.reshape(-1), minlength=256))
+    ranks = np.maximum(1, np.ceil(probs * cdf[-1]))
+    levels = np.searchsorted(cdf, ranks, side="left").astype(np.uint8)
+    return lut.take(levels)
+
+
+_REDUCERS = {"area": reduce_area, "minmax": reduce_minmax, "quantile": reduce_quantile}
+
+
+def reduce_region(region: np.ndarray, lut: np.ndarray | None, strategy: str, target_len: int) -> np.ndarray:
+    """Vetor float32 da região pela estratégia (exceto "stride", que fica em temperature.py)."""
+    if region.size == 0:
+        return np.empty(0, dtype=np.float32)
+    return _REDUCERS[check_strategy(strategy)](region, lut, target_len)
@@ -0,0 +1,238 @@
+# app/services/result_cache.py
+"""
+Cache de resultados por conteúdo da imagem.
+
+A fonte devolve os mesmos frames (mesmo Base64String) em retries e polls
+sobrepostos. A chave é um hash blake2b do payload base64 + as settings que
+afetam o resultado (faixa de temperatura, modo, modelo, ...), então um hit
+pula decode, temperatura e inferência de válvula.
+
+- memória: LRU com TTL e teto em bytes (RESULT_CACHE_MAX_BYTES)
+- disco (opcional, RESULT_CACHE_DIR): um arquivo por chave, consultado no
+  miss da memória; .npy para vetores de temperatura, .json para válvulas
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.core.config import settings
+
+KIND_TEMP = "temp"
+KIND_VALVE = "valve"
+
+Value = Union[np.ndarray, List[float]]
+
+
+def _settings_fingerprint(kind: str) -> str:
+    if kind == KIND_VALVE:
+        parts: Tuple[Any, ...] = (kind, settings.ANGLE_MODEL_PATH, settings.VALVE_DECODE_REDUCE)
+    else:
+        roi = settings.TEMPERATURE_MODE.lower() == "roi"
+        parts = (
+            kind, settings.TEMP_MIN_DEFAULT, settings.TEMP_MAX_DEFAULT,
+            settings.MAX_TEMPERATURE_VECTOR_LEN, settings.TEMPERATURE_MODE.lower(),
+            settings.ROI_MODEL_PATH if roi else "",
+            settings.ROI_CLASS_NAME if roi else "",
+            (settings.INFER_SIZE_W, settings.INFER_SIZE_H) if roi else "",
+            settings.ROI_FALLBACK_CENTER if roi else "",
+            settings.THERMAL_DECODE_REDUCE,
+            settings.THERMAL_DECODE_LUMA and not roi,
+            settings.TEMPERATURE_REDUCTION.lower(),
+            settings.REDUCTION_TARGET_LEN if settings.TEMPERATURE_REDUCTION.lower() != "stride" else "",
+        )
+    return repr(parts)
+
+
+def cache_key(b64: str, kind: str) -> str:
+    """Hash do payload + settings relevantes (rodar no pool de CPU: imagens têm MBs)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(_settings_fingerprint(kind).encode("utf-8"))
+    h.update(b"\0")
+    h.update(b64.encode("ascii", "ignore"))
+    return f"{kind}-{h.hexdigest()}"
+
+
+def _nbytes(value: Value) -> int:
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes) + 128
+    return 8 * len(value) + 64
+
+
+class ResultCache:
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl_s: float,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 0,
+    ) -> None:
+        self.max_bytes = int(max_bytes)
+        self.ttl_s = float(ttl_s)
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = int(disk_max_bytes)
+        self._items: "OrderedDict[str, Tuple[float, int, Value]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.expired = 0
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    # ---- memória ----
+    def get(self, key: str) -> Optional[Value]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                expires, size, value = item
+                if expires >= now:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._items[key]
+                self._bytes -= size
+                self.expired += 1
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._mem_put(key, value)
+        return value
+
+    def lookup(self, b64: str, kind: str) -> Tuple[str, Optional[Value]]:
+        """Hash + get numa chamada só (um salto para o pool de CPU)."""
+        key = cache_key(b64, kind)
+        return key, self.get(key)
+
+    def put(self, key: str, value: Value) -> None:
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False  # compartilhado entre requisições
+        else:
+            value = list(value)
+        self._mem_put(key, value)
+        self._disk_put(key, value)
+
+    def _mem_put(self, key: str, value: Value) -> None:
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (time.monotonic() + self.ttl_s, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._items:
+                _, (_, sz, _) = self._items.popitem(last=False)
+                self._bytes -= sz
+                self.evictions += 1
+
+    # ---- disco ----
+    def _disk_path(self, key: str) -> Optional[Path]:
+        if self.disk_dir is None:
+            return None
+        ext = ".npy" if key.startswith(KIND_TEMP) else ".json"
+        return self.disk_dir / f"{key}{ext}"
+
+    def _disk_get(self, key: str) -> Optional[Value]:
+        path = self._disk_path(key)
+        if path is None:
+            return None
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_s:
+                path.unlink(missing_ok=True)
+                return None
+            if path.suffix == ".npy":
+                return np.load(path, allow_pickle=False)
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _disk_put(self, key: str, value: Value) -> None:
+        path = self._disk_path(key)
+        if path is None:
+            return
+        tmp = path.with_name(path.name + ".tmp")
+        try:
+            if isinstance(value, np.ndarray):
+                with open(tmp, "wb") as f:
+                    np.save(f, value, allow_pickle=False)
+            else:
+                tmp.write_text(json.dumps(value), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[CACHE] FAIL disk write {path.name}: {e}")
+            return
+        with self._lock:
+            self._disk_writes += 1
+            prune = self.disk_max_bytes > 0 and self._disk_writes % 50 == 0
+        if prune:
+            self._disk_prune()
+
+    def _disk_prune(self) -> None:
+        files = []
+        for p in self.disk_dir.glob("*-*.*"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        total = sum(f[1] for f in files)
+        for _, size, p in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "disk": str(self.disk_dir) if self.disk_dir else None,
+            }
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Cache do processo, ou None se RESULT_CACHE_ENABLED=False."""
+    global _cache
+    if not settings.RESULT_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(
+                    max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+                    ttl_s=settings.RESULT_CACHE_TTL_S,
+                    disk_dir=settings.RESULT_CACHE_DIR or None,
+                    disk_max_bytes=settings.RESULT_CACHE_DISK_MAX_BYTES,
+                )
+    return _cache
+
+
+def result_cache_stats() -> Optional[Dict[str, Any]]:
+    return _cache.stats() if _cache is not None else None
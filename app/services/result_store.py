@@ -0,0 +1,234 @@
+# app/services/result_store.py
+"""
+Armazenamento local dos resultados calculados (RESULT_STORE_ENABLED).
+
+Um arquivo por execução, chaveado pelo Date/Side da requisição (as chaves
+de AggregatedPayload); cada linha é uma imagem com as chaves de
+StoredImage (Port, Section, IsThermal, Name) e o vetor de temperaturas ou
+os valores de válvula. O índice (Date, Side) -> arquivo fica em memória,
+montado a partir dos nomes dos arquivos, então a consulta é um lookup +
+a leitura de um arquivo pequeno.
+
+Formatos (RESULT_STORE_FORMAT):
+  "parquet" -> polars, colunar comprimido (zstd)
+  "npy"     -> vetores concatenados num .npy lido com mmap + .json com
+               metadados e offsets; só numpy
+  "auto"    -> parquet se o polars estiver instalado, senão npy
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+try:
+    import polars as pl
+except ImportError:  # opcional
+    pl = None
+
+FORMATS = ("auto", "parquet", "npy")
+
+
+@dataclass
+class StoredRow:
+    Timestamp: str
+    Side: str
+    Port: int
+    Section: int
+    IsThermal: bool
+    Name: str
+    temperatures: Optional[np.ndarray] = None  # float32, imagens térmicas
+    valves: Optional[List[Optional[float]]] = None
+
+
+def store_key(date: datetime, side: str) -> str:
+    """Nome do arquivo (sem extensão) de um Date/Side; Date normalizado para UTC."""
+    utc = date.astimezone(timezone.utc)
+    return f"{side.upper()}_{utc.strftime('%Y%m%dT%H%M%S%fZ')}"
+
+
+def _resolve_format(fmt: str) -> str:
+    f = (fmt or "auto").lower()
+    if f not in FORMATS:
+        raise ValueError(f"Formato inválido: {fmt!r} (use {', '.join(FORMATS)})")
+    if f == "auto":
+        return "parquet" if pl is not None else "npy"
+    if f == "parquet" and pl is None:
+        raise RuntimeError("RESULT_STORE_FORMAT=parquet requer o pacote polars.")
+    return f
+
+
+def _matches(row: Dict[str, Any], port: Optional[int], section: Optional[int]) -> bool:
+    return (port is None or row["Port"] == port) and (section is None or row["Section"] == section)
+
+
+class ResultStore:
+    def __init__(self, root: str, fmt: str = "auto") -> None:
+        self.root = Path(root)
+        self.format = _resolve_format(fmt)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._index: Dict[str, Path] = {}
+        self._lock = threading.Lock()
+        self.writes = 0
+        self.reads = 0
+        for p in self.root.iterdir():
+            if p.suffix in (".parquet", ".json"):
+                self._index[p.stem] = p
+
+    # ---- escrita ----
+    def save(self, date: datetime, side: str, rows: List[StoredRow]) -> Path:
+        """Grava (ou substitui) o resultado do Date/Side; escrita atômica."""
+        key = store_key(date, side)
+        if self.format == "parquet":
+            path = self._write_parquet(key, rows)
+        else:
+            path = self._write_npy(key, rows)
+        with self._lock:
+            self._index[key] = path
+            self.writes += 1
+        return path
+
+    def _write_parquet(self, key: str, rows: List[StoredRow]) -> Path:
+        path = self.root / f"{key}.parquet"
+        tmp = path.with_name(path.name + ".tmp")
+        df = pl.DataFrame(
+            {
+                "Timestamp": [r.Timestamp for r in rows],
+                "Side": [r.Side for r in rows],
+                "Port": [r.Port for r in rows],
+                "Section": [r.Section for r in rows],
+                "IsThermal": [r.IsThermal for r in rows],
+                "Name": [r.Name for r in rows],
+                "Temperatures": [None if r.temperatures is None else r.temperatures.tolist() for r in rows],
+                "Valves": [r.valves for r in rows],
+            },
+            schema={
+                "Timestamp": pl.Utf8, "Side": pl.Utf8, "Port": pl.Int32, "Section": pl.Int32,
+                "IsThermal": pl.Boolean, "Name": pl.Utf8,
+                "Temperatures": pl.List(pl.Float32), "Valves": pl.List(pl.Float64),
+            },
+        )
+        df.write_parquet(tmp, compression="zstd")
+        os.replace(tmp, path)
+        return path
+
+    def _write_npy(self, key: str, rows: List[StoredRow]) -> Path:
+        meta, chunks, offset = [], [], 0
+        for r in rows:
+            n = 0 if r.temperatures is None else int(r.temperatures.size)
+            if n:
+                chunks.append(np.asarray(r.temperatures, dtype=np.float32))
+            meta.append({
+                "Timestamp": r.Timestamp, "Side": r.Side, "Port": r.Port, "Section": r.Section,
+                "IsThermal": r.IsThermal, "Name": r.Name,
+                "offset": offset, "count": n, "valves": r.valves,
+            })
+            offset += n
+        data = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.float32)
+        npy, path = self.root / f"{key}.npy", self.root / f"{key}.json"
+        # .npy antes do .json: o .json é o que entra no índice
+        with open(npy.with_name(npy.name + ".tmp"), "wb") as f:
+            np.save(f, data, allow_pickle=False)
+        os.replace(npy.with_name(npy.name + ".tmp"), npy)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps({"rows": meta}), encoding="utf-8")
+        os.replace(tmp, path)
+        return path
+
+    # ---- leitura ----
+    def load(
+        self,
+        date: datetime,
+        side: str,
+        port: Optional[int] = None,
+        section: Optional[int] = None,
+    ) -> Optional[List[StoredRow]]:
+        """Linhas do Date/Side (opcionalmente só de uma Port/Section); None se não houver."""
+        with self._lock:
+            path = self._index.get(store_key(date, side))
+        if path is None:
+            return None
+        try:
+            rows = self._read_parquet(path, port, section) if path.suffix == ".parquet" else self._read_npy(path, port, section)
+        except FileNotFoundError:
+            with self._lock:
+                self._index.pop(path.stem, None)
+            return None
+        with self._lock:
+            self.reads += 1
+        return rows
+
+    def _read_parquet(self, path: Path, port: Optional[int], section: Optional[int]) -> List[StoredRow]:
+        if pl is None:
+            raise RuntimeError(f"{path.name} requer o pacote polars.")
+        df = pl.read_parquet(path)
+        if port is not None:
+            df = df.filter(pl.col("Port") == port)
+        if section is not None:
+            df = df.filter(pl.col("Section") == section)
+        return [
+            StoredRow(
+                Timestamp=r["Timestamp"], Side=r["Side"], Port=r["Port"], Section=r["Section"],
+                IsThermal=r["IsThermal"], Name=r["Name"],
+                temperatures=None if r["Temperatures"] is None else np.asarray(r["Temperatures"], dtype=np.float32),
+                valves=r["Valves"],
+            )
+            for r in df.iter_rows(named=True)
+        ]
+
+    def _read_npy(self, path: Path, port: Optional[int], section: Optional[int]) -> List[StoredRow]:
+        meta = json.loads(path.read_text(encoding="utf-8"))["rows"]
+        data = np.load(path.with_suffix(".npy"), mmap_mode="r", allow_pickle=False)
+        out = []
+        for r in meta:
+            if not _matches(r, port, section):
+                continue
+            temps = None
+            if r["count"]:
+                temps = np.array(data[r["offset"]:r["offset"] + r["count"]], dtype=np.float32)
+            out.append(StoredRow(
+                Timestamp=r["Timestamp"], Side=r["Side"], Port=r["Port"], Section=r["Section"],
+                IsThermal=r["IsThermal"], Name=r["Name"], temperatures=temps, valves=r["valves"],
+            ))
+        return out
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return sorted(self._index)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "dir": str(self.root),
+                "format": self.format,
+                "entries": len(self._index),
+                "writes": self.writes,
+                "reads": self.reads,
+            }
+
+
+_store: Optional[ResultStore] = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> Optional[ResultStore]:
+    """Store do processo, ou None se RESULT_STORE_ENABLED=False."""
+    global _store
+    if not settings.RESULT_STORE_ENABLED:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ResultStore(settings.RESULT_STORE_DIR, settings.RESULT_STORE_FORMAT)
+    return _store
+
+
+def result_store_stats() -> Optional[Dict[str, Any]]:
+    return _store.stats() if _store is not None else None
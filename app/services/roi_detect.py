@@ -1,20 +1,28 @@
 import numpy as np, cv2
-from ultralytics import YOLO
 from app.core.config import settings
+from app.services.model_registry import get_model, model_lease
 
 class ROIBoxDetector:
     def __init__(self, model_path: str | None = None, class_name: str | None = None, size_w: int | None = None, size_h: int | None = None):
-        self.model = YOLO(model_path or settings.ROI_MODEL_PATH)
+        # modelo vem do registro compartilhado (não carrega uma cópia por instância)
+        self.model_path = model_path or settings.ROI_MODEL_PATH
         self.class_name = class_name or settings.ROI_CLASS_NAME
         self.tw = int(size_w or settings.INFER_SIZE_W)
         self.th = int(size_h or settings.INFER_SIZE_H)
 
+    @property
+    def model(self):
+        return get_model(self.model_path)
+
     def detect_bbox(self, img_rgb):
-        H, W = img_rgb.shape[:2]
-        img_bgr = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR)
+        return self.detect_bbox_bgr(cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR))
+
+    def detect_bbox_bgr(self, img_bgr):
+        H, W = img_bgr.shape[:2]
         resized = cv2.resize(img_bgr, (self.tw, self.th), interpolation=cv2.INTER_AREA)
 
-        r0 = self.model(resized)[0]
+        with model_lease(self.model_path) as model:
+            r0 = model(resized)[0]
         if r0.masks is None:
             return None
 
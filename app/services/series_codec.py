@@ -0,0 +1,91 @@
+# app/services/series_codec.py
+"""
+Formato colunar de temperaturas: um registro por imagem com o vetor
+empacotado, em vez de um TemperatureRecord por pixel.
+
+Encodings:
+  "json" -> Temperatures: [float, ...]
+  "f32"  -> Data: base64 de float32 little-endian
+  "f16"  -> Data: base64 de float16 little-endian (erro ≤ 0,25 °C na faixa 98..550)
+"""
+from __future__ import annotations
+import base64
+from typing import Optional, Sequence, Union
+import numpy as np
+
+from app.schemas.pipeline import TemperatureSeries
+
+FORMAT_RECORDS = "records"
+FORMAT_COLUMNAR = "columnar"
+FORMATS = (FORMAT_RECORDS, FORMAT_COLUMNAR)
+
+ENCODINGS = {"json": None, "f32": "<f4", "f16": "<f2"}
+
+# Accept: application/vnd.vivix.columnar+json[; encoding=f32]
+COLUMNAR_MEDIA_TYPE = "application/vnd.vivix.columnar+json"
+
+Values = Union[Sequence[float], np.ndarray]
+
+
+def check_encoding(encoding: str) -> str:
+    enc = (encoding or "json").lower()
+    if enc not in ENCODINGS:
+        raise ValueError(f"Encoding inválido: {encoding!r} (use {', '.join(ENCODINGS)})")
+    return enc
+
+
+def build_series(
+    ts: str, side: str, port: int, section: int, values: Values, encoding: str = "json",
+) -> TemperatureSeries:
+    enc = check_encoding(encoding)
+    dtype = ENCODINGS[enc]
+    if dtype is None:
+        temps = values.tolist() if isinstance(values, np.ndarray) else [float(v) for v in values]
+        return TemperatureSeries(
+            Timestamp=ts, Side=side, Port=port, Section=section,
+            Count=len(temps), Encoding=enc, Temperatures=temps,
+        )
+    arr = np.asarray(values, dtype=dtype)
+    return TemperatureSeries(
+        Timestamp=ts, Side=side, Port=port, Section=section,
+        Count=int(arr.size), Encoding=enc,
+        Data=base64.b64encode(arr.tobytes()).decode("ascii"),
+    )
+
+
+def decode_series(series: TemperatureSeries) -> np.ndarray:
+    """Inverso de build_series (útil para o consumidor e para testes)."""
+    enc = check_encoding(series.Encoding)
+    dtype = ENCODINGS[enc]
+    if dtype is None:
+        return np.asarray(series.Temperatures or [], dtype=np.float64)
+    arr = np.frombuffer(base64.b64decode(series.Data or ""), dtype=dtype)
+    if arr.size != series.Count:
+        raise ValueError(f"Count={series.Count} mas Data tem {arr.size} valores.")
+    return arr.astype(np.float32)
+
+
+def negotiate_format(fmt: Optional[str], accept: Optional[str]) -> str:
+    """Query param tem prioridade; depois o header Accept; padrão = records."""
+    if fmt:
+        f = fmt.lower()
+        if f not in FORMATS:
+            raise ValueError(f"Formato inválido: {fmt!r} (use {', '.join(FORMATS)})")
+        return f
+    if accept and COLUMNAR_MEDIA_TYPE in accept.lower():
+        return FORMAT_COLUMNAR
+    return FORMAT_RECORDS
+
+
+def negotiate_encoding(encoding: Optional[str], accept: Optional[str]) -> str:
+    if encoding:
+        return check_encoding(encoding)
+    if accept:
+        for part in accept.lower().split(","):
+            if COLUMNAR_MEDIA_TYPE not in part:
+                continue
+            for param in part.split(";")[1:]:
+                k, _, v = param.strip().partition("=")
+                if k == "encoding" and v:
+                    return check_encoding(v.strip())
+    return "json"
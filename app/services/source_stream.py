@@ -0,0 +1,230 @@
+# app/services/source_stream.py
+"""
+Parser incremental da resposta do GET da fonte.
+
+Aceita `[ {Side, Date, Images:[...]}, ... ]` ou um único objeto coleção e
+emite (SourceCollectionHeader, SourceImage) à medida que cada imagem chega
+completa, sem montar a resposta inteira em memória. Cada imagem é validada
+direto dos bytes com `SourceImage.model_validate_json`.
+
+Se Side/Date vierem depois de "Images" no objeto, as imagens daquela coleção
+ficam retidas até o fim dela (caso raro; a fonte manda Side, Date, Images).
+"""
+from __future__ import annotations
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.schemas.pipeline import SourceCollectionHeader, SourceImage
+
+_WS = b" \t\r\n"
+_STRUCT_RE = re.compile(rb'["{}\[\]]')
+_SCALAR_END_RE = re.compile(rb'[,}\]\s]')
+
+# estados
+_START, _TOP_ITEM, _TOP_SEP, _KEY, _COLON, _VALUE, _COL_SEP, _IMG_ITEM, _IMG_SEP, _DONE = range(10)
+
+Item = Tuple[SourceCollectionHeader, SourceImage]
+
+
+class SourceStreamParser:
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._pos = 0
+        self._state = _START
+        self._top_is_array = False
+        self._key: Optional[str] = None
+        self._header: Dict[str, Any] = {}
+        self._header_obj: Optional[SourceCollectionHeader] = None
+        self._pending: List[SourceImage] = []
+        # varredura retomável de um valor composto: [início, posição, profundidade, em_string]
+        self._scan: Optional[List[Any]] = None
+
+    # ---- API ----
+    def feed(self, chunk: bytes) -> List[Item]:
+        if self._pos:
+            del self._buf[:self._pos]
+            if self._scan is not None:
+                self._scan[0] -= self._pos
+                self._scan[1] -= self._pos
+            self._pos = 0
+        self._buf += chunk
+        return self._run(eof=False)
+
+    def close(self) -> List[Item]:
+        out = self._run(eof=True)
+        if self._state != _DONE:
+            raise ValueError("Resposta da fonte truncada ou JSON inválido.")
+        return out
+
+    # ---- máquina de estados ----
+    def _skip_ws(self) -> bool:
+        buf, n = self._buf, len(self._buf)
+        while self._pos < n and buf[self._pos] in _WS:
+            self._pos += 1
+        return self._pos < n
+
+    def _expect(self, allowed: bytes) -> int:
+        c = self._buf[self._pos]
+        if c not in allowed:
+            raise ValueError(f"JSON inesperado na posição {self._pos}: {chr(c)!r}")
+        self._pos += 1
+        return c
+
+    def _run(self, eof: bool) -> List[Item]:
+        out: List[Item] = []
+        while self._state != _DONE:
+            if not self._skip_ws():
+                break
+            st = self._state
+            if st == _START:
+                c = self._expect(b"[{")
+                if c == ord("["):
+                    self._top_is_array = True
+                    self._state = _TOP_ITEM
+                else:
+                    self._begin_collection()
+            elif st == _TOP_ITEM:
+                c = self._expect(b"{]")
+                if c == ord("]"):
+                    self._state = _DONE
+                else:
+                    self._begin_collection()
+            elif st == _TOP_SEP:
+                c = self._expect(b",]")
+                self._state = _TOP_ITEM if c == ord(",") else _DONE
+            elif st == _KEY:
+                if self._buf[self._pos] == ord("}"):
+                    self._pos += 1
+                    out.extend(self._end_collection())
+                    continue
+                end = self._value_end(eof)
+                if end is None:
+                    break
+                self._key = json.loads(bytes(self._buf[self._pos:end]))
+                self._pos = end
+                self._state = _COLON
+            elif st == _COLON:
+                self._expect(b":")
+                self._state = _VALUE
+            elif st == _VALUE:
+                if self._key == "Images":
+                    self._expect(b"[")
+                    self._state = _IMG_ITEM
+                    continue
+                end = self._value_end(eof)
+                if end is None:
+                    break
+                self._header[self._key] = json.loads(bytes(self._buf[self._pos:end]))
+                self._pos = end
+                self._state = _COL_SEP
+            elif st == _COL_SEP:
+                c = self._expect(b",}")
+                if c == ord(","):
+                    self._state = _KEY
+                else:
+                    out.extend(self._end_collection())
+            elif st == _IMG_ITEM:
+                if self._buf[self._pos] == ord("]"):
+                    self._pos += 1
+                    self._state = _COL_SEP
+                    continue
+                end = self._value_end(eof)
+                if end is None:
+                    break
+                img = SourceImage.model_validate_json(bytes(self._buf[self._pos:end]))
+                self._pos = end
+                self._state = _IMG_SEP
+                header = self._ready_header()
+                if header is not None and not self._pending:
+                    out.append((header, img))
+                else:
+                    self._pending.append(img)
+            elif st == _IMG_SEP:
+                c = self._expect(b",]")
+                self._state = _IMG_ITEM if c == ord(",") else _COL_SEP
+        return out
+
+    def _begin_collection(self) -> None:
+        self._header = {}
+        self._header_obj = None
+        self._pending = []
+        self._state = _KEY
+
+    def _end_collection(self) -> List[Item]:
+        header = SourceCollectionHeader.model_validate(self._header)
+        out = [(header, img) for img in self._pending]
+        self._pending = []
+        self._state = _TOP_SEP if self._top_is_array else _DONE
+        return out
+
+    def _ready_header(self) -> Optional[SourceCollectionHeader]:
+        if self._header_obj is None and "Side" in self._header and "Date" in self._header:
+            self._header_obj = SourceCollectionHeader.model_validate(self._header)
+        return self._header_obj
+
+    # ---- delimitação de valores ----
+    def _value_end(self, eof: bool) -> Optional[int]:
+        """
+        Fim (exclusivo) do valor JSON que começa em self._pos, ou None se
+        ainda não chegou inteiro. Strings são puladas com find(), então o
+        custo por byte de base64 é o de uma busca em C.
+        """
+        buf, start = self._buf, self._pos
+        first = buf[start]
+        if first == ord('"'):
+            return self._string_end(start + 1)
+        if first not in b"{[":
+            m = _SCALAR_END_RE.search(buf, start)
+            if m is None:
+                return len(buf) if eof else None
+            return m.start()
+
+        scan = self._scan
+        if scan is None or scan[0] != start:
+            scan = self._scan = [start, start, 0, False]
+        _, pos, depth, in_str = scan
+        n = len(buf)
+        while pos < n:
+            if in_str:
+                end = self._string_end(pos)
+                if end is None:
+                    pos = n
+                    break
+                pos, in_str = end, False
+                continue
+            m = _STRUCT_RE.search(buf, pos)
+            if m is None:
+                pos = n
+                break
+            c = buf[m.start()]
+            pos = m.end()
+            if c == ord('"'):
+                in_str = True
+            elif c in b"{[":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    self._scan = None
+                    return pos
+        scan[1], scan[2], scan[3] = pos, depth, in_str
+        return None
+
+    def _string_end(self, pos: int) -> Optional[int]:
+        """Posição logo após a aspa que fecha a string aberta antes de `pos`."""
+        buf = self._buf
+        while True:
+            q = buf.find(b'"', pos)
+            if q < 0:
+                return None
+            # barras antes da aspa; fora de strings JSON não há '\\', então
+            # dá para voltar além de `pos` sem sair da string
+            bs = 0
+            k = q - 1
+            while k >= 0 and buf[k] == 0x5C:
+                bs += 1
+                k -= 1
+            if bs % 2 == 0:
+                return q + 1
+            pos = q + 1
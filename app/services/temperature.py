@@ -4,6 +4,8 @@ import os
 from pathlib import Path
 import numpy as np
 import cv2
+from app.services.model_registry import get_model, model_lease
+from app.services.reduction import check_strategy, reduce_region
 
 # (opcional) tenta ler path do settings se existir
 try:
@@ -39,24 +41,94 @@ def _resolve_default_model_path() -> str:
     # último recurso: retorna o último candidato como string mesmo
     return str(_DEF_MODEL_CANDIDATES[-1])
 
-# ==== MODELO (cache) ====
-_ROI_MODEL_CACHE: dict[str, "YOLO"] = {}
-
+# ==== MODELO (registro compartilhado) ====
 def _get_yolo(model_path: str):
-    from ultralytics import YOLO
-    mp = str(Path(model_path))
-    mdl = _ROI_MODEL_CACHE.get(mp)
-    if mdl is None:
-        mdl = YOLO(mp)
-        _ROI_MODEL_CACHE[mp] = mdl
-    return mdl
-
-# ==== TEMPERATURA (como já tinha) ====
-def build_temperature_matrix_linear(img_rgb: np.ndarray, t_min: float, t_max: float) -> np.ndarray:
-    g = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2GRAY).astype(np.float32)
-    norm = cv2.normalize(g, None, 0.0, 1.0, cv2.NORM_MINMAX)
+    return get_model(model_path)
+
+# ==== TEMPERATURA ====
+# A normalização min-max de uma imagem cinza uint8 só produz até 256 valores
+# distintos, então a conversão inteira vira uma LUT de 256 entradas aplicada
+# apenas nos pixels que realmente saem (recorte/amostragem antes da conversão).
+def _to_gray(img: np.ndarray, bgr: bool = False) -> np.ndarray:
+    if img.ndim == 2:
+        return img
+    if img.shape[2] == 1:
+        return img[:, :, 0]
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY if bgr else cv2.COLOR_RGB2GRAY)
+
+def temperature_lut(g_min: float, g_max: float, t_min: float, t_max: float) -> np.ndarray:
+    """
+    LUT float32 de 256 entradas: nível de cinza -> temperatura, equivalente a
+    cv2.normalize(NORM_MINMAX) em [0, 1] seguido de t_min + norm * (t_max - t_min).
+    Imagem constante (g_max == g_min) mapeia tudo para t_min, como o normalize.
+    """
+    levels = np.arange(256, dtype=np.float64)
+    span = float(g_max) - float(g_min)
+    norm = (levels - float(g_min)) / span if span > 0 else np.zeros(256)
+    return (t_min + norm * (t_max - t_min)).astype(np.float32)
+
+def _gray_and_lut(img: np.ndarray, t_min: float, t_max: float, bgr: bool = False) -> tuple[np.ndarray, np.ndarray | None]:
+    gray = _to_gray(img, bgr)
+    if gray.dtype != np.uint8:
+        return gray, None
+    g_min, g_max, _, _ = cv2.minMaxLoc(gray)
+    return gray, temperature_lut(g_min, g_max, t_min, t_max)
+
+def _build_matrix_float(gray: np.ndarray, t_min: float, t_max: float) -> np.ndarray:
+    # caminho genérico (imagens que não são uint8)
+    norm = cv2.normalize(gray.astype(np.float32), None, 0.0, 1.0, cv2.NORM_MINMAX)
     return t_min + norm * (t_max - t_min)
 
+def build_temperature_matrix_linear(img_rgb: np.ndarray, t_min: float, t_max: float) -> np.ndarray:
+    gray, lut = _gray_and_lut(img_rgb, t_min, t_max)
+    if lut is None:
+        return _build_matrix_float(gray, t_min, t_max)
+    return cv2.LUT(gray, lut)
+
+def _sample_region(region: np.ndarray, max_len: int | None) -> np.ndarray:
+    """
+    Mesmos índices de `region.ravel()[::stride]`, sem copiar a região quando
+    ela é um recorte não contíguo.
+    """
+    n = region.size
+    if not max_len or n <= max_len:
+        return region.reshape(-1)
+    stride = int(np.ceil(n / max_len))
+    if region.flags.c_contiguous:
+        return region.reshape(-1)[::stride]
+    idx = np.arange(0, n, stride)
+    return region[idx // region.shape[1], idx % region.shape[1]]
+
+def to_temperature_array(
+    img: np.ndarray,
+    t_min: float,
+    t_max: float,
+    max_len: int | None = None,
+    bbox: tuple[int, int, int, int] | None = None,
+    bgr: bool = False,
+    reduction: str = "stride",
+    target_len: int | None = None,
+) -> np.ndarray:
+    """
+    Vetor float32 de temperaturas (imagem inteira ou só `bbox`), sem .tolist().
+    Aceita RGB (BGR com bgr=True) ou cinza (2D). A normalização usa min/max
+    da imagem inteira, igual a build_temperature_matrix_linear + recorte + stride.
+    reduction != "stride": reduz a região com app/services/reduction.py para
+    até `target_len` valores (limitado por max_len).
+    """
+    gray, lut = _gray_and_lut(img, t_min, t_max, bgr)
+    region = _build_matrix_float(gray, t_min, t_max) if lut is None else gray
+    if bbox is not None:
+        x_lo, y_lo, x_hi, y_hi = bbox
+        region = region[y_lo:y_hi, x_lo:x_hi]
+    if check_strategy(reduction) != "stride":
+        budget = min(v for v in (target_len, max_len, region.size) if v)
+        return reduce_region(region, lut, reduction, budget)
+    sample = _sample_region(region, max_len)
+    if lut is None:
+        return np.ascontiguousarray(sample, dtype=np.float32)
+    return lut.take(sample)
+
 def stats_from_bbox(matriz: np.ndarray, bbox: tuple[int, int, int, int]) -> dict:
     """
     bbox no formato (x_lo, y_lo, x_hi, y_hi) com x_hi/y_hi EXCLUSIVOS.
@@ -75,29 +147,7 @@ def stats_from_bbox(matriz: np.ndarray, bbox: tuple[int, int, int, int]) -> dict
     }
 
 # ==== ROI automática via YOLO ====
-def detect_roi_bbox(
-    img_rgb: np.ndarray,
-    *,
-    model_path: str | None = None,
-    class_name: str = DEFAULT_CLASS_NAME,
-    infer_size: tuple[int, int] = DEFAULT_INFER_SIZE,
-) -> tuple[int, int, int, int] | None:
-    """
-    Retorna bbox da ROI no formato (x_lo, y_lo, x_hi, y_hi) com limites superiores EXCLUSIVOS,
-    já no tamanho original da imagem. Se nada for detectado, retorna None.
-    """
-    H, W = img_rgb.shape[:2]
-    tw, th = int(infer_size[0]), int(infer_size[1])
-
-    model_path = model_path or _resolve_default_model_path()
-    model = _get_yolo(model_path)
-
-    # YOLO aceita RGB, mas para compat com seu pipeline convertemos para BGR
-    img_bgr = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR)
-    resized = cv2.resize(img_bgr, (tw, th), interpolation=cv2.INTER_AREA)
-
-    results = model(resized)
-    r0 = results[0]
+def _bbox_from_result(r0, H: int, W: int, tw: int, th: int, class_name: str) -> tuple[int, int, int, int] | None:
     if r0.masks is None:
         return None
 
@@ -129,6 +179,53 @@ def detect_roi_bbox(
         return None
     return (x_lo, y_lo, x_hi, y_hi)
 
+def detect_roi_bboxes(
+    imgs: list[np.ndarray],
+    *,
+    model_path: str | None = None,
+    class_name: str = DEFAULT_CLASS_NAME,
+    infer_size: tuple[int, int] = DEFAULT_INFER_SIZE,
+    bgr: bool = False,
+) -> list[tuple[int, int, int, int] | None]:
+    """
+    Versão em lote de detect_roi_bbox: todas as imagens são redimensionadas
+    para `infer_size`, então cabem numa chamada só ao modelo.
+    """
+    if not imgs:
+        return []
+    tw, th = int(infer_size[0]), int(infer_size[1])
+    model_path = model_path or _resolve_default_model_path()
+
+    # YOLO aceita RGB, mas para compat com seu pipeline convertemos para BGR
+    frames = []
+    for img in imgs:
+        img_bgr = img if bgr else cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+        frames.append(cv2.resize(img_bgr, (tw, th), interpolation=cv2.INTER_AREA))
+
+    with model_lease(model_path) as model:
+        results = model(frames if len(frames) > 1 else frames[0])
+    return [
+        _bbox_from_result(r0, img.shape[0], img.shape[1], tw, th, class_name)
+        for img, r0 in zip(imgs, results)
+    ]
+
+def detect_roi_bbox(
+    img_rgb: np.ndarray,
+    *,
+    model_path: str | None = None,
+    class_name: str = DEFAULT_CLASS_NAME,
+    infer_size: tuple[int, int] = DEFAULT_INFER_SIZE,
+    bgr: bool = False,
+) -> tuple[int, int, int, int] | None:
+    """
+    Retorna bbox da ROI no formato (x_lo, y_lo, x_hi, y_hi) com limites superiores EXCLUSIVOS,
+    já no tamanho original da imagem. Se nada for detectado, retorna None.
+    bgr=True: a imagem já vem em BGR (decode_base64_image(..., "bgr")), sem conversão.
+    """
+    return detect_roi_bboxes(
+        [img_rgb], model_path=model_path, class_name=class_name, infer_size=infer_size, bgr=bgr,
+    )[0]
+
 def _default_center_bbox(shape_hw: tuple[int, int]) -> tuple[int, int, int, int]:
     """
     ROI central (~30%–65% como no seu script). Retorna (x_lo, y_lo, x_hi, y_hi) EXCLUSIVOS.
@@ -147,17 +244,47 @@ def _default_center_bbox(shape_hw: tuple[int, int]) -> tuple[int, int, int, int]
         y_hi = min(H, y_lo + 1)
     return (x_lo, y_lo, x_hi, y_hi)
 
+def resolve_roi_bbox(
+    img_rgb: np.ndarray,
+    *,
+    model_path: str | None = None,
+    class_name: str = DEFAULT_CLASS_NAME,
+    infer_size: tuple[int, int] = DEFAULT_INFER_SIZE,
+    use_default_if_none: bool = True,
+    bgr: bool = False,
+) -> tuple[tuple[int, int, int, int], bool]:
+    """
+    bbox da ROI detectada ou, se nada for detectado, a ROI central padrão.
+    Retorna (bbox, fallback_used). Sem fallback, levanta ValueError.
+    """
+    bbox = detect_roi_bbox(
+        img_rgb,
+        model_path=model_path,
+        class_name=class_name,
+        infer_size=infer_size,
+        bgr=bgr,
+    )
+    return roi_bbox_or_fallback(bbox, img_rgb.shape[:2], use_default_if_none)
+
+def roi_bbox_or_fallback(
+    bbox: tuple[int, int, int, int] | None,
+    shape_hw: tuple[int, int],
+    use_default_if_none: bool = True,
+) -> tuple[tuple[int, int, int, int], bool]:
+    """(bbox, False) se houve detecção; senão (ROI central, True) ou ValueError."""
+    if bbox is not None:
+        return bbox, False
+    if not use_default_if_none:
+        raise ValueError("Nenhuma ROI detectada e fallback desabilitado.")
+    return _default_center_bbox(shape_hw), True
+
 # ==== Funções "prontas" para API / serviços ====
 def to_temperature_vector(img_rgb: np.ndarray, t_min: float, t_max: float, max_len: int | None = None) -> list[float]:
     """
-    Vetor da imagem inteira (sem ROI). Mantida para compatibilidade.
+    Vetor da imagem inteira (sem ROI). Mantida para compatibilidade;
+    use to_temperature_array para receber o ndarray float32.
     """
-    matriz = build_temperature_matrix_linear(img_rgb, t_min, t_max)
-    vec = matriz.ravel().astype(float)
-    if max_len and vec.size > max_len:
-        stride = int(np.ceil(vec.size / max_len))
-        vec = vec[::stride]
-    return vec.tolist()
+    return to_temperature_array(img_rgb, t_min, t_max, max_len).tolist()
 
 def to_temperature_vector_roi(
     img_rgb: np.ndarray,
@@ -180,33 +307,30 @@ def to_temperature_vector_roi(
         "fallback_used": bool
       }
     """
-    matriz = build_temperature_matrix_linear(img_rgb, t_min, t_max)
-    bbox = detect_roi_bbox(
+    gray, lut = _gray_and_lut(img_rgb, t_min, t_max)
+    bbox, fallback_used = resolve_roi_bbox(
         img_rgb,
         model_path=model_path,
         class_name=class_name,
         infer_size=infer_size,
+        use_default_if_none=use_default_if_none,
     )
-    fallback_used = False
-    if bbox is None:
-        if not use_default_if_none:
-            raise ValueError("Nenhuma ROI detectada e fallback desabilitado.")
-        bbox = _default_center_bbox(matriz.shape)
-        fallback_used = True
 
     x_lo, y_lo, x_hi, y_hi = bbox
-    roi = matriz[y_lo:y_hi, x_lo:x_hi]
+    if lut is None:
+        roi = _build_matrix_float(gray, t_min, t_max)[y_lo:y_hi, x_lo:x_hi]
+    else:
+        # converte só a ROI (a LUT já carrega o min/max da imagem inteira)
+        roi_gray = gray[y_lo:y_hi, x_lo:x_hi]
+        roi = cv2.LUT(roi_gray, lut) if roi_gray.size else roi_gray
     if roi.size == 0:
         raise ValueError("ROI vazia após clamp.")
 
-    vec = roi.ravel().astype(float)
-    if max_len and vec.size > max_len:
-        stride = int(np.ceil(vec.size / max_len))
-        vec = vec[::stride]
+    vec = _sample_region(roi, max_len)
 
     return {
         "vector": vec.tolist(),
         "bbox": [int(x_lo), int(y_lo), int(x_hi), int(y_hi)],
-        "stats": stats_from_bbox(matriz, bbox),
+        "stats": stats_from_bbox(roi, (0, 0, int(x_hi - x_lo), int(y_hi - y_lo))),
         "fallback_used": fallback_used,
-    }
+    }
\ No newline at end of file
@@ -0,0 +1,89 @@
+# app/services/warmup.py
+"""
+Pré-carga e aquecimento dos modelos no startup (lifespan da app).
+
+Cada modelo configurado é carregado e roda uma inferência dummy em
+INFER_SIZE_W x INFER_SIZE_H no pool de inferência, onde vai rodar depois.
+O estado alimenta GET /api/v1/health/ready, que só responde 200 quando
+todos ficaram prontos.
+
+Com INFER_SERVER_ENABLED os modelos vivem no servidor de inferência (que
+aquece antes de aceitar conexões); aqui só se espera ele responder ao ping.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from typing import Any, Dict
+
+from app.core.config import settings
+from app.services.executor import run_infer
+from app.services.inference_client import ping
+from app.services.model_registry import warmup
+
+log = logging.getLogger(__name__)
+
+_state: Dict[str, Any] = {"status": "pending", "models": {}, "seconds": None}
+
+
+def configured_models() -> Dict[str, str]:
+    """Modelos que o pipeline vai usar com as settings atuais."""
+    models = {"angle": settings.ANGLE_MODEL_PATH}
+    if settings.TEMPERATURE_MODE.lower() == "roi":
+        models["roi"] = settings.ROI_MODEL_PATH
+    return models
+
+
+async def _wait_inference_server() -> None:
+    deadline = time.monotonic() + settings.INFER_SERVER_CONNECT_TIMEOUT_S
+    while True:
+        try:
+            await ping()
+            return
+        except (ConnectionError, OSError, asyncio.TimeoutError):
+            if time.monotonic() >= deadline:
+                raise
+            await asyncio.sleep(0.5)
+
+
+async def warmup_models() -> bool:
+    if settings.INFER_SERVER_ENABLED:
+        _state.update(status="warming", models={"inference_server": "pending"}, seconds=None)
+        t0 = time.perf_counter()
+        try:
+            await _wait_inference_server()
+            _state["models"]["inference_server"] = "ok"
+        except Exception as e:
+            log.exception("Servidor de inferência não respondeu (%s)", settings.INFER_SERVER_ADDRESS)
+            _state["models"]["inference_server"] = f"error: {e.__class__.__name__}: {e}"
+        ok = _state["models"]["inference_server"] == "ok"
+        _state.update(status="ready" if ok else "failed", seconds=round(time.perf_counter() - t0, 3))
+        return ok
+
+    models = configured_models()
+    _state.update(status="warming", models={name: "pending" for name in models}, seconds=None)
+    t0 = time.perf_counter()
+    size = (settings.INFER_SIZE_W, settings.INFER_SIZE_H)
+    for name, path in models.items():
+        try:
+            await run_infer(warmup, path, size)
+            _state["models"][name] = "ok"
+        except Exception as e:
+            log.exception("Falha no warm-up do modelo %s (%s)", name, path)
+            _state["models"][name] = f"error: {e.__class__.__name__}: {e}"
+    ok = all(v == "ok" for v in _state["models"].values())
+    _state.update(status="ready" if ok else "failed", seconds=round(time.perf_counter() - t0, 3))
+    log.info("Warm-up %s em %.2fs: %s", _state["status"], _state["seconds"], _state["models"])
+    return ok
+
+
+def mark_ready_without_warmup() -> None:
+    _state.update(status="ready", models={}, seconds=0.0)
+
+
+def is_ready() -> bool:
+    return _state["status"] == "ready"
+
+
+def warmup_state() -> Dict[str, Any]:
+    return {"status": _state["status"], "models": dict(_state["models"]), "seconds": _state["seconds"]}
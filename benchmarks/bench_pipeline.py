@@ -0,0 +1,404 @@
+# benchmarks/bench_pipeline.py
+"""
+Benchmark ponta a ponta do /process-images, totalmente offline.
+
+Sobe dois processos locais:
+  - mock_source_sink.py como fonte e sink (imagens de mock_images.json,
+    replicadas até --images-per-request, parte térmica e parte válvula);
+  - a API, com SERVER_TIMING_HEADER=true e modelos de mentira:
+      --models synthetic  modelo falso em processo (sem torch; --synthetic-infer-ms
+                          simula o custo da inferência)
+      --models tiny       pesos yolov8n-pose/seg gerados dos .yaml do ultralytics,
+                          sem treino e sem download (precisa de ultralytics/torch)
+
+Dispara --requests POSTs com --concurrency simultâneos e imprime JSON com
+latência p50/p95/p99, imagens/s, pico de RSS da API e o tempo por estágio
+(fetch, cache, decode, temperature, valves, sink) lido do header
+Server-Timing. O JSON tem chaves ordenadas e valores arredondados para
+dar para comparar entre commits:
+
+    python benchmarks/bench_pipeline.py --out base.json
+    python benchmarks/bench_pipeline.py --compare base.json --fail-above 15
+"""
+import argparse, asyncio, json, os, pathlib, platform, shutil, socket
+import subprocess, sys, tempfile, time
+from datetime import datetime, timedelta, timezone
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+STAGES = ("fetch", "cache", "decode", "temperature", "valves", "sink", "total")
+
+
+# ---------- modelo sintético (roda dentro do processo da API) ----------
+class _SynthKeypoints:
+    def __init__(self, data):
+        self.data = data
+
+
+class _SynthResult:
+    def __init__(self, seed):
+        import numpy as np
+        rng = np.random.default_rng(seed)
+        self.keypoints = _SynthKeypoints(rng.random((3, 2, 3), dtype=np.float32) * 100)
+        self.boxes = None
+        self.masks = None  # ROI: sem detecção -> ROI central
+        self.names = {0: "extraction_roi"}
+
+
+class _SynthModel:
+    def __init__(self, infer_ms):
+        self.infer_s = infer_ms / 1e3
+
+    def __call__(self, source, **kwargs):
+        frames = source if isinstance(source, list) else [source]
+        if self.infer_s:
+            time.sleep(self.infer_s * len(frames))
+        return [_SynthResult(int(f.shape[0])) for f in frames]
+
+
+def serve_app(port, models, infer_ms):
+    import uvicorn
+    if models == "synthetic":
+        from app.services import model_registry
+        model_registry._load = lambda path: _SynthModel(infer_ms)
+    from app.main import app
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+# ---------- preparação ----------
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def build_tiny_weights(out_dir):
+    """Pesos com arquitetura yolov8n (pose p/ ângulo, seg p/ ROI), inicialização aleatória."""
+    from ultralytics import YOLO
+    paths = {}
+    for key, cfg in (("ANGLE_MODEL_PATH", "yolov8n-pose.yaml"), ("ROI_MODEL_PATH", "yolov8n-seg.yaml")):
+        path = os.path.join(out_dir, cfg.replace(".yaml", ".pt"))
+        YOLO(cfg).save(path)
+        paths[key] = path
+    return paths
+
+
+def build_source_json(src, n, thermal_ratio, out_path):
+    with open(src, "r", encoding="utf-8") as f:
+        base = json.load(f).get("Images", [])
+    if not base:
+        raise SystemExit(f"{src} não tem Images")
+    n_thermal = round(n * thermal_ratio)
+    images = []
+    for i in range(n):
+        im = dict(base[i % len(base)])
+        im.update(Port=i + 1, Section=1 + i % 3, IsThermal=i < n_thermal, Name=f"BENCH_{i + 1}")
+        images.append(im)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"Images": images}, f)
+    return n_thermal
+
+
+def _spawn(cmd, env, log_path):
+    log = open(log_path, "wb")
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def _tail(path, n=30):
+    try:
+        return "".join(open(path, "r", encoding="utf-8", errors="replace").readlines()[-n:])
+    except OSError:
+        return ""
+
+
+async def _wait_ready(url, proc, timeout_s, log_path):
+    import httpx
+    deadline = time.monotonic() + timeout_s
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise SystemExit(f"processo saiu (code={proc.returncode}):\n{_tail(log_path)}")
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"timeout esperando {url}:\n{_tail(log_path)}")
+
+
+def _rss_mb(pid):
+    """(pico, atual) em MB; VmHWM/VmRSS do /proc no Linux, psutil nos demais."""
+    try:
+        fields = {}
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                k, _, v = line.partition(":")
+                fields[k] = v
+        return int(fields["VmHWM"].split()[0]) / 1024, int(fields["VmRSS"].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import psutil
+        mi = psutil.Process(pid).memory_info()
+        peak = getattr(mi, "peak_wset", None) or mi.rss
+        return peak / 2**20, mi.rss / 2**20
+    except Exception:
+        return None, None
+
+
+# ---------- carga ----------
+def parse_server_timing(value):
+    out = {}
+    for part in (value or "").split(","):
+        name, _, params = part.strip().partition(";")
+        for p in params.split(";"):
+            k, _, v = p.strip().partition("=")
+            if k == "dur" and name:
+                out[name] = float(v)
+    return out
+
+
+def _percentile(sorted_vals, p):
+    if not sorted_vals:
+        return None
+    k = (len(sorted_vals) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+async def drive(base_url, n_requests, concurrency, params, warmup):
+    import httpx
+    t0 = datetime(2025, 11, 3, 10, 0, 0, tzinfo=timezone.utc)
+    url = f"{base_url}/api/v1/process-images"
+    latencies, stages, errors = [], [], []
+    counter = iter(range(warmup + n_requests))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=600.0, limits=limits) as client:
+        async def one(i):
+            # Date diferente por requisição: nada de cache/coalescência entre elas
+            body = {"Date": (t0 + timedelta(seconds=i)).isoformat(), "Side": "LEFT"}
+            t = time.perf_counter()
+            r = await client.post(url, params=params, json=body)
+            await r.aread()
+            dt = (time.perf_counter() - t) * 1e3
+            return r.status_code, dt, r.headers.get("server-timing")
+
+        for i in range(warmup):
+            next(counter)
+            await one(i)
+
+        async def worker():
+            for i in counter:
+                try:
+                    status, dt, st = await one(i)
+                except Exception as e:
+                    errors.append(f"{e.__class__.__name__}: {e}")
+                    continue
+                if status != 200:
+                    errors.append(f"HTTP {status}")
+                    continue
+                latencies.append(dt)
+                stages.append(parse_server_timing(st))
+
+        wall0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - wall0
+    return latencies, stages, errors, wall
+
+
+def summarize(latencies, stages, errors, wall, images_per_request, rss):
+    lat = sorted(latencies)
+    ok = len(lat)
+    r2 = lambda v: None if v is None else round(v, 2)
+    stage_out = {}
+    for name in STAGES:
+        vals = sorted(s.get(name, 0.0) for s in stages)
+        if not any(vals):
+            continue
+        stage_out[name] = {"mean": r2(sum(vals) / len(vals)), "p95": r2(_percentile(vals, 95))}
+    return {
+        "requests_ok": ok,
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "wall_s": r2(wall),
+        "requests_per_s": r2(ok / wall if wall else 0.0),
+        "images_per_s": r2(ok * images_per_request / wall if wall else 0.0),
+        "latency_ms": {
+            "p50": r2(_percentile(lat, 50)),
+            "p95": r2(_percentile(lat, 95)),
+            "p99": r2(_percentile(lat, 99)),
+            "mean": r2(sum(lat) / ok if ok else None),
+            "max": r2(lat[-1] if lat else None),
+        },
+        "stages_ms": stage_out,
+        "rss_peak_mb": r2(rss[0]),
+        "rss_end_mb": r2(rss[1]),
+    }
+
+
+# ---------- comparação ----------
+def _flatten(results):
+    out = {
+        "images_per_s": results["images_per_s"],
+        "latency_p50_ms": results["latency_ms"]["p50"],
+        "latency_p95_ms": results["latency_ms"]["p95"],
+        "latency_p99_ms": results["latency_ms"]["p99"],
+        "rss_peak_mb": results["rss_peak_mb"],
+    }
+    for name, v in results.get("stages_ms", {}).items():
+        out[f"stage_{name}_ms"] = v["mean"]
+    return out
+
+
+def compare(base, cur, fail_above):
+    """Tabela de deltas; True se p95 ou imagens/s piorarem mais que fail_above %."""
+    b, c = _flatten(base["results"]), _flatten(cur["results"])
+    regressed = False
+    print(f"{'metric':<24} {'base':>10} {'current':>10} {'delta':>8}", file=sys.stderr)
+    for k in sorted(set(b) | set(c)):
+        bv, cv = b.get(k), c.get(k)
+        if bv is None or cv is None:
+            print(f"{k:<24} {str(bv):>10} {str(cv):>10} {'-':>8}", file=sys.stderr)
+            continue
+        delta = (cv - bv) / bv * 100 if bv else 0.0
+        print(f"{k:<24} {bv:>10.2f} {cv:>10.2f} {delta:>+7.1f}%", file=sys.stderr)
+        worse = -delta if k == "images_per_s" else delta
+        if fail_above is not None and k in ("images_per_s", "latency_p95_ms") and worse > fail_above:
+            regressed = True
+    return regressed
+
+
+def _git_rev():
+    try:
+        rev = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "-uno"], cwd=ROOT, text=True).strip())
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args):
+    tmp = tempfile.mkdtemp(prefix="bench_pipeline_")
+    procs = []
+    try:
+        src_json = os.path.join(tmp, "images.json")
+        n_thermal = build_source_json(args.images, args.images_per_request, args.thermal_ratio, src_json)
+
+        mock_port, app_port = _free_port(), _free_port()
+        base_env = dict(os.environ, PYTHONPATH=str(ROOT))
+
+        mock_env = dict(base_env, MOCK_IMAGES_JSON=src_json)
+        mock_log = os.path.join(tmp, "mock.log")
+        procs.append(_spawn([sys.executable, "-m", "uvicorn", "mock_source_sink:app",
+                             "--host", "127.0.0.1", "--port", str(mock_port),
+                             "--log-level", "warning", "--no-access-log"], mock_env, mock_log))
+
+        app_env = dict(
+            base_env,
+            EXTERNAL_SOURCE_URL=f"http://127.0.0.1:{mock_port}/source",
+            SINK_BASE_URL=f"http://127.0.0.1:{mock_port}/",
+            SERVER_TIMING_HEADER="true",
+            RESULT_CACHE_ENABLED="true" if args.cache else "false",
+            DEBUG="false",
+        )
+        if args.models == "tiny":
+            app_env.update(build_tiny_weights(tmp))
+        overrides = dict(kv.split("=", 1) for kv in args.env)
+        app_env.update(overrides)
+        app_log = os.path.join(tmp, "app.log")
+        app_proc = _spawn([sys.executable, str(pathlib.Path(__file__).resolve()), "--serve-app", str(app_port),
+                           "--models", args.models, "--synthetic-infer-ms", str(args.synthetic_infer_ms)],
+                          app_env, app_log)
+        procs.append(app_proc)
+
+        await _wait_ready(f"http://127.0.0.1:{mock_port}/sink/last", procs[0], args.startup_timeout, mock_log)
+        await _wait_ready(f"http://127.0.0.1:{app_port}/api/v1/health/ready", app_proc, args.startup_timeout, app_log)
+
+        params = {"format": args.format}
+        if args.encoding:
+            params["encoding"] = args.encoding
+        latencies, stages, errors, wall = await drive(
+            f"http://127.0.0.1:{app_port}", args.requests, args.concurrency, params, args.warmup)
+        rss = _rss_mb(app_proc.pid)
+        if errors and not latencies:
+            print(_tail(app_log), file=sys.stderr)
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    return {
+        "meta": {
+            "commit": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "images_per_request": args.images_per_request,
+            "thermal_images": n_thermal,
+            "models": args.models,
+            "synthetic_infer_ms": args.synthetic_infer_ms if args.models == "synthetic" else None,
+            "format": args.format,
+            "encoding": args.encoding,
+            "cache": args.cache,
+            "env": overrides,
+        },
+        "results": summarize(latencies, stages, errors, wall, args.images_per_request, rss),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=40)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--warmup", type=int, default=2)
+    ap.add_argument("--images", default=str(ROOT / "mock_images.json"))
+    ap.add_argument("--images-per-request", type=int, default=8)
+    ap.add_argument("--thermal-ratio", type=float, default=0.5)
+    ap.add_argument("--models", choices=("synthetic", "tiny"), default="synthetic")
+    ap.add_argument("--synthetic-infer-ms", type=float, default=0.0)
+    ap.add_argument("--format", choices=("records", "columnar"), default="records")
+    ap.add_argument("--encoding", default=None)
+    ap.add_argument("--cache", action="store_true", help="mantém o cache de resultados ligado")
+    ap.add_argument("--env", action="append", default=[], metavar="KEY=VAL", help="setting extra para a API")
+    ap.add_argument("--startup-timeout", type=float, default=120.0)
+    ap.add_argument("--out", help="grava o JSON aqui (além do stdout)")
+    ap.add_argument("--compare", help="JSON de um run anterior para comparar")
+    ap.add_argument("--fail-above", type=float, default=None, help="sai com 1 se p95/imagens/s piorarem mais que X%%")
+    ap.add_argument("--serve-app", type=int, default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.serve_app is not None:
+        serve_app(args.serve_app, args.models, args.synthetic_infer_ms)
+        return
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        if compare(base, report, args.fail_above):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
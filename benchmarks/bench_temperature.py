@@ -0,0 +1,69 @@
+# benchmarks/bench_temperature.py
+"""
+Micro-benchmark da extração de temperatura: caminho antigo (cinza -> float32
+-> normalize -> escala -> float64 -> stride -> tolist) vs. LUT de 256
+entradas aplicada só nos pixels amostrados.
+
+Uso:
+    python benchmarks/bench_temperature.py [--images mock_images.json] [--repeat 50]
+"""
+import argparse, base64, json, pathlib, sys, time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.image_utils import base64_to_rgb_ndarray
+from app.services.temperature import to_temperature_array, to_temperature_vector
+
+
+def legacy_vector(img_rgb, t_min, t_max, max_len):
+    g = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2GRAY).astype(np.float32)
+    norm = cv2.normalize(g, None, 0.0, 1.0, cv2.NORM_MINMAX)
+    matriz = t_min + norm * (t_max - t_min)
+    vec = matriz.ravel().astype(float)
+    if max_len and vec.size > max_len:
+        vec = vec[::int(np.ceil(vec.size / max_len))]
+    return vec.tolist()
+
+
+def _best_ms(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", default=str(ROOT / "mock_images.json"))
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--max-len", type=int, default=settings.MAX_TEMPERATURE_VECTOR_LEN)
+    args = ap.parse_args()
+
+    with open(args.images, "r", encoding="utf-8") as f:
+        images = json.load(f).get("Images", [])
+
+    t_min, t_max = settings.TEMP_MIN_DEFAULT, settings.TEMP_MAX_DEFAULT
+    print(f"{'image':<16} {'shape':<15} {'legacy ms':>10} {'vector ms':>10} {'array ms':>10} {'speedup':>8}")
+    for im in images:
+        img = base64_to_rgb_ndarray(im["Base64String"])
+        ref = np.asarray(legacy_vector(img, t_min, t_max, args.max_len))
+        new = to_temperature_array(img, t_min, t_max, args.max_len)
+        assert ref.shape == new.shape and np.allclose(ref, new, atol=1e-3)
+
+        t_old = _best_ms(lambda: legacy_vector(img, t_min, t_max, args.max_len), args.repeat)
+        t_vec = _best_ms(lambda: to_temperature_vector(img, t_min, t_max, args.max_len), args.repeat)
+        t_arr = _best_ms(lambda: to_temperature_array(img, t_min, t_max, args.max_len), args.repeat)
+        shape = "x".join(str(d) for d in img.shape)
+        print(f"{im.get('Name', '?'):<16} {shape:<15} {t_old:>10.3f} {t_vec:>10.3f} {t_arr:>10.3f} {t_old / t_arr:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/bench_valves.py
+"""
+Micro-benchmark do pós-processamento de keypoints das válvulas: laço
+Python por detecção (math.atan2/cos + sort) vs. versão vetorizada, por
+resultado e em lote (valves_from_results).
+
+Uso:
+    python benchmarks/bench_valves.py [--images 16] [--detections 50] [--repeat 50]
+"""
+import argparse, math, pathlib, sys, time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from app.services.angle_service import _valves_from_result, valves_from_results
+
+
+class _NS:
+    def __init__(self, **kw):
+        self.__dict__.update(kw)
+
+
+def legacy_valves(r0):
+    conf = np.asarray(r0.boxes.conf)
+    vals = []
+    for i, pts in enumerate(np.asarray(r0.keypoints.data)):
+        dx = float(pts[1][0] - pts[0][0])
+        dy = float(pts[1][1] - pts[0][1])
+        ang = abs(math.degrees(math.atan2(dy, dx)))
+        pct = min(max(100.0 * math.cos(math.radians(ang)) ** 2, 0.0), 100.0)
+        vals.append((float(conf[i]), pct))
+    vals.sort(key=lambda x: x[0], reverse=True)
+    return [v for _, v in vals[:3]]
+
+
+def _best_ms(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", type=int, default=16)
+    ap.add_argument("--detections", type=int, default=50)
+    ap.add_argument("--keypoints", type=int, default=17)
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    results = [
+        _NS(
+            keypoints=_NS(data=(rng.random((args.detections, args.keypoints, 3)) * 640).astype(np.float32)),
+            boxes=_NS(conf=rng.random(args.detections).astype(np.float32)),
+        )
+        for _ in range(args.images)
+    ]
+    ref = [legacy_valves(r) for r in results]
+    assert all(np.allclose(a, b) for a, b in zip(ref, valves_from_results(results)))
+
+    t_old = _best_ms(lambda: [legacy_valves(r) for r in results], args.repeat)
+    t_one = _best_ms(lambda: [_valves_from_result(r) for r in results], args.repeat)
+    t_batch = _best_ms(lambda: valves_from_results(results), args.repeat)
+    print(f"images={args.images} detections/image={args.detections}")
+    print(f"{'legacy loop':<16} {t_old:>9.3f} ms")
+    print(f"{'per result':<16} {t_one:>9.3f} ms  {t_old / t_one:>6.1f}x")
+    print(f"{'batched':<16} {t_batch:>9.3f} ms  {t_old / t_batch:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
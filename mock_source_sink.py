@@ -1,5 +1,5 @@
 # mock_source_sink.py
-from fastapi import FastAPI, Body, Query
+from fastapi import FastAPI, Body, Query, Response
 from pydantic import BaseModel, AwareDatetime
 from typing import List, Dict, Any, Optional
 import uvicorn, json, os, threading
@@ -9,6 +9,16 @@ app = FastAPI(title="Mock Source+Sink")
 # Carrega imagens mock de um JSON externo (veja etapa 3)
 MOCK_JSON = os.environ.get("MOCK_IMAGES_JSON", "mock_images.json")
 LAST_SINK_PAYLOAD: List[Dict[str, Any]] = []
+_IMAGES_CACHE: Dict[str, Any] = {"mtime": None, "images": []}
+
+def _load_images() -> List[Dict[str, Any]]:
+    # relê o JSON só quando o arquivo muda (o benchmark chama /source muitas vezes)
+    mtime = os.path.getmtime(MOCK_JSON)
+    if _IMAGES_CACHE["mtime"] != mtime:
+        with open(MOCK_JSON, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        _IMAGES_CACHE.update(mtime=mtime, images=data.get("Images", []))
+    return [dict(im) for im in _IMAGES_CACHE["images"]]
 
 class SourceImage(BaseModel):
     Side: str
@@ -24,8 +34,20 @@ class SourceResponse(BaseModel):
     Images: List[SourceImage]
 
 @app.get("/source", response_model=SourceResponse)
-def source(Date: AwareDatetime = Query(...), Side: str = Query(...)):
-    """Devolve a lista de imagens com base64 que você configurou no mock_images.json"""
+def source(
+    response: Response,
+    Date: AwareDatetime = Query(...),
+    Side: str = Query(...),
+    Port: Optional[int] = Query(None),
+    Section: Optional[int] = Query(None),
+    Offset: int = Query(0, ge=0),
+    Limit: Optional[int] = Query(None, ge=1),
+):
+    """
+    Devolve a lista de imagens com base64 que você configurou no mock_images.json.
+    Filtros opcionais Port/Section; com Limit pagina (Offset/Limit) e
+    informa o total no header X-Total-Count, como a fonte paginada.
+    """
     if not os.path.exists(MOCK_JSON):
         # fallback: PNG 1x1 transparente
         tiny_png = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mP8/x8AAwMCAOb+J8YAAAAASUVORK5CYII="
@@ -34,12 +56,17 @@ def source(Date: AwareDatetime = Query(...), Side: str = Query(...)):
             {"Side": Side, "Port": 2, "Section": 2, "IsThermal": True, "Name": "IMG2", "Base64String": f"data:image/png;base64,{tiny_png}"},
         ]
     else:
-        with open(MOCK_JSON, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        images = data.get("Images", [])
+        images = _load_images()
         # garante Side consistente
         for im in images:
             im.setdefault("Side", Side)
+    if Port is not None:
+        images = [im for im in images if im["Port"] == Port]
+    if Section is not None:
+        images = [im for im in images if im["Section"] == Section]
+    if Limit is not None:
+        response.headers["X-Total-Count"] = str(len(images))
+        images = images[Offset:Offset + Limit]
     return {"Side": Side, "Date": Date, "Images": images}
 
 @app.post("/rest/postthermaldata/v1/Data")
@@ -49,6 +76,13 @@ def sink(items: List[Dict[str, Any]] = Body(...)):
     LAST_SINK_PAYLOAD = items
     return {"ok": True, "count": len(items)}
 
+@app.post("/rest/postthermaldata/v1/Series")
+def sink_series(items: List[Dict[str, Any]] = Body(...)):
+    """Sink no formato colunar (um registro por imagem, vetor empacotado)."""
+    global LAST_SINK_PAYLOAD
+    LAST_SINK_PAYLOAD = items
+    return {"ok": True, "count": len(items)}
+
 @app.get("/sink/last")
 def sink_last():
     """Consulta o último payload recebido pelo sink (para verificação)."""
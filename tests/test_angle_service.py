@@ -0,0 +1,74 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.services.angle_service import _valves_from_result, valves_from_results
+
+
+def _legacy_valves(r0):
+    # laço original de valves_from_image_rgb
+    if r0 is None or r0.keypoints is None:
+        return []
+    conf = None
+    if r0.boxes is not None and r0.boxes.conf is not None:
+        conf = np.asarray(r0.boxes.conf)
+    data = np.asarray(r0.keypoints.data)
+    vals = []
+    for i, pts in enumerate(data):
+        if pts.ndim == 1:
+            if pts.size % 2 != 0:
+                continue
+            pts = pts.reshape(-1, 2)
+        if pts.shape[0] < 2 or pts.shape[1] < 2:
+            continue
+        dx = float(pts[1][0] - pts[0][0])
+        dy = float(pts[1][1] - pts[0][1])
+        ang = abs(math.degrees(math.atan2(dy, dx)))
+        pct = min(max(100.0 * math.cos(math.radians(ang)) ** 2, 0.0), 100.0)
+        c = float(conf[i]) if conf is not None and i < len(conf) else 1.0
+        vals.append((c, pct))
+    vals.sort(key=lambda x: x[0], reverse=True)
+    return [v for _, v in vals[:3]]
+
+
+class _NS:
+    def __init__(self, **kw):
+        self.__dict__.update(kw)
+
+
+def _result(data, conf=None):
+    boxes = None if conf is None else _NS(conf=np.asarray(conf, dtype=np.float32))
+    return _NS(keypoints=_NS(data=np.asarray(data, dtype=np.float32)), boxes=boxes)
+
+
+def _cases():
+    rng = np.random.default_rng(7)
+    cases = [
+        _result(rng.random((40, 17, 3)) * 640, rng.random(40)),
+        # empates de confiança: a ordem das detecções decide
+        _result(rng.random((9, 2, 3)) * 100, [0.5, 0.9, 0.5, 0.9, 0.5, 0.9, 0.1, 0.9, 0.5]),
+        _result(rng.random((5, 4, 2)) * 100),                    # sem boxes -> conf 1.0
+        _result(rng.random((6, 2, 3)) * 100, rng.random(3)),     # conf menor que N
+        _result(rng.random((4, 6)) * 100, rng.random(4)),        # instâncias achatadas
+        _result(rng.random((4, 5)) * 100, rng.random(4)),        # achatadas ímpares -> nada
+        _result(np.zeros((0, 17, 3)), np.zeros(0)),
+        _result(rng.random((3, 1, 3)), rng.random(3)),           # só um keypoint
+        _NS(keypoints=None, boxes=None),
+        None,
+    ]
+    return cases
+
+
+@pytest.mark.parametrize("idx", range(10))
+def test_single_result_matches_legacy_loop(idx):
+    r0 = _cases()[idx]
+    assert _valves_from_result(r0) == pytest.approx(_legacy_valves(r0), abs=1e-9)
+
+
+def test_batched_results_match_per_result():
+    cases = _cases()
+    batched = valves_from_results(cases)
+    assert len(batched) == len(cases)
+    for got, r0 in zip(batched, cases):
+        assert got == pytest.approx(_legacy_valves(r0), abs=1e-9)
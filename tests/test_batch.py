@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+
+from app.schemas.batch import BatchRequest
+from app.services import batch, microbatch
+from app.services.ingest_service import PipelineResult
+
+
+def test_window_expands_per_side():
+    req = BatchRequest(start="2025-11-03T10:00:00Z", end="2025-11-03T10:02:00Z", step_s=60)
+    items = req.expand(limit=100)
+    assert [(i.Date.minute, i.Side) for i in items] == [
+        (0, "LEFT"), (0, "RIGHT"), (1, "LEFT"), (1, "RIGHT"), (2, "LEFT"), (2, "RIGHT"),
+    ]
+    with pytest.raises(ValueError):
+        req.expand(limit=5)
+
+
+def test_request_needs_list_or_window():
+    with pytest.raises(ValueError):
+        BatchRequest(start="2025-11-03T10:00:00Z")
+    with pytest.raises(ValueError):
+        BatchRequest(requests=[], start="2025-11-03T10:00:00Z", end="2025-11-03T11:00:00Z", step_s=60)
+
+
+def test_microbatcher_merges_concurrent_calls(monkeypatch):
+    seen = []
+
+    async def fake_run_infer(fn, frames):
+        return fn(frames)
+
+    def fn(frames):
+        seen.append(list(frames))
+        return [f * 10 for f in frames]
+
+    monkeypatch.setattr(microbatch, "run_infer", fake_run_infer)
+
+    async def scenario():
+        mb = microbatch.MicroBatcher(fn, max_batch=100, wait_ms=20)
+        return await asyncio.gather(mb([1, 2]), mb([3]), mb([4, 5, 6]))
+
+    assert asyncio.run(scenario()) == [[10, 20], [30], [40, 50, 60]]
+    assert seen == [[1, 2, 3, 4, 5, 6]]
+
+
+def test_iter_batch_streams_items_and_summary(monkeypatch):
+    async def fake_pipeline(req, fmt, encoding, sink=None, valve_batcher=None):
+        if req.Side == "RIGHT":
+            raise RuntimeError("fonte fora")
+        return PipelineResult(body=b'{"temperatures":[],"valves":[]}', processed=2, sink_url=sink.url)
+
+    monkeypatch.setattr(batch, "run_pipeline", fake_pipeline)
+    items = BatchRequest(start="2025-11-03T10:00:00Z", end="2025-11-03T10:01:00Z", step_s=60).expand(10)
+
+    async def scenario():
+        return [json.loads(line) async for line in batch.iter_batch(items, include_results=True)]
+
+    lines = asyncio.run(scenario())
+    *rows, summary = lines
+    assert sorted(r["index"] for r in rows) == [0, 1, 2, 3]
+    assert {r["status"] for r in rows if r["Side"] == "LEFT"} == {"ok"}
+    assert all("fonte fora" in r["error"] for r in rows if r["Side"] == "RIGHT")
+    assert all(r["result"] == {"temperatures": [], "valves": []} for r in rows if r["status"] == "ok")
+    assert summary["done"] and summary["ok"] == 2 and summary["failed"] == 2 and summary["processed"] == 4
@@ -0,0 +1,45 @@
+import base64
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.image_utils import base64_to_rgb_ndarray, decode_base64_image
+
+
+@pytest.fixture(scope="module")
+def jpeg_b64():
+    rng = np.random.default_rng(1)
+    img = cv2.GaussianBlur(rng.integers(0, 255, size=(120, 160, 3), dtype=np.uint8), (7, 7), 0)
+    ok, buf = cv2.imencode(".jpg", img)
+    assert ok
+    return base64.b64encode(buf.tobytes()).decode("ascii")
+
+
+def _legacy_rgb(b64):
+    arr = np.frombuffer(base64.b64decode(b64), dtype=np.uint8)
+    return cv2.cvtColor(cv2.imdecode(arr, cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
+
+
+@pytest.mark.parametrize("prefix", ["", "data:image/jpeg;base64,", "  DATA:image/jpeg;base64,"])
+def test_modes_match_legacy_conversions(jpeg_b64, prefix):
+    rgb = _legacy_rgb(jpeg_b64)
+    b64 = prefix + jpeg_b64
+    np.testing.assert_array_equal(base64_to_rgb_ndarray(b64), rgb)
+    np.testing.assert_array_equal(decode_base64_image(b64, "bgr"), rgb[:, :, ::-1])
+    np.testing.assert_array_equal(decode_base64_image(b64, "gray"), cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY))
+
+
+def test_reduced_decode_shape(jpeg_b64):
+    assert decode_base64_image(jpeg_b64, "gray", reduce=2).shape == (60, 80)
+    assert decode_base64_image(jpeg_b64, "bgr", reduce=4).shape == (30, 40, 3)
+    assert decode_base64_image(jpeg_b64, "gray", reduce=2, luma=True).shape == (60, 80)
+
+
+def test_invalid_input():
+    with pytest.raises(ValueError):
+        decode_base64_image("bm90IGFuIGltYWdl")
+    with pytest.raises(ValueError):
+        decode_base64_image("", mode="hsv")
+    with pytest.raises(ValueError):
+        decode_base64_image("", reduce=3)
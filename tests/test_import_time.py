@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# orçamento de import de app.main (ms); sobrescreva com IMPORT_TIME_BUDGET_MS
+BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", "2500"))
+HEAVY = ("ultralytics", "torch", "torchvision", "matplotlib")
+
+def _import_app_main():
+    code = "import sys, app.main; print(','.join(m for m in %r if m in sys.modules))" % (HEAVY,)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    return proc.stdout.strip(), proc.stderr
+
+def _cumulative_us(importtime_log: str, module: str) -> int:
+    # linhas: "import time: self [us] | cumulative | imported package"
+    for line in importtime_log.splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1])
+    raise AssertionError(f"{module} não aparece no -X importtime")
+
+def test_app_main_does_not_import_inference_stack():
+    loaded, _ = _import_app_main()
+    assert loaded == "", f"módulos pesados importados por app.main: {loaded}"
+
+def test_app_main_import_time_budget():
+    _, log = _import_app_main()
+    ms = _cumulative_us(log, "app.main") / 1000.0
+    assert ms < BUDGET_MS, f"import app.main levou {ms:.0f} ms (orçamento {BUDGET_MS:.0f} ms)"
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from app.services import inference_client as ic
+from app.services import model_registry
+from app.services.inference_client import InferenceClient, RemoteInferenceError
+from app.services.inference_server import InferenceServer
+
+
+class _Keypoints:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Result:
+    def __init__(self, angle_deg):
+        rad = np.radians(angle_deg)
+        self.keypoints = _Keypoints(np.array([[[0, 0, 1], [10 * np.cos(rad), 10 * np.sin(rad), 1]]], dtype=np.float32))
+        self.boxes = None
+        self.masks = None
+
+
+class _FakeModel:
+    """Ângulo = média do frame (em graus), para conferir que o frame certo chegou."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, source, **kwargs):
+        frames = source if isinstance(source, list) else [source]
+        self.batch_sizes.append(len(frames))
+        return [_Result(float(f.mean())) for f in frames]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    model = _FakeModel()
+    monkeypatch.setattr(model_registry, "_entries", {})
+    monkeypatch.setattr(model_registry, "_load", lambda path: model)
+    srv = InferenceServer(("127.0.0.1", 0), b"test-key", max_batch=8, batch_wait_ms=50)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    assert srv.wait_ready(5)
+    yield srv, model
+    srv.close()
+    t.join(5)
+
+
+def test_frames_from_concurrent_requests_share_a_batch(server):
+    srv, model = server
+    client = InferenceClient(srv.address, b"test-key")
+    try:
+        frames = [np.full((40, 60, 3), v, dtype=np.uint8) for v in (0, 30, 60, 90)]
+        futs = [client.submit(ic.TASK_VALVES, f) for f in frames]
+        results = [f.result(timeout=5) for f in futs]
+    finally:
+        client.close()
+    expected = [100.0 * np.cos(np.radians(v)) ** 2 for v in (0, 30, 60, 90)]
+    assert [r[0] for r in results] == pytest.approx(expected, abs=1e-3)
+    assert model.batch_sizes == [4]
+
+
+def test_roi_without_detection_uses_fallback_or_errors(server):
+    srv, _ = server
+    client = InferenceClient(srv.address, b"test-key")
+    frame = np.zeros((100, 200, 3), dtype=np.uint8)
+    try:
+        bbox, fallback = client.submit(ic.TASK_ROI, frame, model_path="roi.pt", use_default_if_none=True).result(5)
+        assert fallback is True and bbox == (70, 35, 130, 65)
+        with pytest.raises(RemoteInferenceError):
+            client.submit(ic.TASK_ROI, frame, model_path="roi.pt", use_default_if_none=False).result(5)
+    finally:
+        client.close()
+
+
+def test_async_facade(server, monkeypatch):
+    srv, _ = server
+    monkeypatch.setattr(ic, "_client", InferenceClient(srv.address, b"test-key"))
+    frames = [np.full((20, 20, 3), 45, dtype=np.uint8)] * 3
+
+    async def scenario():
+        info = await ic.ping()
+        return info, await ic.remote_valves(frames)
+
+    info, results = asyncio.run(scenario())
+    ic.close_inference_client()
+    assert info["frames"] == 0
+    assert [r[0] for r in results] == pytest.approx([50.0] * 3, abs=1e-3)
+
+
+def test_wrong_authkey_is_rejected(server):
+    srv, _ = server
+    client = InferenceClient(srv.address, b"wrong")
+    with pytest.raises(Exception):
+        client.submit(ic.TASK_PING).result(2)
+    client.close()
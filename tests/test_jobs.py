@@ -0,0 +1,116 @@
+import asyncio
+
+from app.schemas.job import JobState, SinkState
+from app.schemas.pipeline import InboundRequest
+from app.services import external_client, jobs
+from app.services.ingest_service import PipelineResult
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_job_result_available_before_sink_retries(monkeypatch):
+    calls = []
+
+    async def fake_pipeline(req, fmt, encoding, sink=None):
+        return PipelineResult(
+            body=b'{"temperatures":[],"valves":[]}', processed=1,
+            sink_url="http://sink/", sink_fragments=[b'{"Temperature":1.0}', b'{"Temperature":2.0}'],
+        )
+
+    async def flaky_post(batches, url=None, *, fail_fast=True):
+        calls.append(len(batches))
+        return batches if len(calls) == 1 else []
+
+    monkeypatch.setattr(jobs, "run_pipeline", fake_pipeline)
+    monkeypatch.setattr(jobs, "post_sink_batches", flaky_post)
+    monkeypatch.setattr(jobs.settings, "JOB_SINK_RETRY_BACKOFF_S", 0.0)
+    monkeypatch.setattr(jobs.settings, "SINK_STREAMING", False)
+
+    async def scenario():
+        mgr = jobs.JobManager()
+        await mgr.start()
+        job = mgr.submit(InboundRequest(Date="2025-11-03T10:00:00Z", Side="LEFT"))
+        for _ in range(100):
+            if job.sink_status in (SinkState.DELIVERED, SinkState.FAILED):
+                break
+            await asyncio.sleep(0.01)
+        await mgr.stop()
+        return job
+
+    job = _run(scenario())
+    assert job.status == JobState.DONE
+    assert job.result.processed == 1
+    assert job.sink_status == SinkState.DELIVERED
+    assert job.sink_attempts == 2
+    assert len(calls) == 2
+
+
+def test_failed_pipeline_marks_job_failed(monkeypatch):
+    async def boom(req, fmt, encoding, sink=None):
+        raise RuntimeError("fonte fora")
+
+    monkeypatch.setattr(jobs, "run_pipeline", boom)
+
+    async def scenario():
+        mgr = jobs.JobManager()
+        await mgr.start()
+        job = mgr.submit(InboundRequest(Date="2025-11-03T10:00:00Z", Side="LEFT"))
+        for _ in range(100):
+            if job.status == JobState.FAILED:
+                break
+            await asyncio.sleep(0.01)
+        await mgr.stop()
+        return job
+
+    job = _run(scenario())
+    assert job.status == JobState.FAILED
+    assert "fonte fora" in job.error
+    assert job.sink_status == SinkState.SKIPPED
+
+
+def test_streamed_job_retries_only_failed_batches(monkeypatch):
+    posted = []
+    fail_once = {b'[{"Temperature":2.0}]'}
+
+    async def fake_post_batch(client, url, idx, n, payload):
+        if payload in fail_once:
+            fail_once.discard(payload)
+            raise RuntimeError("sink fora")
+        posted.append(payload)
+
+    async def fake_pipeline(req, fmt, encoding, sink=None):
+        for t in (1.0, 2.0, 3.0):
+            await sink.put_records([{"Temperature": t}])
+        return PipelineResult(
+            body=b'{"temperatures":[],"valves":[]}', processed=3, sink_url=sink.url,
+        )
+
+    async def retry_post(batches, url=None, *, fail_fast=True):
+        posted.extend(p for _, p in batches)
+        return []
+
+    monkeypatch.setattr(jobs, "run_pipeline", fake_pipeline)
+    monkeypatch.setattr(jobs, "post_sink_batches", retry_post)
+    monkeypatch.setattr(external_client, "_post_batch", fake_post_batch)
+    monkeypatch.setattr(jobs.settings, "SINK_STREAMING", True)
+    monkeypatch.setattr(jobs.settings, "SINK_BATCH_SIZE", 1)
+    monkeypatch.setattr(jobs.settings, "JOB_SINK_RETRY_BACKOFF_S", 0.0)
+
+    async def scenario():
+        mgr = jobs.JobManager()
+        await mgr.start()
+        job = mgr.submit(InboundRequest(Date="2025-11-03T10:00:00Z", Side="LEFT"))
+        for _ in range(100):
+            if job.sink_status in (SinkState.DELIVERED, SinkState.FAILED):
+                break
+            await asyncio.sleep(0.01)
+        await mgr.stop()
+        return job
+
+    job = _run(scenario())
+    assert job.status == JobState.DONE
+    assert job.sink_status == SinkState.DELIVERED
+    assert job.sink_attempts == 2
+    assert sorted(posted) == [b'[{"Temperature":1.0}]', b'[{"Temperature":2.0}]', b'[{"Temperature":3.0}]']
@@ -0,0 +1,57 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from app.schemas.pipeline import MixedResponse
+from app.services import json_codec
+from app.services.json_codec import dumps, encode_records, finite_values, response_body, temperature_record_fragments
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def backend(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(json_codec, "orjson", None)
+    elif json_codec.orjson is None:
+        pytest.skip("orjson não instalado")
+    return request.param
+
+
+def test_fragments_match_stdlib_json(backend):
+    temps = np.array([98.0, 163.58432, 549.99], dtype=np.float32)
+    frags = temperature_record_fragments("2025-11-03T10:00:00Z", "LEFT", 2, 3, temps)
+    expected = [
+        json.dumps({"Timestamp": "2025-11-03T10:00:00Z", "Side": "LEFT", "Port": 2, "Section": 3, "Temperature": t},
+                   separators=(",", ":")).encode()
+        for t in temps.tolist()
+    ]
+    assert frags == expected
+
+
+def test_dumps_is_strict(backend):
+    for bad in (math.nan, math.inf, -math.inf):
+        with pytest.raises(ValueError):
+            dumps({"Valve_1": bad})
+    assert encode_records([{"v": 1.5}, {"v": math.nan}, {"v": None}]) == [b'{"v":1.5}', b'{"v":null}']
+
+
+def test_non_finite_temperatures_are_dropped():
+    temps = np.array([100.0, np.nan, 200.0, np.inf], dtype=np.float32)
+    assert finite_values(temps).tolist() == [100.0, 200.0]
+    clean = np.array([1.0, 2.0], dtype=np.float32)
+    assert finite_values(clean) is clean
+
+
+def test_response_body_validates_as_mixed_response(backend):
+    temps = np.array([120.5, 130.25], dtype=np.float32)
+    chunk = b",".join(temperature_record_fragments("2025-11-03T10:00:00Z", "LEFT", 1, 1, temps))
+    valves = encode_records([{
+        "Timestamp": "2025-11-03T10:00:00Z", "Side": "LEFT", "Port": 1, "Section": 1,
+        "Valve_1": 10.0, "Valve_2": None, "Valve_3": None,
+    }])
+    body = response_body([chunk, b""], valves)
+    payload = MixedResponse.model_validate_json(body)
+    assert [r.Temperature for r in payload.temperatures] == [120.5, 130.25]
+    assert payload.valves[0].Valve_1 == 10.0
+    assert response_body([], []) == b'{"temperatures":[],"valves":[]}'
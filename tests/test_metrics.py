@@ -0,0 +1,57 @@
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.core.metrics import Counter, Histogram, Registry, render_samples
+from app.main import app
+
+
+def _isolated(monkeypatch):
+    monkeypatch.setattr(metrics, "REGISTRY", Registry())
+    monkeypatch.setattr(metrics, "_enabled", True)
+    return metrics.REGISTRY
+
+
+def test_counter_and_histogram_text_format(monkeypatch):
+    reg = _isolated(monkeypatch)
+    c = Counter("demo_total", "Demo.", ("status",))
+    h = Histogram("demo_seconds", "Demo.", buckets=(0.1, 1.0))
+    c.labels(200).inc()
+    c.labels(200).inc(2)
+    h.observe(0.05)
+    h.observe(0.5)
+    h.observe(5.0)
+    text = reg.render()
+    assert 'demo_total{status="200"} 3' in text
+    assert 'demo_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{le="1"} 2' in text
+    assert 'demo_seconds_bucket{le="+Inf"} 3' in text
+    assert "demo_seconds_count 3" in text
+
+
+def test_disabled_is_noop(monkeypatch):
+    _isolated(monkeypatch)
+    c = Counter("noop_total", "Demo.")
+    monkeypatch.setattr(metrics, "_enabled", False)
+    c.inc()
+    assert c.labels().value == 0
+
+
+def test_snapshot_samples_grouped_per_family():
+    lines = render_samples([
+        ("pool_depth", "gauge", "Demo.", {"pool": "cpu"}, 1),
+        ("other", "gauge", "Demo.", {}, 2),
+        ("pool_depth", "gauge", "Demo.", {"pool": "infer"}, 3),
+    ])
+    assert lines[:4] == [
+        "# HELP pool_depth Demo.", "# TYPE pool_depth gauge",
+        'pool_depth{pool="cpu"} 1', 'pool_depth{pool="infer"} 3',
+    ]
+
+
+def test_metrics_endpoint():
+    with TestClient(app) as client:
+        r = client.get("/api/v1/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert "# TYPE pipeline_stage_seconds histogram" in r.text
+    assert 'executor_in_flight{pool="cpu"}' in r.text
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from app.services.reduction import check_strategy, grid_shape
+from app.services.temperature import to_temperature_array
+
+T_MIN, T_MAX = 98.0, 550.0
+
+@pytest.fixture
+def gray():
+    rng = np.random.default_rng(1)
+    img = rng.integers(60, 120, size=(480, 640), dtype=np.uint8)
+    img[200:203, 311:314] = 250  # ponto quente pequeno
+    img[0, 0] = 5
+    return img
+
+def _full(img, **kw):
+    return to_temperature_array(img, T_MIN, T_MAX, None, **kw)
+
+@pytest.mark.parametrize("h,w,budget", [(480, 640, 1024), (100, 7, 50), (3, 3, 1024), (1, 5000, 100)])
+def test_grid_fits_budget(h, w, budget):
+    gh, gw = grid_shape(h, w, budget)
+    assert 1 <= gh <= h and 1 <= gw <= w and gh * gw <= max(budget, 1)
+
+@pytest.mark.parametrize("strategy", ["area", "minmax", "quantile"])
+def test_strategies_shrink_vector(gray, strategy):
+    out = to_temperature_array(gray, T_MIN, T_MAX, 15000, reduction=strategy, target_len=1024)
+    assert out.dtype == np.float32
+    assert 0 < out.size <= 1024
+
+def test_minmax_and_quantile_keep_extremes(gray):
+    full = _full(gray)
+    stride = to_temperature_array(gray, T_MIN, T_MAX, 1024)
+    assert stride.max() < full.max()  # o stride perde o ponto quente
+    for strategy in ("minmax", "quantile"):
+        out = to_temperature_array(gray, T_MIN, T_MAX, 15000, reduction=strategy, target_len=256)
+        assert out.max() == full.max() and out.min() == full.min()
+
+def test_quantile_matches_numpy(gray):
+    full = _full(gray)
+    out = to_temperature_array(gray, T_MIN, T_MAX, None, reduction="quantile", target_len=11)
+    expected = np.quantile(full, np.linspace(0, 1, 11), method="inverted_cdf")
+    np.testing.assert_allclose(out, expected, rtol=0, atol=1e-4)
+
+def test_area_is_block_mean(gray):
+    full = _full(gray).reshape(gray.shape)
+    out = to_temperature_array(gray, T_MIN, T_MAX, None, reduction="area", target_len=12)
+    assert out.size == 12  # grade 3 x 4 com o aspecto 480 x 640
+    blocks = full.reshape(3, 160, 4, 160).mean(axis=(1, 3)).ravel()
+    np.testing.assert_allclose(out, blocks, atol=1e-3)
+
+def test_float_and_bbox_paths(gray):
+    f = gray.astype(np.float32)
+    out = to_temperature_array(f, T_MIN, T_MAX, None, reduction="minmax", target_len=64, bbox=(300, 190, 330, 210))
+    assert out.max() == pytest.approx(T_MAX)
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        check_strategy("median")
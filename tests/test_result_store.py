@@ -0,0 +1,51 @@
+import asyncio
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.services import ingest_service, result_store
+from app.services.result_store import ResultStore, StoredRow
+
+DATE = datetime(2025, 11, 3, 10, 0, tzinfo=timezone.utc)
+
+def _rows():
+    return [
+        StoredRow("2025-11-03T10:00:00Z", "LEFT", 1, 1, True, "T1", temperatures=np.array([100.5, 101.0], np.float32)),
+        StoredRow("2025-11-03T10:00:00Z", "LEFT", 2, 1, True, "T2", temperatures=np.array([200.0], np.float32)),
+        StoredRow("2025-11-03T10:00:00Z", "LEFT", 2, 3, False, "V1", valves=[10.0, None, 30.0]),
+    ]
+
+@pytest.fixture(params=["npy", "parquet"])
+def store(request, tmp_path):
+    if request.param == "parquet" and result_store.pl is None:
+        pytest.skip("polars não instalado")
+    return ResultStore(str(tmp_path), request.param)
+
+def test_roundtrip_and_filters(store, tmp_path):
+    store.save(DATE, "LEFT", _rows())
+    rows = store.load(DATE, "LEFT")
+    assert [r.Name for r in rows] == ["T1", "T2", "V1"]
+    np.testing.assert_array_equal(rows[0].temperatures, np.array([100.5, 101.0], np.float32))
+    assert rows[2].temperatures is None and rows[2].valves == [10.0, None, 30.0]
+    assert [r.Name for r in store.load(DATE, "LEFT", port=2)] == ["T2", "V1"]
+    assert [r.Name for r in store.load(DATE, "LEFT", port=2, section=3)] == ["V1"]
+    assert store.load(DATE, "RIGHT") is None
+    # índice remontado a partir dos arquivos
+    again = ResultStore(str(tmp_path), store.format)
+    assert [r.Name for r in again.load(DATE.astimezone(), "LEFT")] == ["T1", "T2", "V1"]
+
+def test_replay_posts_stored_temperatures(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path), "npy")
+    store.save(DATE, "LEFT", _rows())
+    posted = []
+
+    async def fake_post(batches, url=None, *, fail_fast=True):
+        posted.extend(p for _, p in batches)
+        return []
+
+    monkeypatch.setattr(ingest_service, "post_sink_batches", fake_post)
+    monkeypatch.setattr(ingest_service.settings, "SINK_TEMPERATURE_FORMAT", "records")
+    summary = asyncio.run(ingest_service.replay_to_sink(store.load(DATE, "LEFT")))
+    assert summary == {"images": 2, "records": 3, "failed_batches": 0}
+    assert b'"Temperature":100.5' in b"".join(posted)
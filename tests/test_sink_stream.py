@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app.services import external_client
+from app.services.external_client import SinkBatcher, SinkStream, iter_sink_batches
+
+
+def _frags(n):
+    return [b'{"t":%d}' % i for i in range(n)]
+
+
+def test_batcher_matches_single_call():
+    items = _frags(100)
+    expected = list(iter_sink_batches(items, max_items=7, max_bytes=40))
+    batcher = SinkBatcher(max_items=7, max_bytes=40)
+    got = []
+    for i in range(0, len(items), 13):
+        got.extend(batcher.add(items[i:i + 13]))
+    got.extend(batcher.flush())
+    assert got == expected
+
+
+def test_stream_backpressure_and_order(monkeypatch):
+    gate = asyncio.Event()
+    posted = []
+
+    async def slow_post(client, url, idx, n, payload):
+        await gate.wait()
+        posted.append((idx, payload))
+
+    monkeypatch.setattr(external_client, "_post_batch", slow_post)
+    monkeypatch.setattr(external_client.settings, "SINK_BATCH_SIZE", 1)
+
+    async def scenario():
+        stream = SinkStream("http://sink/", max_queue=2, senders=1)
+        producer = asyncio.create_task(stream.put(_frags(10)))
+        await asyncio.sleep(0.05)
+        # 1 lote no sender + 2 na fila: o produtor fica esperando
+        assert not producer.done()
+        assert stream.stats()["queued"] == 2
+        gate.set()
+        await producer
+        assert await stream.close() == []
+        return stream
+
+    stream = asyncio.run(scenario())
+    assert [idx for idx, _ in posted] == list(range(10))
+    assert stream.sent == 10
+
+
+def test_stream_fail_fast_propagates(monkeypatch):
+    async def broken_post(client, url, idx, n, payload):
+        raise RuntimeError("sink fora")
+
+    monkeypatch.setattr(external_client, "_post_batch", broken_post)
+    monkeypatch.setattr(external_client.settings, "SINK_BATCH_SIZE", 1)
+
+    async def scenario():
+        stream = SinkStream("http://sink/", max_queue=1, senders=1)
+        try:
+            with pytest.raises(RuntimeError, match="sink fora"):
+                await stream.put(_frags(10))
+                await stream.close()
+        finally:
+            await stream.abort()
+
+    asyncio.run(scenario())
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import mock_source_sink as mock
+from app.schemas.pipeline import InboundRequest
+from app.services import external_client
+from app.services.external_client import iter_source_images
+
+
+def _img(i):
+    return {"Side": "LEFT", "Port": i % 3 + 1, "Section": i, "IsThermal": True,
+            "Base64String": "aGVsbG8=", "Name": f"IMG{i}"}
+
+
+@pytest.fixture
+def mock_source(tmp_path, monkeypatch):
+    path = tmp_path / "images.json"
+    path.write_text(json.dumps({"Images": [_img(i) for i in range(10)]}), encoding="utf-8")
+    monkeypatch.setattr(mock, "MOCK_JSON", str(path))
+    monkeypatch.setattr(external_client.settings, "EXTERNAL_SOURCE_URL", "http://mock/source")
+    monkeypatch.setattr(external_client, "_client", None)
+
+    def client():
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=mock.app), base_url="http://mock")
+    return client
+
+
+def _names(mode, monkeypatch, client, **overrides):
+    monkeypatch.setattr(external_client.settings, "SOURCE_FETCH_MODE", mode)
+    for k, v in overrides.items():
+        monkeypatch.setattr(external_client.settings, k, v)
+
+    async def scenario():
+        external_client._client = client()
+        req = InboundRequest(Date="2025-11-03T10:00:00Z", Side="LEFT")
+        try:
+            return [im.Name async for _, im in iter_source_images(req)]
+        finally:
+            await external_client.close_http_client()
+    return asyncio.run(scenario())
+
+
+def test_paged_matches_full(mock_source, monkeypatch):
+    full = _names("full", monkeypatch, mock_source)
+    assert len(full) == 10
+    assert _names("paged", monkeypatch, mock_source, SOURCE_PAGE_SIZE=3) == full
+    assert _names("paged", monkeypatch, mock_source, SOURCE_PAGE_SIZE=50) == full
+
+
+def test_ports_mode_groups_by_port(mock_source, monkeypatch):
+    names = _names("ports", monkeypatch, mock_source, SOURCE_PORTS=[1, 2, 3])
+    assert sorted(names) == sorted(f"IMG{i}" for i in range(10))
+    assert names[:4] == ["IMG0", "IMG3", "IMG6", "IMG9"]  # porta 1 primeiro
+
+
+def test_page_window_caps_concurrency(monkeypatch):
+    active = peak = 0
+
+    async def fake_page(req, extra):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return [], None
+
+    monkeypatch.setattr(external_client, "fetch_source_page", fake_page)
+    monkeypatch.setattr(external_client.settings, "SOURCE_MAX_CONCURRENCY", 2)
+
+    async def scenario():
+        pages = [{"Port": str(p)} for p in range(8)]
+        return [cols async for cols in external_client._iter_pages(None, pages)]
+
+    assert len(asyncio.run(scenario())) == 8
+    assert peak == 2
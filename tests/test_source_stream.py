@@ -0,0 +1,38 @@
+import json
+import pytest
+from pydantic import TypeAdapter
+from typing import List
+from app.schemas.pipeline import SourceCollection
+from app.services.source_stream import SourceStreamParser
+
+def _img(i, b64="aGVsbG8=", name=None):
+    return {"Side": "LEFT", "Port": i, "Section": i + 1, "IsThermal": i % 2 == 0,
+            "Base64String": b64, "Name": name or f"IMG{i}"}
+
+def _parse(raw: bytes, chunk: int):
+    p = SourceStreamParser()
+    out = []
+    for i in range(0, len(raw), chunk):
+        out.extend(p.feed(raw[i:i+chunk]))
+    out.extend(p.close())
+    return out
+
+@pytest.mark.parametrize("chunk", [1, 7, 64, 1 << 20])
+def test_stream_matches_full_parse(chunk):
+    body = [
+        {"Side": "LEFT", "Date": "2025-11-03T10:00:00Z",
+         "Images": [_img(0, "data:image/png;base64," + "A" * 5000), _img(1, name='com "aspas" e \\ barra'), _img(2)]},
+        {"Side": "RIGHT", "Date": "2025-11-03T11:00:00+00:00", "Images": []},
+        {"Images": [_img(3)], "Date": "2025-11-03T12:00:00Z", "Side": "RIGHT"},
+    ]
+    raw = json.dumps(body, indent=1).encode()
+    expected = [(c.Side, c.Date, im) for c in TypeAdapter(List[SourceCollection]).validate_python(body) for im in c.Images]
+
+    got = [(h.Side, h.Date, im) for h, im in _parse(raw, chunk)]
+    assert got == expected
+
+def test_single_object_and_truncated():
+    raw = json.dumps({"Side": "LEFT", "Date": "2025-11-03T10:00:00Z", "Images": [_img(0)]}).encode()
+    assert len(_parse(raw, 3)) == 1
+    with pytest.raises(ValueError):
+        _parse(raw[:-5], 3)
@@ -0,0 +1,50 @@
+import cv2
+import numpy as np
+import pytest
+from app.services.temperature import (
+    build_temperature_matrix_linear, temperature_lut, to_temperature_array, to_temperature_vector,
+)
+
+T_MIN, T_MAX = 98.0, 550.0
+
+def _legacy_matrix(img_rgb, t_min, t_max):
+    g = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2GRAY).astype(np.float32)
+    norm = cv2.normalize(g, None, 0.0, 1.0, cv2.NORM_MINMAX)
+    return t_min + norm * (t_max - t_min)
+
+def _legacy_vector(matriz, max_len):
+    vec = matriz.ravel().astype(float)
+    if max_len and vec.size > max_len:
+        vec = vec[::int(np.ceil(vec.size / max_len))]
+    return vec
+
+@pytest.fixture
+def img_rgb():
+    rng = np.random.default_rng(0)
+    return rng.integers(10, 240, size=(317, 263, 3), dtype=np.uint8)
+
+def test_matrix_matches_legacy(img_rgb):
+    got = build_temperature_matrix_linear(img_rgb, T_MIN, T_MAX)
+    assert got.dtype == np.float32
+    np.testing.assert_allclose(got, _legacy_matrix(img_rgb, T_MIN, T_MAX), atol=1e-3)
+
+@pytest.mark.parametrize("max_len", [None, 15000, 997])
+def test_vector_matches_legacy(img_rgb, max_len):
+    expected = _legacy_vector(_legacy_matrix(img_rgb, T_MIN, T_MAX), max_len)
+    got = to_temperature_array(img_rgb, T_MIN, T_MAX, max_len)
+    assert got.dtype == np.float32 and got.shape == expected.shape
+    np.testing.assert_allclose(got, expected, atol=1e-3)
+    assert to_temperature_vector(img_rgb, T_MIN, T_MAX, max_len) == got.tolist()
+
+def test_bbox_uses_whole_image_normalization(img_rgb):
+    bbox = (20, 30, 211, 170)
+    x_lo, y_lo, x_hi, y_hi = bbox
+    roi = _legacy_matrix(img_rgb, T_MIN, T_MAX)[y_lo:y_hi, x_lo:x_hi]
+    got = to_temperature_array(img_rgb, T_MIN, T_MAX, 1000, bbox=bbox)
+    np.testing.assert_allclose(got, _legacy_vector(roi, 1000), atol=1e-3)
+
+def test_gray_input_and_constant_image():
+    gray = np.full((8, 8), 77, dtype=np.uint8)
+    assert np.all(to_temperature_array(gray, T_MIN, T_MAX) == np.float32(T_MIN))
+    lut = temperature_lut(0, 255, T_MIN, T_MAX)
+    assert lut[0] == np.float32(T_MIN) and lut[255] == np.float32(T_MAX)
@@ -0,0 +1,31 @@
+import asyncio
+
+from app.core.timing import StageTimer, stage, timed_aiter
+
+
+def test_server_timing_accumulates_stages():
+    timer = StageTimer()
+    timer.add("decode", 0.010)
+    timer.add("decode", 0.005)
+    with stage(timer, "sink"):
+        pass
+    with stage(None, "ignored"):
+        pass
+    header = timer.server_timing()
+    parts = dict(p.split(";dur=") for p in header.split(", "))
+    assert list(parts) == ["decode", "sink", "total"]
+    assert float(parts["decode"]) == 15.0
+
+
+def test_timed_aiter_counts_wait_time():
+    async def slow_items():
+        for i in range(3):
+            await asyncio.sleep(0.01)
+            yield i
+
+    async def consume(timer):
+        return [i async for i in timed_aiter(slow_items(), timer, "fetch")]
+
+    timer = StageTimer()
+    assert asyncio.run(consume(timer)) == [0, 1, 2]
+    assert timer.totals["fetch"] >= 0.03